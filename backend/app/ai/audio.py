@@ -0,0 +1,321 @@
+import io
+from typing import NamedTuple, Optional
+
+import numpy as np
+import soundfile as sf
+
+
+class AudioFormat(NamedTuple):
+    container: str  # libsndfile format
+    subtype: str
+    content_type: str
+    extension: str
+    bitrate_range: Optional[tuple]  # (min, max) kbps for lossy codecs
+    bitrate_mode: Optional[str] = None
+
+
+AUDIO_FORMATS = {
+    "opus": AudioFormat("OGG", "OPUS", "audio/ogg", ".opus", (6, 256)),
+    # MPEG-2 layer III bitrates, which is what 16 kHz audio is encoded with
+    "mp3": AudioFormat("MP3", "MPEG_LAYER_III", "audio/mpeg", ".mp3", (8, 160), "CONSTANT"),
+    "flac": AudioFormat("FLAC", "PCM_16", "audio/flac", ".flac", None),
+    "wav": AudioFormat("WAV", "PCM_16", "audio/wav", ".wav", None),
+}
+
+
+class EncodedAudio(NamedTuple):
+    data: bytes
+    format: str
+    content_type: str
+    extension: str
+    duration: float
+    bitrate: int  # average kbps of the encoded data
+
+
+def get_audio_format(name: str) -> AudioFormat:
+    try:
+        return AUDIO_FORMATS[name]
+    except KeyError:
+        raise ValueError(f"Unsupported audio format '{name}', expected one of {', '.join(AUDIO_FORMATS)}")
+
+
+def compression_level(audio_format: AudioFormat, bitrate: Optional[int]) -> Optional[float]:
+    """
+    Translate a target bitrate into libsndfile's compression level
+
+    libsndfile spreads compression level 0..1 linearly from the codec's
+    highest to its lowest bitrate.
+    """
+    if audio_format.bitrate_range is None or not bitrate:
+        return None
+
+    low, high = audio_format.bitrate_range
+    bitrate = min(max(bitrate, low), high)
+    # Stay just below 1.0, which some encoders reject
+    return min((high - bitrate) / (high - low), 0.99)
+
+
+class AudioEncoder:
+    """
+    Encode audio incrementally, appending chunks as they are produced
+
+    Only the encoded bytes are kept, so a long recording never has to sit
+    in memory as one float array.
+    """
+
+    def __init__(self, format_name: str = "wav", bitrate: Optional[int] = None, sample_rate: int = 16000):
+        self.format_name = format_name
+        self.audio_format = get_audio_format(format_name)
+        self.sample_rate = sample_rate
+        self.samples = 0
+        self._buffer = io.BytesIO()
+        self._file = sf.SoundFile(
+            self._buffer,
+            "w",
+            samplerate=sample_rate,
+            channels=1,
+            format=self.audio_format.container,
+            subtype=self.audio_format.subtype,
+            compression_level=compression_level(self.audio_format, bitrate),
+            bitrate_mode=self.audio_format.bitrate_mode if bitrate else None
+        )
+
+    @property
+    def duration(self) -> float:
+        return self.samples / self.sample_rate
+
+    def write(self, audio_array: np.ndarray):
+        """Append mono float samples"""
+        self._file.write(audio_array)
+        self.samples += len(audio_array)
+
+    def close(self) -> EncodedAudio:
+        """Finish the stream and return everything written as one encoded file"""
+        self._file.close()
+        data = self._buffer.getvalue()
+        self._buffer = None
+
+        duration = self.duration
+        return EncodedAudio(
+            data=data,
+            format=self.format_name,
+            content_type=self.audio_format.content_type,
+            extension=self.audio_format.extension,
+            duration=duration,
+            bitrate=round(len(data) * 8 / 1000 / duration) if duration else 0
+        )
+
+
+def encode_audio(
+    audio_array: np.ndarray,
+    format_name: str = "wav",
+    bitrate: Optional[int] = None,
+    sample_rate: int = 16000
+) -> EncodedAudio:
+    """
+    Encode audio samples in memory
+
+    Args:
+        audio_array: Mono float samples
+        format_name: One of AUDIO_FORMATS
+        bitrate: Target kbps for lossy formats, ignored for lossless ones
+        sample_rate: Sample rate of audio_array
+
+    Returns:
+        The encoded bytes with their format metadata
+    """
+    encoder = AudioEncoder(format_name, bitrate, sample_rate)
+    encoder.write(audio_array)
+    return encoder.close()
+
+
+def encode_wav(audio_array: np.ndarray, sample_rate: int = 16000) -> bytes:
+    """Encode audio samples as 16-bit PCM WAV bytes"""
+    return encode_audio(audio_array, "wav", sample_rate=sample_rate).data
+
+
+def trim_silence(
+    audio_array: np.ndarray,
+    sample_rate: int = 16000,
+    threshold_db: float = -40.0,
+    max_pause_ms: int = 300,
+    frame_ms: int = 10
+) -> np.ndarray:
+    """
+    Cut leading/trailing silence and shorten long pauses, judged by frame RMS
+
+    Works on whole frames with array operations only: every silent run
+    inside the audio keeps at most max_pause_ms, split between its start
+    and end so that decays and onsets survive.
+    """
+    frame = max(1, sample_rate * frame_ms // 1000)
+    n_frames = len(audio_array) // frame
+    if n_frames == 0:
+        return audio_array
+
+    frames = audio_array[:n_frames * frame].reshape(n_frames, frame)
+    rms = np.sqrt(np.mean(np.square(frames, dtype=np.float64), axis=1))
+    loud = rms > 10 ** (threshold_db / 20)
+    if not loud.any():
+        return audio_array[:0]
+
+    # Position of every frame within its run of silent or loud frames
+    run_starts = np.flatnonzero(np.r_[True, loud[1:] != loud[:-1]])
+    run_lengths = np.diff(np.r_[run_starts, n_frames])
+    run_index = np.repeat(np.arange(len(run_starts)), run_lengths)
+    position = np.arange(n_frames) - run_starts[run_index]
+    length = run_lengths[run_index]
+
+    pause_frames = max_pause_ms // frame_ms
+    keep = loud | (position < (pause_frames + 1) // 2) | (position >= length - pause_frames // 2)
+
+    # Nothing before the first or after the last loud frame, bar one frame of margin
+    first = max(int(np.argmax(loud)) - 1, 0)
+    last = min(n_frames - int(np.argmax(loud[::-1])), n_frames - 1)
+    keep[:first] = False
+    keep[last + 1:] = False
+
+    mask = np.repeat(keep, frame)
+    # Samples past the last whole frame go with that frame
+    mask = np.r_[mask, np.full(len(audio_array) - len(mask), keep[-1])]
+    return audio_array[mask]
+
+
+def apply_fades(audio_array: np.ndarray, fade_samples: int) -> np.ndarray:
+    """Raised-cosine fade in and out over fade_samples at each end"""
+    fade_samples = min(fade_samples, len(audio_array) // 2)
+    if fade_samples <= 0:
+        return audio_array
+
+    ramp = (0.5 - 0.5 * np.cos(np.linspace(0, np.pi, fade_samples))).astype(audio_array.dtype)
+    faded = audio_array.copy()
+    faded[:fade_samples] *= ramp
+    faded[-fade_samples:] *= ramp[::-1]
+    return faded
+
+
+class SpeechAssembler:
+    """
+    Join synthesized chunks into one encoded recording
+
+    Each chunk is trimmed and faded on its own, and a fixed pause goes
+    between chunks, so a chunk's stored offsets cover exactly its own
+    audio and it can later be spliced elsewhere without re-processing.
+    """
+
+    def __init__(
+        self,
+        encoder: AudioEncoder,
+        trim: bool = True,
+        threshold_db: float = -40.0,
+        pause_ms: int = 300,
+        fade_ms: int = 10
+    ):
+        self.encoder = encoder
+        self.trim = trim
+        self.threshold_db = threshold_db
+        self.pause_ms = pause_ms
+        self.fade_samples = encoder.sample_rate * fade_ms // 1000
+        self.offsets = []  # (start, end) sample offsets of every chunk added
+
+    def process(self, audio_array: np.ndarray) -> np.ndarray:
+        """Trim and fade one freshly synthesized chunk"""
+        if self.trim:
+            audio_array = trim_silence(
+                audio_array, self.encoder.sample_rate, self.threshold_db, self.pause_ms
+            )
+        return apply_fades(audio_array, self.fade_samples)
+
+    def add(self, audio_array: np.ndarray, processed: bool = False) -> np.ndarray:
+        """
+        Append a chunk, preceded by the pause if it is not the first
+
+        Args:
+            audio_array: Chunk samples
+            processed: True for audio that already went through process(),
+                e.g. a chunk cut from an earlier recording
+
+        Returns:
+            The samples written, pause included
+        """
+        if not processed:
+            audio_array = self.process(audio_array)
+
+        pause_samples = 0
+        if self.offsets:
+            pause_samples = self.encoder.sample_rate * self.pause_ms // 1000
+            audio_array = np.concatenate([np.zeros(pause_samples, dtype=audio_array.dtype), audio_array])
+
+        start = self.encoder.samples + pause_samples
+        self.encoder.write(audio_array)
+        self.offsets.append((start, self.encoder.samples))
+        return audio_array
+
+    def close(self) -> EncodedAudio:
+        return self.encoder.close()
+
+
+def open_audio(data: bytes, sample_rate: int = 16000) -> sf.SoundFile:
+    """Open encoded audio bytes for seeking and reading segments"""
+    sound_file = sf.SoundFile(io.BytesIO(data))
+    if sound_file.samplerate != sample_rate:
+        sound_file.close()
+        raise ValueError(f"Expected {sample_rate} Hz audio, got {sound_file.samplerate} Hz")
+    return sound_file
+
+
+def _mel_filter_bank(n_fft: int, n_mels: int, sample_rate: int, fmin: float, fmax: float) -> np.ndarray:
+    """Triangular HTK-style mel filters, shape (n_mels, n_fft // 2 + 1)"""
+    def hz_to_mel(hz):
+        return 2595.0 * np.log10(1.0 + hz / 700.0)
+
+    def mel_to_hz(mel):
+        return 700.0 * (10 ** (mel / 2595.0) - 1.0)
+
+    fft_freqs = np.linspace(0, sample_rate / 2, n_fft // 2 + 1)
+    mel_points = mel_to_hz(np.linspace(hz_to_mel(fmin), hz_to_mel(fmax), n_mels + 2))
+
+    lower = mel_points[:-2, None]
+    center = mel_points[1:-1, None]
+    upper = mel_points[2:, None]
+    rising = (fft_freqs - lower) / (center - lower)
+    falling = (upper - fft_freqs) / (upper - center)
+    return np.maximum(0.0, np.minimum(rising, falling))
+
+
+def log_mel_spectrogram(
+    audio_array: np.ndarray,
+    sample_rate: int = 16000,
+    n_fft: int = 1024,
+    hop_length: int = 256,
+    n_mels: int = 80
+) -> np.ndarray:
+    """Log10 mel spectrogram (80 bins over 80-7600 Hz, like SpeechT5), shape (frames, n_mels)"""
+    audio_array = np.asarray(audio_array, dtype=np.float32)
+    if len(audio_array) < n_fft:
+        audio_array = np.pad(audio_array, (0, n_fft - len(audio_array)))
+
+    frame_count = 1 + (len(audio_array) - n_fft) // hop_length
+    frames = np.lib.stride_tricks.as_strided(
+        audio_array,
+        shape=(frame_count, n_fft),
+        strides=(audio_array.strides[0] * hop_length, audio_array.strides[0])
+    )
+    magnitudes = np.abs(np.fft.rfft(frames * np.hanning(n_fft).astype(np.float32), axis=1))
+
+    mel = magnitudes @ _mel_filter_bank(n_fft, n_mels, sample_rate, 80.0, 7600.0).T
+    # Floor keeps near-silent bins from dominating distances
+    return np.log10(np.maximum(mel, 1e-5))
+
+
+def mel_distance(reference: np.ndarray, candidate: np.ndarray, sample_rate: int = 16000) -> float:
+    """
+    Mean absolute log-mel difference between two renderings of the same text
+
+    Autoregressive models may stop a few frames apart, so only the
+    overlapping frames are compared.
+    """
+    reference_mel = log_mel_spectrogram(reference, sample_rate)
+    candidate_mel = log_mel_spectrogram(candidate, sample_rate)
+    frames = min(len(reference_mel), len(candidate_mel))
+    return float(np.mean(np.abs(reference_mel[:frames] - candidate_mel[:frames])))
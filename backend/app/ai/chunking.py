@@ -0,0 +1,202 @@
+"""
+Token-bounded text chunking shared by speech synthesis, note generation
+and the note index
+
+split_text_into_chunks works on running text and joins sentences with
+single spaces, as speech needs. split_blocks keeps the paragraph and line
+breaks of markdown, falling back to sentences only for paragraphs too long
+to fit a chunk. Token counting is passed in by the caller, so any
+tokenizer works.
+"""
+import math
+import re
+from typing import Callable, List
+
+# A sentence ends at . ! or ? (plus closing quotes/brackets) followed by whitespace
+_SENTENCE_END = re.compile(r"[.!?]+[\"')\]]*\s+")
+_CLAUSE_END = re.compile(r"[,;:]\s+")
+
+# Abbreviations that never end a sentence ("etc." can, so it is not here)
+_NON_TERMINAL = ("e.g.", "i.e.", "vs.", "Dr.", "Prof.")
+
+# Paragraphs are separated by blank lines
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+
+
+def split_sentences(text: str) -> List[str]:
+    """Split text into sentences, keeping their punctuation"""
+    sentences = []
+    start = 0
+
+    for match in _SENTENCE_END.finditer(text):
+        candidate = text[start:match.start() + len(match.group().rstrip())]
+        # "Dr. Smith" or "e.g. this" do not end a sentence
+        if candidate.endswith(_NON_TERMINAL):
+            continue
+        sentences.append(candidate.strip())
+        start = match.end()
+
+    tail = text[start:].strip()
+    if tail:
+        sentences.append(tail)
+
+    return [sentence for sentence in sentences if sentence]
+
+
+def _split_oversized(unit: str, max_tokens: int, count_tokens: Callable[[str], int]) -> List[str]:
+    """Break a sentence that alone exceeds max_tokens at clauses, then words"""
+    for pattern in (_CLAUSE_END, re.compile(r"\s+")):
+        parts = []
+        start = 0
+        for match in pattern.finditer(unit):
+            parts.append(unit[start:match.start() + len(match.group().rstrip())].strip())
+            start = match.end()
+        parts.append(unit[start:].strip())
+        parts = [part for part in parts if part]
+
+        if len(parts) > 1:
+            pieces = []
+            for part in parts:
+                if count_tokens(part) > max_tokens:
+                    pieces.extend(_split_oversized(part, max_tokens, count_tokens))
+                else:
+                    pieces.append(part)
+            return pieces
+
+    # A single huge "word": cut it into pieces by characters
+    step = max(1, len(unit) * max_tokens // max(count_tokens(unit), 1) - 1)
+    pieces = []
+    for i in range(0, len(unit), step):
+        piece = unit[i:i + step]
+        if step > 1 and count_tokens(piece) > max_tokens:
+            pieces.extend(_split_oversized(piece, max_tokens, count_tokens))
+        else:
+            pieces.append(piece)
+    return pieces
+
+
+def _pack(units: List[str], sizes: List[int], limit: int) -> List[List[int]]:
+    """Greedily group consecutive units so each group's size stays within limit"""
+    groups = []
+    current = []
+    current_size = 0
+
+    for index, size in enumerate(sizes):
+        # +1 for the space that joins units
+        if current and current_size + 1 + size > limit:
+            groups.append(current)
+            current = []
+            current_size = 0
+        current_size += size + (1 if current else 0)
+        current.append(index)
+
+    if current:
+        groups.append(current)
+
+    return groups
+
+
+def split_text_into_chunks(
+    text: str,
+    max_tokens: int,
+    count_tokens: Callable[[str], int]
+) -> List[str]:
+    """
+    Split text into chunks that each fit in max_tokens model tokens
+
+    Chunks break at sentence boundaries where possible, at clause or word
+    boundaries for overly long sentences, and are balanced so that they are
+    all roughly the same size, which keeps batch padding low.
+
+    Args:
+        text: Text to split
+        max_tokens: Hard limit on tokens per chunk, as measured by count_tokens
+        count_tokens: Returns the number of model tokens a chunk will use
+
+    Returns:
+        Chunks in reading order
+    """
+    units = []
+    for sentence in split_sentences(" ".join(text.split())):
+        if count_tokens(sentence) > max_tokens:
+            units.extend(_split_oversized(sentence, max_tokens, count_tokens))
+        else:
+            units.append(sentence)
+
+    if not units:
+        return []
+
+    sizes = [count_tokens(unit) for unit in units]
+
+    # Find how many chunks are needed, then aim for equal-sized chunks
+    greedy = _pack(units, sizes, max_tokens)
+    total = sum(sizes) + len(sizes) - 1
+    target = math.ceil(total / len(greedy))
+    groups = _pack(units, sizes, max(target, max(sizes)))
+    if len(groups) > len(greedy):
+        groups = greedy
+
+    def emit(group: List[int]) -> List[str]:
+        chunk = " ".join(units[i] for i in group)
+        # Token counts are not strictly additive; re-check the joined chunk
+        if len(group) > 1 and count_tokens(chunk) > max_tokens:
+            middle = len(group) // 2
+            return emit(group[:middle]) + emit(group[middle:])
+        return [chunk]
+
+    return [chunk for group in groups for chunk in emit(group)]
+
+
+def _pack_blocks(blocks: List[str], separator: str, max_tokens: int, count_tokens: Callable[[str], int]) -> List[str]:
+    """Join consecutive blocks with separator while the chunk stays within max_tokens"""
+    chunks = []
+    current = []
+    used = 0
+
+    for block in blocks:
+        size = count_tokens(block)
+        if current and used + size > max_tokens:
+            chunks.append(separator.join(current))
+            current, used = [], 0
+        current.append(block)
+        used += size
+
+    if current:
+        chunks.append(separator.join(current))
+    return chunks
+
+
+def split_blocks(text: str, max_tokens: int, count_tokens: Callable[[str], int]) -> List[str]:
+    """
+    Split markdown into chunks of about max_tokens tokens, keeping its layout
+
+    Consecutive paragraphs share a chunk and keep the blank lines between
+    them. A paragraph longer than max_tokens is split between its lines, and
+    a line longer than that at sentence boundaries (see split_text_into_chunks).
+
+    Args:
+        text: Text to split
+        max_tokens: Limit on tokens per chunk, as measured by count_tokens
+        count_tokens: Returns the number of tokens a piece of text uses
+
+    Returns:
+        Chunks in reading order
+    """
+    blocks = []
+    for paragraph in _PARAGRAPH_BREAK.split(text):
+        paragraph = paragraph.strip("\n").rstrip()
+        if not paragraph.strip():
+            continue
+        if count_tokens(paragraph) <= max_tokens:
+            blocks.append(paragraph)
+            continue
+
+        lines = []
+        for line in paragraph.split("\n"):
+            if count_tokens(line) > max_tokens:
+                lines.extend(split_text_into_chunks(line, max_tokens, count_tokens))
+            elif line.strip():
+                lines.append(line.rstrip())
+        blocks.extend(_pack_blocks(lines, "\n", max_tokens, count_tokens))
+
+    return _pack_blocks(blocks, "\n\n", max_tokens, count_tokens)
@@ -0,0 +1,143 @@
+"""
+Token-budgeted context assembly for question answering
+
+Notes attached to a question are split into paragraphs, deduplicated,
+ranked by relevance to the question (BM25 over the paragraphs) and packed
+best-first into a fixed token budget. The packed paragraphs are emitted in
+their original order so the context still reads naturally.
+"""
+import math
+import re
+from collections import Counter
+from typing import List, NamedTuple
+
+from app.ai.tokens import count_tokens, truncate_to_tokens
+
+_WORD = re.compile(r"[a-z0-9]+")
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+
+STOPWORDS = frozenset(
+    "the and for are but not you all any can her was one our out his has how its may new now "
+    "see who did get him let say she too use what when where which while with this that from "
+    "they them then than there their these those have been were will would could should about "
+    "into does why explain tell give".split()
+)
+
+# Paragraph cut to fit the remaining budget only if at least this much room is left
+MIN_PARTIAL_TOKENS = 50
+
+
+class PackedContext(NamedTuple):
+    text: str
+    tokens: int
+    paragraphs: int  # paragraphs included, whole or truncated
+    paragraphs_total: int  # distinct paragraphs available
+    truncated: bool  # True if anything was left out or cut
+
+
+def _terms(text: str) -> List[str]:
+    return [word for word in _WORD.findall(text.lower()) if len(word) > 2 and word not in STOPWORDS]
+
+
+def split_paragraphs(text: str) -> List[str]:
+    """Split on blank lines, or on single newlines for text without any"""
+    parts = _PARAGRAPH_BREAK.split(text)
+    if len(parts) == 1:
+        parts = text.split("\n")
+    return [" ".join(part.split()) for part in parts if part.strip()]
+
+
+def rank_paragraphs(paragraphs: List[str], question: str, k1: float = 1.2, b: float = 0.75) -> List[int]:
+    """Paragraph indexes by BM25 relevance to question, ties in original order"""
+    query = set(_terms(question))
+    counts = [Counter(_terms(paragraph)) for paragraph in paragraphs]
+    lengths = [sum(count.values()) for count in counts]
+    average_length = sum(lengths) / len(lengths) if lengths else 0
+
+    idf = {}
+    for term in query:
+        documents = sum(1 for count in counts if term in count)
+        idf[term] = math.log(1 + (len(counts) - documents + 0.5) / (documents + 0.5))
+
+    scores = []
+    for count, length in zip(counts, lengths):
+        norm = k1 * (1 - b + b * length / average_length) if average_length else k1
+        score = 0.0
+        for term in query:
+            frequency = count.get(term, 0)
+            if frequency:
+                score += idf[term] * frequency * (k1 + 1) / (frequency + norm)
+        scores.append(score)
+
+    return sorted(range(len(paragraphs)), key=lambda i: (-scores[i], i))
+
+
+def pack_ranked(paragraphs: List[str], ranking: List[int], max_tokens: int, model: str = "gpt-4") -> PackedContext:
+    """
+    Pack paragraphs into max_tokens in ranking order, emitting them in list order
+
+    Args:
+        paragraphs: Candidate paragraphs, in the order they should read
+        ranking: Indexes into paragraphs, most relevant first
+        max_tokens: Token budget for the packed context
+        model: Model whose tokenizer measures the budget
+
+    Returns:
+        The packed context with the tokens it uses
+    """
+    chosen = {}
+    used = 0
+    truncated = False
+    separator = count_tokens("\n\n", model)
+
+    for index in ranking:
+        room = max_tokens - used - (separator if chosen else 0)
+        cost = count_tokens(paragraphs[index], model)
+
+        if cost <= room:
+            chosen[index] = paragraphs[index]
+        elif room >= MIN_PARTIAL_TOKENS:
+            chosen[index] = truncate_to_tokens(paragraphs[index], room, model)
+            cost = count_tokens(chosen[index], model)
+            truncated = True
+        else:
+            # Smaller paragraphs further down the ranking may still fit
+            truncated = True
+            continue
+
+        used += cost + (separator if len(chosen) > 1 else 0)
+
+    text = "\n\n".join(chosen[index] for index in sorted(chosen))
+    return PackedContext(
+        text=text,
+        tokens=count_tokens(text, model) if text else 0,
+        paragraphs=len(chosen),
+        paragraphs_total=len(paragraphs),
+        truncated=truncated
+    )
+
+
+def pack_context(documents: List[str], question: str, max_tokens: int, model: str = "gpt-4") -> PackedContext:
+    """
+    Pack the paragraphs of documents most relevant to question into max_tokens
+
+    Args:
+        documents: Note contents, in the order they were attached
+        question: Question the context should help answer
+        max_tokens: Token budget for the packed context
+        model: Model whose tokenizer measures the budget
+
+    Returns:
+        The packed context with the tokens it uses
+    """
+    # Repeated notes and paragraphs shared between notes count once
+    paragraphs = []
+    seen = set()
+    for document in documents:
+        for paragraph in split_paragraphs(document):
+            fingerprint = paragraph.lower()
+            if fingerprint not in seen:
+                seen.add(fingerprint)
+                paragraphs.append(paragraph)
+
+    return pack_ranked(paragraphs, rank_paragraphs(paragraphs, question), max_tokens, model)
@@ -0,0 +1,78 @@
+"""
+Sentence embeddings from a small local model, computed on CPU
+
+Texts are embedded in batches with mean pooling over the model's last
+hidden state and L2-normalized, so a dot product is cosine similarity.
+The model loads on first use and runs on a single background thread to
+keep inference off the event loop.
+"""
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+import numpy as np
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class Embedder:
+    def __init__(self, model_name: str = settings.EMBEDDING_MODEL_NAME, batch_size: int = settings.EMBEDDING_BATCH_SIZE):
+        import torch
+        from transformers import AutoModel, AutoTokenizer
+
+        self.torch = torch
+        self.model_name = model_name
+        self.batch_size = batch_size
+
+        logger.info(f"Loading embedding model {model_name}...")
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+        self.model = AutoModel.from_pretrained(model_name)
+        self.model.eval()
+        self.dimensions = self.model.config.hidden_size
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        """Embed texts into a (len(texts), dimensions) float32 array of unit vectors"""
+        vectors = []
+        for start in range(0, len(texts), self.batch_size):
+            batch = self.tokenizer(
+                texts[start:start + self.batch_size],
+                padding=True,
+                truncation=True,
+                max_length=settings.EMBEDDING_MAX_TOKENS,
+                return_tensors="pt"
+            )
+            with self.torch.inference_mode():
+                hidden = self.model(**batch).last_hidden_state
+
+            # Mean over real tokens only, not padding
+            mask = batch["attention_mask"].unsqueeze(-1).to(hidden.dtype)
+            pooled = (hidden * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1e-9)
+            pooled = self.torch.nn.functional.normalize(pooled, p=2, dim=1)
+            vectors.append(pooled.numpy().astype(np.float32))
+
+        if not vectors:
+            return np.zeros((0, self.dimensions), dtype=np.float32)
+        return np.concatenate(vectors)
+
+
+_embedder: Optional[Embedder] = None
+_embedder_lock = threading.Lock()
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="embeddings")
+
+
+def get_embedder() -> Embedder:
+    global _embedder
+    with _embedder_lock:
+        if _embedder is None:
+            _embedder = Embedder()
+        return _embedder
+
+
+async def embed_texts(texts: List[str]) -> np.ndarray:
+    """Embed texts on the embedding thread"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, lambda: get_embedder().embed(texts))
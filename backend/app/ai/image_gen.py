@@ -1,19 +1,19 @@
 
-import openai
 import base64
 import httpx
 from app.config import settings
+from app.ai.openai_client import generate_images
+from app.ai.single_flight import coalesced
 from typing import Optional
 
-openai.api_key = settings.OPENAI_API_KEY
-
 
+@coalesced
 async def generate_image_for_concept(concept: str, style: str = "educational diagram") -> Optional[str]:
     """Generate an image for a flashcard concept using DALL-E"""
     try:
         prompt = f"{concept} as a {style}, minimalist, clear, educational illustration"
         
-        response = await openai.images.generate(
+        response = await generate_images(
             model="dall-e-3",
             prompt=prompt,
             n=1,
@@ -0,0 +1,142 @@
+import collections
+import hashlib
+import json
+import logging
+import time
+from datetime import datetime
+from typing import List, Optional
+
+from app.config import settings
+from app.database import db
+
+logger = logging.getLogger(__name__)
+
+
+class LLMCache:
+    """
+    Cache of chat completions: an in-process LRU in front of Mongo
+
+    Entries are keyed by a hash of every request parameter that shapes the
+    completion (model, messages, temperature, max_tokens, response_format).
+    The llm_cache collection is shared by all app processes and a TTL index
+    on created_at expires entries after ttl_seconds; the in-process LRU
+    answers repeats without a database round trip.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: int, enabled: bool = True):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.enabled = enabled
+        self.hits = 0
+        self.memory_hits = 0
+        self.misses = 0
+        self.saved_prompt_tokens = 0
+        self.saved_completion_tokens = 0
+        self._entries = collections.OrderedDict()  # key -> (stored at, entry)
+
+    @staticmethod
+    def make_key(
+        model: str,
+        messages: List[dict],
+        temperature: float,
+        max_tokens: int,
+        response_format: Optional[dict] = None
+    ) -> str:
+        payload = json.dumps(
+            [model, messages, temperature, max_tokens, response_format],
+            ensure_ascii=False,
+            sort_keys=True
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    async def ensure_indexes(self):
+        """Create the TTL index that expires cached completions"""
+        if not self.enabled:
+            return
+        try:
+            await db.db.llm_cache.create_index("created_at", expireAfterSeconds=self.ttl_seconds)
+        except Exception as e:
+            logger.warning(f"Could not create LLM cache index: {str(e)}")
+
+    def _remember(self, key: str, entry: dict):
+        self._entries[key] = (time.monotonic(), entry)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _record_hit(self, entry: dict):
+        self.hits += 1
+        self.saved_prompt_tokens += entry.get("prompt_tokens", 0)
+        self.saved_completion_tokens += entry.get("completion_tokens", 0)
+
+    async def get(self, key: str) -> Optional[dict]:
+        """Return the cached entry (content and token usage) for key, or None"""
+        if not self.enabled:
+            return None
+
+        cached = self._entries.get(key)
+        if cached and time.monotonic() - cached[0] < self.ttl_seconds:
+            self._entries.move_to_end(key)
+            self.memory_hits += 1
+            self._record_hit(cached[1])
+            return cached[1]
+
+        try:
+            document = await db.db.llm_cache.find_one({"_id": key})
+        except Exception as e:
+            logger.warning(f"Could not read LLM cache: {str(e)}")
+            document = None
+
+        if not document:
+            self._entries.pop(key, None)
+            self.misses += 1
+            return None
+
+        entry = {
+            "content": document["content"],
+            "prompt_tokens": document.get("prompt_tokens", 0),
+            "completion_tokens": document.get("completion_tokens", 0)
+        }
+        self._remember(key, entry)
+        self._record_hit(entry)
+        return entry
+
+    async def put(self, key: str, model: str, content: str, prompt_tokens: int = 0, completion_tokens: int = 0):
+        """Store a completion for key"""
+        if not self.enabled or content is None:
+            return
+
+        entry = {"content": content, "prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens}
+        self._remember(key, entry)
+
+        try:
+            await db.db.llm_cache.replace_one(
+                {"_id": key},
+                # TTL indexes compare against UTC
+                {**entry, "model": model, "created_at": datetime.utcnow()},
+                upsert=True
+            )
+        except Exception as e:
+            logger.warning(f"Could not write LLM cache entry: {str(e)}")
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "hits": self.hits,
+            "memory_hits": self.memory_hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "saved_prompt_tokens": self.saved_prompt_tokens,
+            "saved_completion_tokens": self.saved_completion_tokens,
+            "memory_entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds
+        }
+
+
+llm_cache = LLMCache(
+    max_entries=settings.LLM_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.LLM_CACHE_TTL_SECONDS,
+    enabled=settings.LLM_CACHE_ENABLED
+)
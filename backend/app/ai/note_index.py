@@ -0,0 +1,359 @@
+"""
+Per-user vector index of note passages for retrieval
+
+Notes are split into passages when they are written, each passage is
+embedded with the local embedding model, and passages are stored with
+their vectors in the note_passages collection. For search, a user's
+passages are loaded once into an in-process NumPy matrix (an LRU keeps
+the most recently active users) and queried with a matrix-vector product.
+
+Note writes update both Mongo and the loaded matrix in the background,
+re-embedding only passages whose text changed. Loaded indexes are refreshed from Mongo
+after ttl_seconds, so writes made by other app processes show up too.
+Notes written before the index existed are indexed in the background the
+first time their owner's index is loaded.
+"""
+import asyncio
+import collections
+import hashlib
+import logging
+import time
+import weakref
+from typing import Awaitable, Callable, Coroutine, Dict, Iterable, List, NamedTuple, Optional, Set
+
+import numpy as np
+from bson import ObjectId
+
+from app.config import settings
+from app.database import db
+from app.ai.tokens import count_tokens
+from app.ai.chunking import split_blocks
+
+logger = logging.getLogger(__name__)
+
+# Position of the marker stored for notes with no text to index
+EMPTY_NOTE_POSITION = -1
+
+
+class Passage(NamedTuple):
+    note_id: str
+    position: int  # order of the passage within its note
+    text: str
+    score: float
+
+
+def passage_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def split_passages(text: str, max_tokens: int, count_tokens: Callable[[str], int] = count_tokens) -> List[str]:
+    """
+    Split note text into passages of at most max_tokens tokens
+
+    Consecutive short paragraphs share a passage; longer paragraphs are split
+    between lines, then at sentence boundaries.
+    """
+    return split_blocks(text, max_tokens, count_tokens)
+
+
+class UserIndex:
+    """Passages of one user's notes and their unit vectors, row by row"""
+
+    def __init__(self):
+        self.note_ids = np.empty(0, dtype=object)
+        self.positions = np.empty(0, dtype=np.int32)
+        self.texts: List[str] = []
+        self.vectors = np.zeros((0, 0), dtype=np.float32)
+        self.loaded_at = time.monotonic()
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    def notes(self) -> set:
+        return set(self.note_ids.tolist())
+
+    def remove_note(self, note_id: str):
+        keep = self.note_ids != note_id
+        if keep.all():
+            return
+        self.note_ids = self.note_ids[keep]
+        self.positions = self.positions[keep]
+        self.texts = [text for text, kept in zip(self.texts, keep) if kept]
+        self.vectors = self.vectors[keep]
+
+    def add_note(self, note_id: str, texts: List[str], vectors: np.ndarray):
+        """Replace the passages of note_id with texts and their vectors"""
+        self.remove_note(note_id)
+        if not texts:
+            return
+        self.note_ids = np.concatenate([self.note_ids, np.array([note_id] * len(texts), dtype=object)])
+        self.positions = np.concatenate([self.positions, np.arange(len(texts), dtype=np.int32)])
+        self.texts.extend(texts)
+        vectors = vectors.astype(np.float32, copy=False)
+        self.vectors = np.vstack([self.vectors, vectors]) if len(self.vectors) else vectors
+
+    def search(
+        self,
+        query: np.ndarray,
+        top_k: int,
+        note_ids: Optional[Iterable[str]] = None,
+        min_score: float = 0.0
+    ) -> List[Passage]:
+        """The top_k passages most similar to query, best first"""
+        if not len(self):
+            return []
+
+        scores = self.vectors @ query
+        if note_ids is not None:
+            scores = np.where(np.isin(self.note_ids, list(note_ids)), scores, -np.inf)
+
+        top_k = min(top_k, len(scores))
+        best = np.argpartition(-scores, top_k - 1)[:top_k]
+        best = best[np.argsort(-scores[best], kind="stable")]
+
+        return [
+            Passage(self.note_ids[i], int(self.positions[i]), self.texts[i], float(scores[i]))
+            for i in best
+            if scores[i] >= min_score
+        ]
+
+
+class NoteIndex:
+    def __init__(
+        self,
+        embed: Callable[[List[str]], Awaitable[np.ndarray]],
+        model_name: str,
+        passage_tokens: int,
+        max_users: int,
+        ttl_seconds: int,
+        enabled: bool = True
+    ):
+        self.embed = embed
+        self.model_name = model_name
+        self.passage_tokens = passage_tokens
+        self.max_users = max_users
+        self.ttl_seconds = ttl_seconds
+        self.enabled = enabled
+        self.embedded_passages = 0
+        self.reused_passages = 0
+        self._users: Dict[str, UserIndex] = collections.OrderedDict()
+        self._locks = weakref.WeakValueDictionary()
+        self._backfills: Dict[str, asyncio.Task] = {}
+        self._writes: Set[asyncio.Task] = set()
+
+    def _lock(self, user_id: str) -> asyncio.Lock:
+        lock = self._locks.get(user_id)
+        if lock is None:
+            lock = self._locks[user_id] = asyncio.Lock()
+        return lock
+
+    async def ensure_indexes(self):
+        if not self.enabled:
+            return
+        try:
+            await db.db.note_passages.create_index([("user_id", 1), ("note_id", 1), ("position", 1)])
+        except Exception as e:
+            logger.warning(f"Could not create note passage index: {str(e)}")
+
+    async def _embed_note(self, note_id: str, content: str) -> tuple:
+        """Passages of content and their vectors, reusing stored vectors for unchanged passages"""
+        texts = split_passages(content, self.passage_tokens)
+        hashes = [passage_hash(text) for text in texts]
+
+        stored = {}
+        async for doc in db.db.note_passages.find(
+            {"note_id": note_id, "model": self.model_name, "hash": {"$in": hashes}},
+            {"hash": 1, "embedding": 1}
+        ):
+            stored[doc["hash"]] = np.frombuffer(doc["embedding"], dtype=np.float32)
+
+        missing = [i for i, h in enumerate(hashes) if h not in stored]
+        vectors = await self.embed([texts[i] for i in missing]) if missing else None
+        for row, i in enumerate(missing):
+            stored[hashes[i]] = vectors[row]
+        self.embedded_passages += len(missing)
+        self.reused_passages += len(texts) - len(missing)
+
+        matrix = np.array([stored[h] for h in hashes], dtype=np.float32) if texts else None
+        return texts, hashes, matrix
+
+    async def _write_note(self, user_id: str, note_id: str, content: str, index: Optional[UserIndex]):
+        texts, hashes, matrix = await self._embed_note(note_id, content)
+
+        await db.db.note_passages.delete_many({"note_id": note_id})
+        if not texts:
+            # Marks the note as indexed, so loads do not treat it as new every time
+            await db.db.note_passages.insert_one({
+                "user_id": user_id,
+                "note_id": note_id,
+                "position": EMPTY_NOTE_POSITION,
+                "model": self.model_name
+            })
+        else:
+            await db.db.note_passages.insert_many([
+                {
+                    "user_id": user_id,
+                    "note_id": note_id,
+                    "position": position,
+                    "text": text,
+                    "hash": hashes[position],
+                    "model": self.model_name,
+                    "embedding": matrix[position].tobytes()
+                }
+                for position, text in enumerate(texts)
+            ])
+
+        if index is not None:
+            if texts:
+                index.add_note(note_id, texts, matrix)
+            else:
+                index.remove_note(note_id)
+
+    async def _load(self, user_id: str) -> UserIndex:
+        index = UserIndex()
+        indexed = set()
+        rows = []
+        async for doc in db.db.note_passages.find(
+            {"user_id": user_id, "model": self.model_name}
+        ).sort([("note_id", 1), ("position", 1)]):
+            indexed.add(doc["note_id"])
+            if doc["position"] != EMPTY_NOTE_POSITION:
+                rows.append(doc)
+
+        if rows:
+            index.note_ids = np.array([doc["note_id"] for doc in rows], dtype=object)
+            index.positions = np.array([doc["position"] for doc in rows], dtype=np.int32)
+            index.texts = [doc["text"] for doc in rows]
+            index.vectors = np.stack([np.frombuffer(doc["embedding"], dtype=np.float32) for doc in rows])
+
+        # Notes written before indexing existed, or under another model, are
+        # indexed in the background so this load does not wait on embedding them
+        missing = []
+        async for note in db.db.notes.find({"user_id": user_id}, {"_id": 1}):
+            if str(note["_id"]) not in indexed:
+                missing.append(str(note["_id"]))
+        if missing and user_id not in self._backfills:
+            self._backfills[user_id] = asyncio.create_task(self._backfill(user_id, missing))
+
+        return index
+
+    async def _backfill(self, user_id: str, note_ids: List[str]):
+        """Index notes that have no passages yet, one at a time"""
+        try:
+            for note_id in note_ids:
+                async with self._lock(user_id):
+                    # Read under the lock: the note may have been updated or deleted since
+                    note = await db.db.notes.find_one({"_id": ObjectId(note_id)}, {"content": 1})
+                    if note:
+                        await self._write_note(user_id, note_id, note.get("content", ""), self._users.get(user_id))
+            logger.info(f"Indexed {len(note_ids)} earlier note(s) for user {user_id}")
+        except Exception as e:
+            logger.error(f"Error indexing earlier notes for user {user_id}: {str(e)}")
+        finally:
+            self._backfills.pop(user_id, None)
+
+    async def _get(self, user_id: str) -> UserIndex:
+        """The user's loaded index, loading or refreshing it from Mongo as needed"""
+        index = self._users.get(user_id)
+        if index is None or time.monotonic() - index.loaded_at >= self.ttl_seconds:
+            index = await self._load(user_id)
+            self._users[user_id] = index
+
+        self._users.move_to_end(user_id)
+        while len(self._users) > self.max_users:
+            self._users.popitem(last=False)
+        return index
+
+    async def index_note(self, user_id: str, note_id: str, content: str):
+        """Index a created or updated note; errors are logged, never raised"""
+        if not self.enabled:
+            return
+        try:
+            async with self._lock(user_id):
+                await self._write_note(user_id, note_id, content, self._users.get(user_id))
+        except Exception as e:
+            logger.error(f"Error indexing note {note_id}: {str(e)}")
+
+    async def remove_note(self, user_id: str, note_id: str):
+        """Drop a deleted note's passages; errors are logged, never raised"""
+        if not self.enabled:
+            return
+        try:
+            async with self._lock(user_id):
+                await db.db.note_passages.delete_many({"note_id": note_id})
+                index = self._users.get(user_id)
+                if index is not None:
+                    index.remove_note(note_id)
+        except Exception as e:
+            logger.error(f"Error removing note {note_id} from index: {str(e)}")
+
+    def _schedule(self, write: Coroutine):
+        # Writes to one user's index queue on their lock in the order they are scheduled
+        task = asyncio.create_task(write)
+        self._writes.add(task)
+        task.add_done_callback(self._writes.discard)
+
+    def schedule_index(self, user_id: str, note_id: str, content: Optional[str]):
+        """Index a created or updated note in the background, so the write is not held up by embedding"""
+        if self.enabled:
+            self._schedule(self.index_note(user_id, note_id, content or ""))
+
+    def schedule_remove(self, user_id: str, note_id: str):
+        """Drop a deleted note's passages in the background, after any pending index of it"""
+        if self.enabled:
+            self._schedule(self.remove_note(user_id, note_id))
+
+    async def search(
+        self,
+        user_id: str,
+        question: str,
+        top_k: int,
+        note_ids: Optional[List[str]] = None
+    ) -> List[Passage]:
+        """
+        Retrieve the passages of a user's notes most relevant to a question
+
+        Args:
+            user_id: Owner of the notes searched
+            question: Text to match passages against
+            top_k: Number of passages to return at most
+            note_ids: Only search these notes; all of the user's notes if None
+
+        Returns:
+            Passages best first, scored by cosine similarity. Passages of notes
+            named in note_ids are returned however low they score.
+        """
+        async with self._lock(user_id):
+            index = await self._get(user_id)
+        if not len(index):
+            return []
+
+        query = (await self.embed([question]))[0]
+        min_score = settings.RAG_MIN_SCORE if note_ids is None else -1.0
+        return index.search(query, top_k, note_ids, min_score)
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "users_loaded": len(self._users),
+            "passages_loaded": sum(len(index) for index in self._users.values()),
+            "embedded_passages": self.embedded_passages,
+            "reused_passages": self.reused_passages,
+            "backfills_running": len(self._backfills),
+            "writes_pending": len(self._writes)
+        }
+
+
+async def _embed_texts(texts: List[str]) -> np.ndarray:
+    from app.ai.embeddings import embed_texts
+    return await embed_texts(texts)
+
+
+note_index = NoteIndex(
+    embed=_embed_texts,
+    model_name=settings.EMBEDDING_MODEL_NAME,
+    passage_tokens=settings.RAG_PASSAGE_TOKENS,
+    max_users=settings.RAG_INDEX_MAX_USERS,
+    ttl_seconds=settings.RAG_INDEX_TTL_SECONDS,
+    enabled=settings.RAG_ENABLED
+)
@@ -0,0 +1,194 @@
+"""
+One shared OpenAI client per process, with rate limiting and retries
+
+Every request goes through a per-model limiter: a semaphore caps
+concurrent requests, and token buckets keep requests and tokens per
+minute under the account's quota. Rate limit, timeout, connection and
+server errors are retried with exponential backoff, honoring the
+Retry-After header when the API sends one.
+"""
+import asyncio
+import contextlib
+import logging
+import random
+import time
+from typing import Optional
+
+import httpx
+import openai
+from openai import AsyncOpenAI
+
+from app.config import settings
+from app.ai.tokens import count_message_tokens
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.InternalServerError,
+)
+
+DEFAULT_MODEL_LIMITS = {"concurrency": 8}
+
+
+class TokenBucket:
+    """Budget of `per_minute` units that refills continuously"""
+
+    def __init__(self, per_minute: int):
+        self.capacity = per_minute
+        self.rate = per_minute / 60
+        self.available = float(per_minute)
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.available = min(self.capacity, self.available + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, amount: float):
+        """Wait until amount units are available and take them"""
+        # A request larger than the whole budget waits for a full bucket
+        amount = min(amount, self.capacity)
+
+        # Waiters are served in arrival order
+        async with self._lock:
+            self._refill()
+            while self.available < amount:
+                await asyncio.sleep((amount - self.available) / self.rate)
+                self._refill()
+            self.available -= amount
+
+
+class ModelLimiter:
+    def __init__(self, concurrency: int, rpm: Optional[int] = None, tpm: Optional[int] = None):
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.requests = TokenBucket(rpm) if rpm else None
+        self.tokens = TokenBucket(tpm) if tpm else None
+
+    @contextlib.asynccontextmanager
+    async def slot(self, tokens: int = 0):
+        """Hold one concurrent request slot, after budgeting it against RPM/TPM"""
+        async with self.semaphore:
+            if self.requests:
+                await self.requests.acquire(1)
+            if self.tokens and tokens:
+                await self.tokens.acquire(tokens)
+            yield
+
+
+_limiters = {}
+
+
+def get_limiter(model: str) -> ModelLimiter:
+    if model not in _limiters:
+        limits = settings.OPENAI_MODEL_LIMITS.get(model, DEFAULT_MODEL_LIMITS)
+        _limiters[model] = ModelLimiter(
+            concurrency=limits.get("concurrency", DEFAULT_MODEL_LIMITS["concurrency"]),
+            rpm=limits.get("rpm"),
+            tpm=limits.get("tpm")
+        )
+    return _limiters[model]
+
+
+def retry_delay(error: Exception, attempt: int) -> float:
+    """Seconds to wait before retry number attempt (0-based)"""
+    response = getattr(error, "response", None)
+    if response is not None:
+        headers = response.headers
+        try:
+            if "retry-after-ms" in headers:
+                return float(headers["retry-after-ms"]) / 1000
+            if "retry-after" in headers:
+                return float(headers["retry-after"])
+        except ValueError:
+            pass
+
+    # Full jitter keeps a burst of failed requests from retrying in lockstep
+    backoff = min(settings.OPENAI_MAX_BACKOFF_SECONDS, settings.OPENAI_BACKOFF_SECONDS * 2 ** attempt)
+    return random.uniform(backoff / 2, backoff)
+
+
+async def with_retries(model: str, tokens: int, call):
+    """Await call() inside the model's limiter, retrying transient errors"""
+    limiter = get_limiter(model)
+    attempt = 0
+    while True:
+        try:
+            async with limiter.slot(tokens):
+                return await call()
+        except RETRYABLE_ERRORS as e:
+            if attempt >= settings.OPENAI_MAX_RETRIES:
+                raise
+            delay = retry_delay(e, attempt)
+            logger.warning(f"OpenAI {model} request failed ({type(e).__name__}), retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+            attempt += 1
+
+
+client = AsyncOpenAI(
+    api_key=settings.OPENAI_API_KEY,
+    timeout=settings.OPENAI_TIMEOUT_SECONDS,
+    # Retries happen in with_retries so they respect the limiters
+    max_retries=0,
+    http_client=httpx.AsyncClient(
+        timeout=settings.OPENAI_TIMEOUT_SECONDS,
+        limits=httpx.Limits(
+            max_connections=settings.OPENAI_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.OPENAI_MAX_CONNECTIONS
+        )
+    )
+)
+
+
+async def create_chat_completion(**request):
+    """chat.completions.create through the limiter with retries"""
+    tokens = count_message_tokens(request["messages"], request["model"]) + request.get("max_tokens", 0)
+    return await with_retries(
+        request["model"], tokens, lambda: client.chat.completions.create(**request)
+    )
+
+
+@contextlib.asynccontextmanager
+async def stream_chat_completion(**request):
+    """
+    Open a streamed chat completion, holding the model's slot until it is closed
+
+    Only opening the stream is retried; errors mid-stream reach the reader.
+    """
+    model = request["model"]
+    limiter = get_limiter(model)
+    tokens = count_message_tokens(request["messages"], model) + request.get("max_tokens", 0)
+    attempt = 0
+
+    async with limiter.slot(tokens):
+        while True:
+            try:
+                stream = await client.chat.completions.create(**request, stream=True)
+                break
+            except RETRYABLE_ERRORS as e:
+                if attempt >= settings.OPENAI_MAX_RETRIES:
+                    raise
+                delay = retry_delay(e, attempt)
+                logger.warning(f"OpenAI {model} stream failed to open ({type(e).__name__}), retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+                attempt += 1
+
+        try:
+            yield stream
+        finally:
+            # Stops generation if the reader went away early
+            await stream.response.aclose()
+
+
+async def generate_images(**request):
+    """images.generate through the limiter with retries"""
+    return await with_retries(
+        request["model"], 0, lambda: client.images.generate(**request)
+    )
+
+
+async def close_client():
+    await client.close()
@@ -0,0 +1,82 @@
+import asyncio
+import functools
+import hashlib
+import json
+from typing import Awaitable, Callable, Dict
+
+
+class _Call:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Coalesce identical concurrent calls into one execution
+
+    The first caller for a key starts the work in its own task; callers
+    that arrive while it runs await the same task. Every caller gets the
+    result or the exception. A caller that is cancelled only stops
+    waiting, and the work is cancelled once nobody is waiting for it.
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.coalesced = 0
+        self._in_flight: Dict[str, _Call] = {}
+
+    async def run(self, key: str, fn: Callable[[], Awaitable]):
+        self.calls += 1
+        call = self._in_flight.get(key)
+        if call is None:
+            call = _Call(asyncio.ensure_future(fn()))
+            self._in_flight[key] = call
+            call.task.add_done_callback(functools.partial(self._forget, key, call))
+        else:
+            self.coalesced += 1
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                # Forget the call first, so a caller arriving before the task
+                # finishes cancelling starts fresh work instead of joining it
+                if self._in_flight.get(key) is call:
+                    del self._in_flight[key]
+                call.task.cancel()
+
+    def _forget(self, key: str, call: _Call, task: asyncio.Task):
+        if self._in_flight.get(key) is call:
+            del self._in_flight[key]
+        # Nobody may be left to see the exception; mark it retrieved
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> dict:
+        return {
+            "calls": self.calls,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._in_flight)
+        }
+
+
+single_flight = SingleFlight()
+
+
+def make_key(name: str, args: tuple, kwargs: dict) -> str:
+    payload = json.dumps([name, args, kwargs], sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def coalesced(fn):
+    """Decorator: concurrent calls with identical arguments share one execution"""
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        key = make_key(fn.__qualname__, args, kwargs)
+        return await single_flight.run(key, lambda: fn(*args, **kwargs))
+    return wrapper
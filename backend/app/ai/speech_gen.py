@@ -1,33 +1,52 @@
 
-from transformers import SpeechT5Processor, SpeechT5ForTextToSpeech, SpeechT5HifiGan
-from datasets import load_dataset
+from transformers import SpeechT5Processor, SpeechT5ForTextToSpeech, SpeechT5HifiGan, SpeechT5Tokenizer
 import soundfile as sf
 import numpy as np
-import tempfile
+import asyncio
+import collections
+import functools
 import os
+import threading
+import time
 import torch
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
 from app.config import settings
 from app.utils.file_storage import s3_storage
+from app.ai.tts_pool import tts_pool
+from app.ai.tts_cache import TTSCache, tts_cache
+from app.ai.audio import AudioEncoder, EncodedAudio, SpeechAssembler, open_audio
+from app.ai.voices import VoiceTable, build_voice_table
+from app.ai.tts_text import chunk_hash, plan_chunk_reuse, preprocess_text, split_text_into_chunks
 import logging
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Speaker embeddings for every voice, memory-mapped on first use
+voice_table = VoiceTable(settings.TTS_VOICES_PATH)
+
+TTS_BACKENDS = ("eager", "int8")
+
 class TextToSpeechBot:
     """
     Text-to-Speech Bot using Hugging Face SpeechT5 model
     Takes text input and generates audio output
     """
     
-    def __init__(self, model_name: str = "microsoft/speecht5_tts"):
+    def __init__(self, model_name: str = settings.TTS_MODEL_NAME, backend: str = settings.TTS_BACKEND):
         """
         Initialize the TTS bot with pretrained models
         
         Args:
             model_name: Hugging Face model identifier
+            backend: "eager" for fp32 PyTorch, "int8" for dynamically quantized CPU inference
         """
+        if backend not in TTS_BACKENDS:
+            raise ValueError(f"Unknown TTS backend '{backend}', expected one of {', '.join(TTS_BACKENDS)}")
+        
         self.model_name = model_name
+        self.backend = backend
         self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
         logger.info(f"Using device: {self.device}")
         
@@ -36,6 +55,8 @@ class TextToSpeechBot:
         self.model = None
         self.vocoder = None
         self.speaker_embeddings = None
+        self.voice_table = voice_table
+        self._voice_embeddings: Dict[str, torch.Tensor] = {}
         
         self._load_models()
     
@@ -55,6 +76,9 @@ class TextToSpeechBot:
             self.model.to(self.device)
             self.vocoder.to(self.device)
             
+            if self.backend == "int8":
+                self._quantize_model()
+            
             # Load speaker embeddings for voice characteristics
             self._load_speaker_embeddings()
             
@@ -64,26 +88,60 @@ class TextToSpeechBot:
             logger.error(f"Error loading models: {str(e)}")
             raise
     
+    def _quantize_model(self):
+        """Swap the transformer's Linear layers for dynamically quantized int8 ones"""
+        if self.device.type != "cpu":
+            logger.warning("int8 TTS backend only applies on CPU, keeping fp32 weights")
+            return
+        
+        # Linear layers dominate the encoder/decoder cost. HiFi-GAN is all
+        # convolutions, which dynamic quantization does not cover, so it stays fp32.
+        self.model = torch.ao.quantization.quantize_dynamic(
+            self.model,
+            {torch.nn.Linear},
+            dtype=torch.qint8
+        )
+        logger.info("Using dynamically quantized int8 SpeechT5 model")
+    
     def _load_speaker_embeddings(self):
-        """Load speaker embeddings for voice customization"""
-        try:
-            # Load CMU ARCTIC dataset for speaker embeddings
-            embeddings_dataset = load_dataset(
-                "Matthijs/cmu-arctic-xvectors", 
-                split="validation"
+        """Load the default voice's speaker embeddings, building the voice table if needed"""
+        if not self.voice_table.available:
+            logger.warning(
+                f"Voice table not found at {settings.TTS_VOICES_PATH}, building it from the x-vector dataset; "
+                "run `python -m app.ai.voices build` ahead of time to skip this"
             )
+            # Raises if the dataset cannot be fetched, so the worker fails to
+            # load (and /health/ready reports it) instead of using a random voice
+            build_voice_table(settings.TTS_VOICES_PATH)
+        
+        self.speaker_embeddings = self.get_speaker_embeddings("default")
+        if self.speaker_embeddings is None:
+            raise RuntimeError(f"Voice table at {settings.TTS_VOICES_PATH} has no default voice")
+        logger.info("Speaker embeddings loaded successfully!")
+    
+    def get_speaker_embeddings(self, voice_id: str = "default") -> torch.Tensor:
+        """
+        Speaker embeddings for a voice, cached on the model device
+        
+        Args:
+            voice_id: Voice from the voice table; unknown voices use the default
             
-            # Use first speaker embedding as default
-            self.speaker_embeddings = torch.tensor(
-                embeddings_dataset[7306]["xvector"]
-            ).unsqueeze(0).to(self.device)
-            
-            logger.info("Speaker embeddings loaded successfully!")
-            
-        except Exception as e:
-            logger.warning(f"Could not load speaker embeddings: {str(e)}")
-            # Create default embeddings if dataset fails
-            self.speaker_embeddings = torch.randn((1, 512)).to(self.device)
+        Returns:
+            Tensor of shape (1, 512)
+        """
+        embeddings = self._voice_embeddings.get(voice_id)
+        if embeddings is not None:
+            return embeddings
+        
+        try:
+            vector = self.voice_table.get_embedding(voice_id)
+        except (KeyError, OSError) as e:
+            logger.warning(f"Falling back to the default voice: {str(e)}")
+            return self.speaker_embeddings
+        
+        embeddings = torch.from_numpy(vector).unsqueeze(0).to(self.device)
+        self._voice_embeddings[voice_id] = embeddings
+        return embeddings
     
     def preprocess_text(self, text: str) -> str:
         """
@@ -95,47 +153,40 @@ class TextToSpeechBot:
         Returns:
             Processed text ready for TTS
         """
-        # Remove excessive whitespace
-        text = " ".join(text.split())
-        
-        # Add pauses for better readability
-        text = text.replace(". ", ". ... ")
-        text = text.replace("? ", "? ... ")
-        text = text.replace("! ", "! ... ")
-        
-        # Handle common abbreviations
-        replacements = {
-            "e.g.": "for example",
-            "i.e.": "that is",
-            "etc.": "etcetera",
-            "vs.": "versus",
-            "Dr.": "Doctor",
-            "Prof.": "Professor",
-            "&": "and"
-        }
-        
-        for abbrev, full_form in replacements.items():
-            text = text.replace(abbrev, full_form)
-        
-        # Limit text length for optimal processing
-        if len(text) > 600:
-            logger.warning("Text is long, consider splitting into chunks")
-        
-        return text
+        return preprocess_text(text)
+    
+    def count_tokens(self, chunk: str) -> int:
+        """Number of model tokens a chunk uses once preprocessed"""
+        return len(self.processor.tokenizer(self.preprocess_text(chunk))["input_ids"])
+    
+    def _check_input_length(self, input_ids: torch.Tensor):
+        """SpeechT5's text positional encoding has a hard length limit"""
+        limit = self.model.config.max_text_positions
+        if input_ids.shape[-1] > limit:
+            raise ValueError(
+                f"Text is {input_ids.shape[-1]} tokens, over the model limit of {limit}; "
+                "split it with split_text_into_chunks first"
+            )
+    
+    def cache_key(self, chunk: str, voice_id: str = "default") -> Optional[str]:
+        """Key of a chunk's audio in the TTS cache"""
+        return chunk_cache_key(chunk, voice_id, self.model_name, self.backend)
     
     def text_to_speech(
         self, 
         text: str, 
-        output_path: str = "output.wav",
-        sample_rate: int = 16000
+        output_path: Optional[str] = None,
+        sample_rate: int = 16000,
+        voice_id: str = "default"
     ) -> dict:
         """
         Convert text to speech audio
         
         Args:
             text: Text to convert to speech
-            output_path: Path to save audio file
+            output_path: Optional path to also save the audio as a WAV file
             sample_rate: Audio sample rate
+            voice_id: Voice to speak with
             
         Returns:
             Dictionary containing processing results
@@ -145,26 +196,12 @@ class TextToSpeechBot:
             processed_text = self.preprocess_text(text)
             logger.info(f"Processing text: {processed_text[:100]}...")
             
-            # Tokenize text
-            inputs = self.processor(
-                text=processed_text, 
-                return_tensors="pt"
-            ).to(self.device)
+            audio_array = self._generate_audio(processed_text, voice_id)
             
-            # Generate speech
-            with torch.no_grad():
-                speech = self.model.generate_speech(
-                    inputs["input_ids"], 
-                    self.speaker_embeddings, 
-                    vocoder=self.vocoder
-                )
-            
-            # Convert to numpy array
-            audio_array = speech.cpu().numpy()
-            
-            # Save audio file
-            sf.write(output_path, audio_array, sample_rate)
-            logger.info(f"Audio saved to: {output_path}")
+            # Save audio file only when asked to
+            if output_path:
+                sf.write(output_path, audio_array, sample_rate)
+                logger.info(f"Audio saved to: {output_path}")
             
             return {
                 "success": True,
@@ -182,51 +219,283 @@ class TextToSpeechBot:
                 "error": str(e)
             }
     
+    def _generate_audio(self, processed_text: str, voice_id: str = "default") -> np.ndarray:
+        """Run the model and vocoder on already preprocessed text"""
+        # Tokenize text
+        inputs = self.processor(
+            text=processed_text, 
+            return_tensors="pt"
+        ).to(self.device)
+        self._check_input_length(inputs["input_ids"])
+        
+        # Generate speech
+        with torch.no_grad():
+            speech = self.model.generate_speech(
+                inputs["input_ids"], 
+                self.get_speaker_embeddings(voice_id), 
+                vocoder=self.vocoder
+            )
+        
+        # Convert to numpy array
+        return speech.cpu().numpy()
+    
+    def text_to_speech_batch(
+        self,
+        texts: List[str],
+        voice_id: str = "default",
+        threshold: float = 0.5,
+        maxlenratio: float = 20.0
+    ) -> List[np.ndarray]:
+        """
+        Convert several texts to speech in a single padded model batch
+
+        Args:
+            texts: Texts to convert to speech
+            voice_id: Voice to speak with
+            threshold: Stop token probability that ends a sequence
+            maxlenratio: Maximum spectrogram steps per input token
+
+        Returns:
+            One audio array per input text, in input order
+        """
+        processed_texts = [self.preprocess_text(text) for text in texts]
+        inputs = self.processor(
+            text=processed_texts,
+            padding=True,
+            return_tensors="pt"
+        ).to(self.device)
+        self._check_input_length(inputs["input_ids"])
+
+        with torch.no_grad():
+            return self._generate_speech_batch(
+                inputs["input_ids"],
+                inputs["attention_mask"],
+                self.get_speaker_embeddings(voice_id),
+                threshold=threshold,
+                maxlenratio=maxlenratio
+            )
+
+    def _generate_speech_batch(
+        self,
+        input_ids: torch.Tensor,
+        attention_mask: torch.Tensor,
+        speaker_embeddings: torch.Tensor,
+        threshold: float = 0.5,
+        maxlenratio: float = 20.0
+    ) -> List[np.ndarray]:
+        """
+        Batched version of SpeechT5's autoregressive generation loop
+
+        Every sequence in the batch shares the encoder/decoder passes but stops
+        independently, either on its own stop token or on its own length limit.
+        Finished sequences keep decoding until the whole batch is done and their
+        extra frames are discarded.
+        """
+        model = self.model
+        config = model.config
+        batch_size = input_ids.size(0)
+        reduction_factor = config.reduction_factor
+        speaker_embeddings = speaker_embeddings.expand(batch_size, -1)
+
+        encoder_out = model.speecht5.encoder(
+            input_values=input_ids,
+            attention_mask=attention_mask,
+            return_dict=True
+        )
+        encoder_hidden_states = encoder_out.last_hidden_state
+
+        input_lengths = attention_mask.sum(dim=1).float()
+        max_steps = (input_lengths * maxlenratio / reduction_factor).long().clamp(min=1)
+        stop_steps = torch.zeros(batch_size, dtype=torch.long, device=input_ids.device)
+
+        # Start every sequence with an all-zeros mel frame
+        output_sequence = encoder_hidden_states.new_zeros(batch_size, 1, config.num_mel_bins)
+        spectrum_steps = []
+        past_key_values = None
+        step = 0
+
+        while True:
+            step += 1
+
+            decoder_hidden_states = model.speecht5.decoder.prenet(output_sequence, speaker_embeddings)
+            decoder_out = model.speecht5.decoder.wrapped_decoder(
+                hidden_states=decoder_hidden_states[:, -1:],
+                attention_mask=None,
+                encoder_hidden_states=encoder_hidden_states,
+                encoder_attention_mask=attention_mask,
+                past_key_values=past_key_values,
+                use_cache=True,
+                return_dict=True
+            )
+            last_decoder_output = decoder_out.last_hidden_state.squeeze(1)
+            past_key_values = decoder_out.past_key_values
+
+            spectrum = model.speech_decoder_postnet.feat_out(last_decoder_output)
+            spectrum = spectrum.view(batch_size, reduction_factor, config.num_mel_bins)
+            spectrum_steps.append(spectrum)
+            output_sequence = torch.cat((output_sequence, spectrum[:, -1:, :]), dim=1)
+
+            # Per-sequence stop detection
+            prob = torch.sigmoid(model.speech_decoder_postnet.prob_out(last_decoder_output))
+            stopped = (prob.sum(dim=-1) >= threshold) | (step >= max_steps)
+            stop_steps[(stop_steps == 0) & stopped] = step
+
+            if bool((stop_steps > 0).all()):
+                break
+
+        # (batch, steps * reduction_factor, mel_bins)
+        spectrograms = torch.stack(spectrum_steps, dim=1).flatten(1, 2)
+        frame_counts = (stop_steps * reduction_factor).tolist()
+
+        # Run the postnet on each sequence's own frames so padding never leaks in
+        refined = [
+            model.speech_decoder_postnet.postnet(spectrograms[i:i + 1, :frame_counts[i]])[0]
+            for i in range(batch_size)
+        ]
+
+        # Vocode the whole batch at once and trim each waveform to its own length
+        padded = torch.nn.utils.rnn.pad_sequence(refined, batch_first=True)
+        waveforms = self.vocoder(padded)
+        if waveforms.dim() == 1:
+            waveforms = waveforms.unsqueeze(0)
+        hop_length = int(np.prod(self.vocoder.config.upsample_rates))
+
+        return [
+            waveforms[i, :frame_counts[i] * hop_length].cpu().numpy()
+            for i in range(batch_size)
+        ]
+
+    def _synthesize_chunks_batched(
+        self,
+        chunks: List[str],
+        batch_size: int,
+        voice_id: str = "default"
+    ) -> List[np.ndarray]:
+        """Synthesize chunks in length-sorted batches and return audio in chunk order"""
+        # Group chunks of similar length together to keep padding low
+        order = sorted(range(len(chunks)), key=lambda i: len(chunks[i]))
+        audio_arrays = [None] * len(chunks)
+
+        for start in range(0, len(order), batch_size):
+            batch_indexes = order[start:start + batch_size]
+            batch_audio = self.text_to_speech_batch([chunks[i] for i in batch_indexes], voice_id)
+            for index, audio_array in zip(batch_indexes, batch_audio):
+                audio_arrays[index] = audio_array
+
+        return audio_arrays
+
+    def _synthesize_cached(
+        self,
+        chunks: List[str],
+        batch_size: int,
+        voice_id: str = "default"
+    ) -> List[Optional[np.ndarray]]:
+        """Synthesize chunks through the TTS cache; None for chunks that failed"""
+        cache_keys = [self.cache_key(chunk, voice_id) for chunk in chunks]
+        audio_arrays = [cached_chunk_audio(key) for key in cache_keys]
+        missing = [i for i, audio_array in enumerate(audio_arrays) if audio_array is None]
+        
+        if batch_size > 1 and len(missing) > 1:
+            # Batched mode: several chunks share each encoder/decoder pass
+            try:
+                batch_audio = self._synthesize_chunks_batched([chunks[i] for i in missing], batch_size, voice_id)
+                for i, audio_array in zip(missing, batch_audio):
+                    audio_arrays[i] = audio_array
+                    cache_chunk_audio(cache_keys[i], audio_array)
+                missing = []
+            except Exception as e:
+                logger.error(f"Batched synthesis failed, falling back to sequential: {str(e)}")
+        
+        for i in missing:
+            result = self.text_to_speech(chunks[i], voice_id=voice_id)
+            if result["success"]:
+                audio_arrays[i] = result["audio_array"]
+                cache_chunk_audio(cache_keys[i], audio_arrays[i])
+            else:
+                logger.error(f"Chunk {i + 1} failed: {result['error']}")
+        
+        return audio_arrays
+    
     def process_long_text(
         self, 
         text: str, 
-        output_dir: str = "audio_output",
-        max_chunk_size: int = 500
+        output_dir: Optional[str] = settings.TTS_DEBUG_CHUNK_DIR,
+        max_chunk_tokens: int = settings.TTS_MAX_CHUNK_TOKENS,
+        batch_size: int = settings.TTS_BATCH_SIZE,
+        voice_id: str = "default",
+        audio_format: str = "wav",
+        bitrate: Optional[int] = None,
+        on_chunk: Optional[Callable[[int, int], None]] = None
     ) -> dict:
         """
         Process long text by splitting into chunks
         
+        Chunks are synthesized one batch at a time and appended to a single
+        encoder as they are produced, so memory stays flat however long the
+        text is.
+        
         Args:
             text: Long text to convert
-            output_dir: Directory to save audio files
-            max_chunk_size: Maximum characters per chunk
+            output_dir: Optional directory to also write every chunk and the
+                combined audio to, for debugging
+            max_chunk_tokens: Maximum model tokens per chunk
+            batch_size: Chunks synthesized per model batch (1 = sequential)
+            voice_id: Voice to speak with
+            audio_format: Format of the combined audio, one of AUDIO_FORMATS
+            bitrate: Target kbps for lossy formats
+            on_chunk: Called with (chunks_done, chunks_total) as each chunk is added
             
         Returns:
-            Processing results with multiple audio files
+            Processing results with per-chunk metadata and the encoded combined audio
         """
         try:
             # Create output directory
-            os.makedirs(output_dir, exist_ok=True)
+            if output_dir:
+                os.makedirs(output_dir, exist_ok=True)
             
             # Split text into chunks
-            chunks = self._split_text_into_chunks(text, max_chunk_size)
+            chunks = self._split_text_into_chunks(text, max_chunk_tokens)
             
+            assembler = speech_assembler(audio_format, bitrate)
             results = []
-            all_audio = []
+            window = max(batch_size, 1)
             
-            for i, chunk in enumerate(chunks):
-                output_path = os.path.join(output_dir, f"part_{i+1}.wav")
-                
-                result = self.text_to_speech(chunk, output_path)
-                result["chunk_index"] = i + 1
-                result["chunk_text"] = chunk[:100] + "..." if len(chunk) > 100 else chunk
+            for start in range(0, len(chunks), window):
+                window_chunks = chunks[start:start + window]
                 
-                if result["success"]:
-                    all_audio.append(result["audio_array"])
-                
-                results.append(result)
+                for offset, audio_array in enumerate(self._synthesize_cached(window_chunks, batch_size, voice_id)):
+                    i = start + offset
+                    chunk = window_chunks[offset]
+                    result = {
+                        "success": audio_array is not None,
+                        "chunk_index": i + 1,
+                        "chunk_text": chunk[:100] + "..." if len(chunk) > 100 else chunk,
+                        "output_file": None
+                    }
+                    
+                    if audio_array is not None:
+                        if output_dir:
+                            result["output_file"] = os.path.join(output_dir, f"part_{i+1}.wav")
+                            sf.write(result["output_file"], audio_array, 16000)
+                        assembler.add(audio_array)
+                        start_sample, end_sample = assembler.offsets[-1]
+                        result["samples"] = end_sample - start_sample
+                        result["duration"] = (end_sample - start_sample) / 16000
+                    
+                    results.append(result)
+                    
+                    if on_chunk:
+                        on_chunk(i + 1, len(chunks))
+            
+            encoded = assembler.close()
             
-            # Combine all audio into single file
-            if all_audio:
-                combined_audio = np.concatenate(all_audio)
-                combined_path = os.path.join(output_dir, "combined_audio.wav")
-                sf.write(combined_path, combined_audio, 16000)
-                logger.info(f"Combined audio saved to: {combined_path}")
+            if assembler.encoder.samples:
+                combined_path = None
+                if output_dir:
+                    combined_path = os.path.join(output_dir, f"combined_audio{encoded.extension}")
+                    with open(combined_path, "wb") as f:
+                        f.write(encoded.data)
+                    logger.info(f"Combined audio saved to: {combined_path}")
                 
                 return {
                     "success": True,
@@ -234,7 +503,9 @@ class TextToSpeechBot:
                     "results": results,
                     "output_directory": output_dir,
                     "combined_file": combined_path,
-                    "combined_audio": combined_audio
+                    "audio": encoded,
+                    "samples": assembler.encoder.samples,
+                    "duration": encoded.duration
                 }
             
             return {
@@ -249,94 +520,418 @@ class TextToSpeechBot:
                 "error": str(e)
             }
     
-    def _split_text_into_chunks(self, text: str, max_chunk_size: int = 500) -> list:
-        """Split text into smaller chunks for processing"""
-        sentences = text.replace('!', '.').replace('?', '.').split('.')
-        chunks = []
-        current_chunk = ""
-        
-        for sentence in sentences:
-            sentence = sentence.strip()
-            if not sentence:
-                continue
-                
-            if len(current_chunk + sentence) < max_chunk_size:
-                current_chunk += sentence + ". "
-            else:
-                if current_chunk:
-                    chunks.append(current_chunk.strip())
-                current_chunk = sentence + ". "
+    def synthesize_chunks(
+        self,
+        chunks: List[str],
+        voice_id: str = "default",
+        batch_size: int = settings.TTS_BATCH_SIZE
+    ) -> List[np.ndarray]:
+        """
+        Synthesize already split chunks without writing any files
         
-        if current_chunk:
-            chunks.append(current_chunk.strip())
+        Args:
+            chunks: Text chunks from split_text_into_chunks
+            voice_id: Requested voice
+            batch_size: Chunks synthesized per model batch (1 = sequential)
+            
+        Returns:
+            One audio array per chunk, in chunk order
+        """
+        if batch_size > 1 and len(chunks) > 1:
+            return self._synthesize_chunks_batched(chunks, batch_size, voice_id)
         
-        return chunks
+        return [self._generate_audio(self.preprocess_text(chunk), voice_id) for chunk in chunks]
+    
+    def warmup(self):
+        """Run tiny syntheses so lazy kernels and allocations happen before real traffic"""
+        start = time.perf_counter()
+        self._generate_audio(self.preprocess_text("Warming up."))
+        if settings.TTS_BATCH_SIZE > 1:
+            self.text_to_speech_batch(["Warming up.", "Warming up the batch path."])
+        logger.info(f"TTS warmup finished in {time.perf_counter() - start:.1f}s")
+    
+    def _split_text_into_chunks(self, text: str, max_chunk_tokens: int = settings.TTS_MAX_CHUNK_TOKENS) -> list:
+        """Split text into smaller chunks for processing"""
+        return split_text_into_chunks(text, max_chunk_tokens, self.count_tokens)
+
+
+def chunk_cache_key(
+    chunk: str,
+    voice_id: str = "default",
+    model_name: str = settings.TTS_MODEL_NAME,
+    backend: str = settings.TTS_BACKEND
+) -> Optional[str]:
+    """Key of a chunk's audio in the TTS cache, or None if the chunk must not be cached"""
+    # Keyed by the voice's embedding too, so audio never outlives the voice it
+    # was made with. Without the voice table there is no fingerprint, and the
+    # bare voice id is the key older deploys stored random-voice audio under
+    fingerprint = voice_table.fingerprint(voice_id)
+    if fingerprint is None:
+        return None
+    # Other backends produce slightly different audio, so they get their own entries
+    model_id = model_name if backend == "eager" else f"{model_name}/{backend}"
+    return TTSCache.make_key(preprocess_text(chunk), f"{voice_id}@{fingerprint}", model_id, 16000)
+
+
+def cached_chunk_audio(key: Optional[str]) -> Optional[np.ndarray]:
+    """Cached audio for a chunk_cache_key, or None"""
+    return tts_cache.get(key) if key else None
+
+
+def cache_chunk_audio(key: Optional[str], audio_array: np.ndarray):
+    """Store audio under a chunk_cache_key; chunks without a key are not cached"""
+    if key:
+        tts_cache.put(key, audio_array)
+
+
+@functools.lru_cache(maxsize=1)
+def _get_tokenizer() -> SpeechT5Tokenizer:
+    """Tokenizer alone, so the app process can measure chunks without the model"""
+    return SpeechT5Tokenizer.from_pretrained(settings.TTS_MODEL_NAME)
+
+
+def count_tts_tokens(chunk: str) -> int:
+    """Number of model tokens a chunk uses once preprocessed"""
+    return len(_get_tokenizer()(preprocess_text(chunk))["input_ids"])
+
+
+async def load_tokenizer():
+    """Load the chunking tokenizer at startup rather than in the first request"""
+    loop = asyncio.get_running_loop()
+    try:
+        await loop.run_in_executor(None, _get_tokenizer)
+    except Exception as e:
+        logger.warning(f"Could not preload the TTS tokenizer: {str(e)}")
 
 
 # Global instance for easy access
 tts_bot = None
+_tts_bot_lock = threading.Lock()
+
+def configure_torch_threads():
+    """Apply the configured torch intra-op / inter-op thread counts"""
+    if settings.TTS_NUM_THREADS:
+        torch.set_num_threads(settings.TTS_NUM_THREADS)
+    elif settings.TTS_POOL_SIZE > 1:
+        # Split the cores between workers instead of every worker using all of them
+        torch.set_num_threads(max(1, (os.cpu_count() or 1) // settings.TTS_POOL_SIZE))
+    if settings.TTS_INTEROP_THREADS:
+        try:
+            torch.set_num_interop_threads(settings.TTS_INTEROP_THREADS)
+        except RuntimeError as e:
+            # Can only be set once per process, before any parallel work
+            logger.warning(f"Could not set torch interop threads: {str(e)}")
 
 def get_tts_bot():
     """Get or initialize the TTS bot singleton"""
     global tts_bot
     if tts_bot is None:
-        try:
-            tts_bot = TextToSpeechBot()
-        except Exception as e:
-            logger.error(f"Failed to initialize TTS bot: {e}")
-            raise e
+        with _tts_bot_lock:
+            # Another thread may have finished loading while we waited
+            if tts_bot is None:
+                try:
+                    bot = TextToSpeechBot()
+                    if settings.TTS_WARMUP:
+                        bot.warmup()
+                    tts_bot = bot
+                except Exception as e:
+                    logger.error(f"Failed to initialize TTS bot: {e}")
+                    raise e
     return tts_bot
 
 
-async def generate_speech(text: str, voice_id: str = "default") -> tuple:
-    """Generate speech using Hugging Face SpeechT5 model"""
+async def split_speech_text(text: str) -> List[str]:
+    """Split podcast text into the chunks that are synthesized one by one"""
+    # Tokenizing every sentence of a long text is CPU bound, keep it off the event loop
+    loop = asyncio.get_running_loop()
+    chunks = await loop.run_in_executor(
+        None, split_text_into_chunks, text, settings.TTS_MAX_CHUNK_TOKENS, count_tts_tokens
+    )
+    if not chunks:
+        raise Exception("No text to synthesize")
+    return chunks
+
+
+def _write_debug_chunk(index: int, audio_array: np.ndarray):
+    """Write a pipeline chunk to TTS_DEBUG_CHUNK_DIR for inspection"""
+    os.makedirs(settings.TTS_DEBUG_CHUNK_DIR, exist_ok=True)
+    sf.write(os.path.join(settings.TTS_DEBUG_CHUNK_DIR, f"part_{index+1}.wav"), audio_array, 16000)
+
+
+def _log_background_failure(future: asyncio.Future):
+    """Done-callback for executor work nobody awaits, so its errors are not lost"""
+    if not future.cancelled() and future.exception() is not None:
+        logger.error(f"Background TTS write failed: {future.exception()!r}")
+
+
+def _cache_chunks(entries: List[Tuple[Optional[str], np.ndarray]]):
+    for key, audio_array in entries:
+        cache_chunk_audio(key, audio_array)
+
+
+async def _synthesize_batch(batch: List[str], voice_id: str) -> List[np.ndarray]:
+    """Synthesize one batch of chunks, serving what it can from the TTS cache"""
+    loop = asyncio.get_running_loop()
+    
+    # Only chunks missing from the TTS cache go to the worker pool
+    cache_keys = [chunk_cache_key(chunk, voice_id) for chunk in batch]
+    batch_audio = await loop.run_in_executor(None, lambda: [cached_chunk_audio(key) for key in cache_keys])
+    missing = [i for i, audio_array in enumerate(batch_audio) if audio_array is None]
+    
+    if missing:
+        synthesized = await tts_pool.synthesize_chunks([batch[i] for i in missing], voice_id)
+        for i, audio_array in zip(missing, synthesized):
+            batch_audio[i] = audio_array
+        # Written in the background so the audio is not held up by the disk
+        future = loop.run_in_executor(None, _cache_chunks, [(cache_keys[i], batch_audio[i]) for i in missing])
+        future.add_done_callback(_log_background_failure)
+    
+    return batch_audio
+
+
+async def iter_speech_chunks(
+    chunks: List[str],
+    voice_id: str = "default",
+    first_batch_size: Optional[int] = None
+) -> AsyncIterator[Tuple[int, np.ndarray]]:
+    """
+    Synthesize chunks in the TTS worker pool and yield (index, audio) in order
+    
+    Batches are sharded across up to TTS_MAX_WORKERS_PER_PODCAST pool workers
+    at once, so a long podcast uses several cores without starving others.
+    
+    Args:
+        chunks: Chunks from split_speech_text
+        voice_id: Requested voice
+        first_batch_size: Size of the first batch; 1 gets the first audio out fastest
+    """
+    batch_size = max(settings.TTS_BATCH_SIZE, 1)
+    parallelism = max(1, min(settings.TTS_MAX_WORKERS_PER_PODCAST, tts_pool.pool_size))
+    
+    # (start index, chunks) for every batch in reading order
+    batches = []
+    size = first_batch_size or batch_size
+    start = 0
+    while start < len(chunks):
+        batches.append((start, chunks[start:start + size]))
+        start += size
+        size = batch_size
+    
+    loop = asyncio.get_running_loop()
+    in_flight = collections.deque()
+    next_batch = 0
+    
     try:
-        # Create a temporary file to save the audio
-        with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as temp_file:
-            temp_path = temp_file.name
-            
-        # Get TTS bot instance
-        bot = get_tts_bot()
-        
-        # Process text based on length
-        if len(text) > 500:
-            # For longer text, use the process_long_text method
-            temp_dir = tempfile.mkdtemp()
-            result = bot.process_long_text(text, temp_dir, max_chunk_size=500)
+        while next_batch < len(batches) or in_flight:
+            # Keep up to `parallelism` batches rendering ahead of the reader
+            while next_batch < len(batches) and len(in_flight) < parallelism:
+                start, batch = batches[next_batch]
+                in_flight.append((start, asyncio.ensure_future(_synthesize_batch(batch, voice_id))))
+                next_batch += 1
             
-            if result["success"] and "combined_file" in result:
-                temp_path = result["combined_file"]
-                duration = len(result["combined_audio"]) / 16000
-            else:
-                raise Exception("Failed to process long text")
-        else:
-            # For shorter text, use the direct text_to_speech method
-            result = bot.text_to_speech(text, temp_path)
+            start, task = in_flight.popleft()
+            batch_audio = await task
             
-            if not result["success"]:
-                raise Exception(result.get("error", "Unknown error in speech generation"))
-                
-            duration = result["duration"]
+            for offset, audio_array in enumerate(batch_audio):
+                if settings.TTS_DEBUG_CHUNK_DIR:
+                    future = loop.run_in_executor(None, _write_debug_chunk, start + offset, audio_array)
+                    future.add_done_callback(_log_background_failure)
+                yield start + offset, audio_array
+    finally:
+        # Reader stopped early or a batch failed: drop the work still queued
+        for _, task in in_flight:
+            task.cancel()
+
+
+def describe_chunks(chunks: List[str], offsets: List[Tuple[int, int]]) -> List[dict]:
+    """Podcast chunk entries: text, hash and sample offsets in the recording"""
+    return [
+        {"text": chunk, "hash": chunk_hash(chunk), "start": start, "end": end}
+        for chunk, (start, end) in zip(chunks, offsets)
+    ]
+
+
+def speech_assembler(audio_format: Optional[str] = None, bitrate: Optional[int] = None) -> SpeechAssembler:
+    """Assembler for a recording, in the podcast format unless given, with the configured joins"""
+    return SpeechAssembler(
+        AudioEncoder(audio_format or settings.PODCAST_AUDIO_FORMAT, bitrate or settings.PODCAST_AUDIO_BITRATE),
+        trim=settings.TTS_TRIM_SILENCE,
+        threshold_db=settings.TTS_SILENCE_THRESHOLD_DB,
+        pause_ms=settings.TTS_PAUSE_MS,
+        fade_ms=settings.TTS_FADE_MS
+    )
+
+
+async def synthesize_speech(
+    text: str,
+    voice_id: str = "default",
+    on_progress: Optional[Callable[[int, int], Awaitable[None]]] = None
+) -> Tuple[EncodedAudio, List[dict]]:
+    """
+    Synthesize text in the TTS worker pool, batch by batch
+    
+    Each chunk is encoded as soon as it arrives and then released, so the
+    raw audio of the whole podcast is never held at once.
+    
+    Args:
+        text: Text to convert to speech
+        voice_id: Requested voice
+        on_progress: Awaited with (chunks_done, chunks_total) as chunks finish
         
-        # Upload to S3
-        with open(temp_path, "rb") as audio_file:
-            upload_file = audio_file.read()
-            s3_url = await s3_storage.upload_file(
-                upload_file,
-                folder="podcasts",
-                content_type="audio/wav"
-            )
+    Returns:
+        The encoded recording and the chunks it was made from (see describe_chunks)
+    """
+    chunks = await split_speech_text(text)
+    assembler = speech_assembler()
+    loop = asyncio.get_running_loop()
+    
+    if on_progress:
+        await on_progress(0, len(chunks))
+    
+    async for index, audio_array in iter_speech_chunks(chunks, voice_id):
+        # Trimming and encoding are CPU bound, keep them off the event loop
+        await loop.run_in_executor(None, assembler.add, audio_array)
+        
+        if on_progress:
+            await on_progress(index + 1, len(chunks))
+    
+    encoded = await loop.run_in_executor(None, assembler.close)
+    return encoded, describe_chunks(chunks, assembler.offsets)
+
+
+async def plan_speech_reuse(old_chunks: List[dict], text: str) -> List[Tuple[Optional[int], str]]:
+    """
+    Chunk edited text, keeping the stored chunks it leaves unchanged (see plan_chunk_reuse)
+    
+    Returns:
+        (old chunk index, chunk) pairs; the index is None for chunks to synthesize
+    """
+    # Diffing and tokenizing a long text is CPU bound, keep it off the event loop
+    loop = asyncio.get_running_loop()
+    plan = await loop.run_in_executor(
+        None,
+        plan_chunk_reuse,
+        [chunk["text"] for chunk in old_chunks],
+        text,
+        settings.TTS_MAX_CHUNK_TOKENS,
+        count_tts_tokens
+    )
+    if not plan:
+        raise Exception("No text to synthesize")
+    return plan
+
+
+async def resynthesize_speech(
+    audio_url: str,
+    old_chunks: List[dict],
+    plan: List[Tuple[Optional[int], str]],
+    voice_id: str = "default",
+    on_progress: Optional[Callable[[int, int], Awaitable[None]]] = None
+) -> Tuple[EncodedAudio, List[dict], int]:
+    """
+    Re-render edited text, synthesizing only the chunks that changed
+    
+    Unchanged chunks are taken from the TTS cache when it still holds their
+    synthesized audio, otherwise read from the existing recording at their
+    stored sample offsets, and spliced in order with the newly synthesized ones.
+    
+    Args:
+        audio_url: Existing recording
+        old_chunks: Chunk entries stored with that recording
+        plan: Chunks of the edited text, from plan_speech_reuse on old_chunks
+        voice_id: Voice the existing recording was made with
+        on_progress: Awaited with (chunks_done, chunks_total) for synthesized chunks
         
-        # Remove the temporary file(s)
-        if os.path.exists(temp_path):
-            os.unlink(temp_path)
+    Returns:
+        The encoded recording, the new chunk entries and how many chunks were synthesized
+    """
+    loop = asyncio.get_running_loop()
+    
+    # Cached PCM spares decoding, and re-encoding, the lossy recording
+    reused = [index for index, _ in plan if index is not None]
+    cached = await loop.run_in_executor(
+        None,
+        lambda: {index: cached_chunk_audio(chunk_cache_key(old_chunks[index]["text"], voice_id)) for index in reused}
+    )
+    
+    old_audio = None
+    if any(audio_array is None for audio_array in cached.values()):
+        data = await s3_storage.download_bytes(audio_url)
+        old_audio = await loop.run_in_executor(None, open_audio, data)
+    
+    def copy_old_chunk(index: int):
+        if cached[index] is not None:
+            assembler.add(cached[index])
+            return
+        old_audio.seek(old_chunks[index]["start"])
+        audio_array = old_audio.read(old_chunks[index]["end"] - old_chunks[index]["start"], dtype="float32")
+        # Already trimmed and faded when it was first synthesized
+        assembler.add(audio_array, processed=True)
+    
+    changed = [chunk for index, chunk in plan if index is None]
+    synthesized = iter_speech_chunks(changed, voice_id)
+    assembler = speech_assembler()
+    
+    if on_progress:
+        await on_progress(0, len(changed))
+    
+    try:
+        for index, _ in plan:
+            if index is not None:
+                await loop.run_in_executor(None, copy_old_chunk, index)
+                continue
+            
+            done, audio_array = await anext(synthesized)
+            await loop.run_in_executor(None, assembler.add, audio_array)
+            
+            if on_progress:
+                await on_progress(done + 1, len(changed))
+    finally:
+        await synthesized.aclose()
+        if old_audio is not None:
+            old_audio.close()
+    
+    encoded = await loop.run_in_executor(None, assembler.close)
+    return encoded, describe_chunks([chunk for _, chunk in plan], assembler.offsets), len(changed)
+
+
+async def upload_speech(encoded: EncodedAudio) -> dict:
+    """
+    Store an encoded podcast recording
+    
+    Returns:
+        Podcast audio fields: audio_url, audio_format, audio_bytes and bitrate
+    """
+    # Upload straight from memory
+    s3_url = await s3_storage.upload_bytes(
+        encoded.data,
+        folder="podcasts",
+        content_type=encoded.content_type,
+        extension=encoded.extension
+    )
+    
+    return {
+        "audio_url": s3_url,
+        "audio_format": encoded.format,
+        "audio_bytes": len(encoded.data),
+        "bitrate": encoded.bitrate
+    }
+
+
+async def generate_speech(
+    text: str,
+    voice_id: str = "default",
+    on_progress: Optional[Callable[[int, int], Awaitable[None]]] = None
+) -> tuple:
+    """Generate speech using Hugging Face SpeechT5 model"""
+    try:
+        # Synthesis runs in the TTS worker pool so the event loop stays free
+        encoded, chunks = await synthesize_speech(text, voice_id, on_progress)
         
-        # Also clean up the temp directory if it was created
-        if "temp_dir" in locals() and os.path.exists(temp_dir):
-            import shutil
-            shutil.rmtree(temp_dir, ignore_errors=True)
+        audio_info = await upload_speech(encoded)
+        audio_info["chunks"] = chunks
         
-        return s3_url, duration
+        return audio_info, encoded.duration
     
     except Exception as e:
         logger.error(f"Error in speech generation: {str(e)}")
@@ -345,12 +940,4 @@ async def generate_speech(text: str, voice_id: str = "default") -> tuple:
 
 async def get_available_voices():
     """Get a list of available voices for TTS"""
-    # For now, we'll use a fixed set of voice options that represent different embeddings
-    voices = [
-        {"id": "default", "name": "Default", "gender": "neutral", "preview_url": None},
-        {"id": "male1", "name": "Male Voice 1", "gender": "male", "preview_url": None},
-        {"id": "female1", "name": "Female Voice 1", "gender": "female", "preview_url": None},
-        {"id": "neutral1", "name": "Neutral Voice", "gender": "neutral", "preview_url": None}
-    ]
-    
-    return voices
+    return voice_table.list_voices()
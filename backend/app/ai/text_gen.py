@@ -1,43 +1,201 @@
 
-import openai
+import asyncio
 from app.config import settings
+from app.ai.llm_cache import llm_cache
+from app.ai.openai_client import create_chat_completion, stream_chat_completion
+from app.ai.single_flight import coalesced
+from app.ai.tokens import count_tokens
+from app.ai.chunking import split_blocks
 
-openai.api_key = settings.OPENAI_API_KEY
 
-async def generate_notes(text, instruction="Summarize this content and create organized notes"):
-    """Generate study notes from text content using OpenAI"""
-    try:
-        prompt = f"""
-        {instruction}
-        
-        Content to process:
-        {text}
-        
+async def chat_completion(
+    model,
+    messages,
+    max_tokens,
+    temperature,
+    response_format=None,
+    cache=True
+):
+    """
+    Run a chat completion, answering repeats from the LLM cache
+    
+    Pass cache=False where a fresh completion is wanted for the same prompt.
+    """
+    key = None
+    if cache and llm_cache.enabled:
+        key = llm_cache.make_key(model, messages, temperature, max_tokens, response_format)
+        cached = await llm_cache.get(key)
+        if cached:
+            return cached["content"]
+    
+    request = {
+        "model": model,
+        "messages": messages,
+        "max_tokens": max_tokens,
+        "temperature": temperature
+    }
+    if response_format:
+        request["response_format"] = response_format
+    
+    response = await create_chat_completion(**request)
+    content = response.choices[0].message.content
+    
+    if key:
+        await llm_cache.put(
+            key,
+            model,
+            content,
+            prompt_tokens=response.usage.prompt_tokens if response.usage else 0,
+            completion_tokens=response.usage.completion_tokens if response.usage else 0
+        )
+    
+    return content
+
+
+async def chat_completion_stream(
+    model,
+    messages,
+    max_tokens,
+    temperature,
+    cache=True
+):
+    """
+    Run a chat completion and yield its content as it is generated
+    
+    A cached completion is yielded in one piece; a streamed one is cached
+    only if the stream ran to the end.
+    """
+    key = None
+    if cache and llm_cache.enabled:
+        key = llm_cache.make_key(model, messages, temperature, max_tokens)
+        cached = await llm_cache.get(key)
+        if cached:
+            yield cached["content"]
+            return
+    
+    parts = []
+    async with stream_chat_completion(
+        model=model,
+        messages=messages,
+        max_tokens=max_tokens,
+        temperature=temperature
+    ) as stream:
+        async for event in stream:
+            if not event.choices:
+                continue
+            delta = event.choices[0].delta.content
+            if delta:
+                parts.append(delta)
+                yield delta
+    
+    if key:
+        content = "".join(parts)
+        # Streamed responses carry no usage, so estimate it
+        await llm_cache.put(
+            key,
+            model,
+            content,
+            prompt_tokens=sum(count_tokens(message["content"], model) for message in messages),
+            completion_tokens=count_tokens(content, model)
+        )
+
+
+NOTES_SYSTEM_PROMPT = "You are an educational assistant that creates well-organized study notes."
+
+NOTES_FORMAT = """
         Format the notes in a clear structure with:
         - Main topics as headings
         - Key points as bullet points
         - Important definitions highlighted
         - Examples where relevant
         """
+
+
+async def _create_notes(prompt, max_tokens=2000, cache=True):
+    """Run one notes completion"""
+    return await chat_completion(
+        model="gpt-4",
+        messages=[
+            {"role": "system", "content": NOTES_SYSTEM_PROMPT},
+            {"role": "user", "content": prompt}
+        ],
+        max_tokens=max_tokens,
+        temperature=0.5,
+        cache=cache
+    )
+
+
+async def _generate_notes_map_reduce(text, instruction, cache=True):
+    """
+    Build notes for a long source section by section, then merge them
+    
+    Sections are summarized concurrently (at most NOTES_MAX_CONCURRENCY at
+    a time), so latency is about one section plus the merge. If the
+    section notes are themselves too long to merge in one prompt, they go
+    through another round.
+    """
+    # Sections keep the source's paragraphs and markdown structure
+    sections = split_blocks(text, settings.NOTES_SECTION_TOKENS, count_tokens)
+    semaphore = asyncio.Semaphore(settings.NOTES_MAX_CONCURRENCY)
+    
+    async def summarize_section(index, section):
+        prompt = f"""
+        The following is part {index + 1} of {len(sections)} of a longer source.
+        Create detailed notes for this part only, keeping every key point, definition and example.
         
-        response = await openai.chat.completions.create(
-            model="gpt-4",
-            messages=[
-                {"role": "system", "content": "You are an educational assistant that creates well-organized study notes."},
-                {"role": "user", "content": prompt}
-            ],
-            max_tokens=2000,
-            temperature=0.5
-        )
+        Content to process:
+        {section}
+        {NOTES_FORMAT}"""
         
-        return response.choices[0].message.content
+        async with semaphore:
+            return await _create_notes(prompt, max_tokens=settings.NOTES_SECTION_MAX_TOKENS, cache=cache)
+    
+    section_notes = await asyncio.gather(
+        *(summarize_section(index, section) for index, section in enumerate(sections))
+    )
+    merged = "\n\n".join(f"Part {index + 1}:\n{notes}" for index, notes in enumerate(section_notes))
+    
+    if count_tokens(merged) > settings.NOTES_MAP_REDUCE_THRESHOLD:
+        return await _generate_notes_map_reduce(merged, instruction, cache)
+    
+    prompt = f"""
+        {instruction}
+        
+        The content below is notes taken part by part from one long source.
+        Merge them into a single set of notes: combine overlapping topics,
+        remove repetition and keep the order of the source.
+        
+        Notes to merge:
+        {merged}
+        {NOTES_FORMAT}"""
+    
+    return await _create_notes(prompt, cache=cache)
+
+
+@coalesced
+async def generate_notes(text, instruction="Summarize this content and create organized notes", cache=True):
+    """Generate study notes from text content using OpenAI"""
+    try:
+        # Long PDFs and transcripts do not fit in one prompt
+        if count_tokens(text) > settings.NOTES_MAP_REDUCE_THRESHOLD:
+            return await _generate_notes_map_reduce(text, instruction, cache)
+        
+        prompt = f"""
+        {instruction}
+        
+        Content to process:
+        {text}
+        {NOTES_FORMAT}"""
+        
+        return await _create_notes(prompt, cache=cache)
     
     except Exception as e:
         print(f"Error in text generation: {str(e)}")
         raise e
 
 
-async def generate_flashcards(content, count=5):
+@coalesced
+async def generate_flashcards(content, count=5, cache=True):
     """Generate flashcards from content"""
     try:
         prompt = f"""
@@ -61,7 +219,7 @@ async def generate_flashcards(content, count=5):
         Focus on key concepts, definitions, and important facts.
         """
         
-        response = await openai.chat.completions.create(
+        return await chat_completion(
             model="gpt-3.5-turbo",
             messages=[
                 {"role": "system", "content": "You are an educational assistant that creates effective study flashcards."},
@@ -69,21 +227,18 @@ async def generate_flashcards(content, count=5):
             ],
             max_tokens=1500,
             temperature=0.7,
-            response_format={ "type": "json_object" }
+            response_format={ "type": "json_object" },
+            cache=cache
         )
-        
-        return response.choices[0].message.content
     
     except Exception as e:
         print(f"Error in flashcard generation: {str(e)}")
         raise e
 
 
-async def answer_question(question, context=""):
-    """Answer a question based on provided context"""
-    try:
-        if context:
-            prompt = f"""
+def _question_messages(question, context=""):
+    if context:
+        prompt = f"""
             Question: {question}
             
             Use the following context to answer the question:
@@ -91,20 +246,43 @@ async def answer_question(question, context=""):
             
             If you cannot answer the question based on the provided context, say so and provide general information if possible.
             """
-        else:
-            prompt = f"Question: {question}"
-        
-        response = await openai.chat.completions.create(
+    else:
+        prompt = f"Question: {question}"
+    
+    return [
+        {"role": "system", "content": "You are a helpful educational assistant that answers questions clearly and accurately."},
+        {"role": "user", "content": prompt}
+    ]
+
+
+@coalesced
+async def answer_question(question, context="", cache=True):
+    """Answer a question based on provided context"""
+    try:
+        return await chat_completion(
             model="gpt-4",
-            messages=[
-                {"role": "system", "content": "You are a helpful educational assistant that answers questions clearly and accurately."},
-                {"role": "user", "content": prompt}
-            ],
+            messages=_question_messages(question, context),
             max_tokens=1000,
-            temperature=0.4
+            temperature=0.4,
+            cache=cache
         )
-        
-        return response.choices[0].message.content
+    
+    except Exception as e:
+        print(f"Error in question answering: {str(e)}")
+        raise e
+
+
+async def stream_answer(question, context="", cache=True):
+    """Answer a question based on provided context, yielding text as it is generated"""
+    try:
+        async for delta in chat_completion_stream(
+            model="gpt-4",
+            messages=_question_messages(question, context),
+            max_tokens=1000,
+            temperature=0.4,
+            cache=cache
+        ):
+            yield delta
     
     except Exception as e:
         print(f"Error in question answering: {str(e)}")
@@ -0,0 +1,50 @@
+"""
+Token counting for OpenAI chat models
+
+Falls back to a character estimate when tiktoken cannot load an encoding
+(it downloads them on first use, which fails on offline hosts).
+"""
+import functools
+import logging
+from typing import List
+
+import tiktoken
+
+logger = logging.getLogger(__name__)
+
+
+@functools.lru_cache(maxsize=8)
+def _get_encoding(model: str):
+    try:
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        logger.warning(f"No tokenizer for {model}, estimating token counts: {str(e)}")
+        return None
+
+
+def count_tokens(text: str, model: str = "gpt-4") -> int:
+    """Number of tokens text takes up for model"""
+    encoding = _get_encoding(model)
+    if encoding is None:
+        # Roughly four characters per token for English text
+        return len(text) // 4 + 1
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def count_message_tokens(messages: List[dict], model: str = "gpt-4") -> int:
+    """Prompt tokens a list of chat messages uses, including per-message overhead"""
+    return sum(count_tokens(message["content"], model) + 4 for message in messages) + 3
+
+
+def truncate_to_tokens(text: str, max_tokens: int, model: str = "gpt-4") -> str:
+    """Cut text down to at most max_tokens tokens"""
+    encoding = _get_encoding(model)
+    if encoding is None:
+        return text[:max(max_tokens - 1, 0) * 4]
+    tokens = encoding.encode(text, disallowed_special=())
+    if len(tokens) <= max_tokens:
+        return text
+    return encoding.decode(tokens[:max_tokens])
@@ -0,0 +1,295 @@
+"""
+Benchmark SpeechT5 synthesis over a fixed corpus of study texts
+
+Reports load time, first-chunk latency, real-time factor, chars/sec, peak
+RSS and output bytes as JSON, so runs can be compared across commits and
+backends. Each backend runs in its own process, so its peak RSS is not
+inflated by backends measured before it.
+
+Usage:
+    python -m app.ai.tts_benchmark [--batch-size 4] [--repeat 1] [--output bench.json]
+    python -m app.ai.tts_benchmark --backends eager,int8
+    python -m app.ai.tts_benchmark --compare-batching
+"""
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime
+from typing import Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+import torch
+
+from app.ai.audio import mel_distance
+from app.ai.speech_gen import TextToSpeechBot
+from app.ai.tts_cache import tts_cache
+from app.config import settings
+
+
+SAMPLE_TEXT = (
+    "Photosynthesis is the process by which green plants convert light energy into chemical energy. "
+    "It takes place mainly in the chloroplasts of leaf cells. "
+    "The light dependent reactions happen in the thylakoid membranes and produce ATP and NADPH. "
+    "The Calvin cycle then uses that energy to fix carbon dioxide into sugars. "
+    "Chlorophyll absorbs mostly blue and red light, which is why leaves look green. "
+    "Factors such as light intensity, temperature and carbon dioxide concentration limit the rate of photosynthesis. "
+    "Cellular respiration is the reverse process, releasing the stored energy for the cell to use. "
+    "Together the two processes form the basis of the carbon cycle in living systems. "
+)
+
+GENETICS_TEXT = (
+    "DNA is a double helix made of two strands of nucleotides held together by base pairs. "
+    "Adenine pairs with thymine and guanine pairs with cytosine. "
+    "During replication the strands separate and each one serves as a template for a new strand. "
+    "Genes are stretches of DNA that are transcribed into messenger RNA in the nucleus. "
+    "Ribosomes then translate the messenger RNA into a chain of amino acids, three bases at a time. "
+    "Mutations change the sequence of bases and can alter the protein that a gene encodes. "
+    "Some mutations are harmless, while others cause disease or, rarely, give an advantage. "
+)
+
+HISTORY_TEXT = (
+    "The industrial revolution began in Britain in the late eighteenth century. "
+    "Steam engines, first used to pump water out of mines, soon powered factories and railways. "
+    "Textile production moved from homes into mills, where workers kept long and strict hours. "
+    "Cities grew quickly as people left the countryside in search of work. "
+    "Crowded housing and poor sanitation led to outbreaks of cholera and other diseases. "
+    "Over time, reforms limited child labour and improved conditions in factories and towns. "
+)
+
+# Short: one utterance; medium: a paragraph; long: a chapter-sized read
+CORPUS = {
+    "short": "Mitochondria produce most of the cell's ATP through cellular respiration.",
+    "medium": SAMPLE_TEXT,
+    "long": (SAMPLE_TEXT + GENETICS_TEXT + HISTORY_TEXT) * 3,
+}
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Peak resident memory of this process so far, in MiB (never decreases)"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return round(peak / (1024 ** 2 if sys.platform == "darwin" else 1024), 1)
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_mode(
+    bot: TextToSpeechBot,
+    text: str,
+    batch_size: int,
+    repeat: int = 1,
+    audio_format: str = "wav"
+) -> dict:
+    """Time process_long_text on one text, keeping the fastest of `repeat` runs"""
+    best = None
+
+    for _ in range(repeat):
+        first_chunk = []
+        start = time.perf_counter()
+        result = bot.process_long_text(
+            text,
+            output_dir=None,
+            batch_size=batch_size,
+            audio_format=audio_format,
+            bitrate=settings.PODCAST_AUDIO_BITRATE,
+            on_chunk=lambda done, total: first_chunk or first_chunk.append(time.perf_counter() - start)
+        )
+        elapsed = time.perf_counter() - start
+
+        if not result["success"]:
+            raise RuntimeError(result.get("error", "Synthesis failed"))
+
+        if best is None or elapsed < best["elapsed"]:
+            best = {"elapsed": elapsed, "first_chunk": first_chunk[0], "result": result}
+
+    elapsed = best["elapsed"]
+    result = best["result"]
+    audio_seconds = result["duration"]
+    return {
+        "batch_size": batch_size,
+        "text_chars": len(text),
+        "chunks": result["total_chunks"],
+        "wall_seconds": round(elapsed, 3),
+        "first_chunk_seconds": round(best["first_chunk"], 3),
+        "audio_seconds": round(audio_seconds, 3),
+        "chars_per_second": round(len(text) / elapsed, 1),
+        "real_time_factor": round(elapsed / audio_seconds, 3) if audio_seconds else None,
+        "output_bytes": len(result["audio"].data),
+        "peak_rss_mb": peak_rss_mb()
+    }
+
+
+def run_single(bot: TextToSpeechBot, text: str, repeat: int = 1) -> dict:
+    """Time text_to_speech on one utterance"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = bot.text_to_speech(text)
+        timings.append(time.perf_counter() - start)
+
+        if not result["success"]:
+            raise RuntimeError(result.get("error", "Synthesis failed"))
+
+    elapsed = min(timings)
+    return {
+        "text_chars": len(text),
+        "wall_seconds": round(elapsed, 3),
+        "audio_seconds": round(result["duration"], 3),
+        "real_time_factor": round(elapsed / result["duration"], 3) if result["duration"] else None,
+        "peak_rss_mb": peak_rss_mb()
+    }
+
+
+def run_suite(backend: str, batch_size: int, repeat: int = 1, audio_format: str = "wav") -> dict:
+    """
+    Load one backend and run every corpus text through it
+
+    Peak RSS figures are cumulative over the suite, so call this in a fresh
+    process (see run_suite_process) for them to describe this backend alone.
+    """
+    baseline_rss = peak_rss_mb()
+    start = time.perf_counter()
+    bot = TextToSpeechBot(backend=backend)
+    load_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    bot.warmup()
+    warmup_seconds = time.perf_counter() - start
+
+    report = {
+        "load_seconds": round(load_seconds, 3),
+        "warmup_seconds": round(warmup_seconds, 3),
+        "baseline_rss_mb": baseline_rss,
+        "peak_rss_after_load_mb": peak_rss_mb(),
+        "text_to_speech": run_single(bot, CORPUS["short"], repeat),
+        "process_long_text": {
+            name: run_mode(bot, text, batch_size, repeat, audio_format)
+            for name, text in CORPUS.items()
+        }
+    }
+    del bot
+    return report
+
+
+def run_suite_process(backend: str, batch_size: int, repeat: int = 1, audio_format: str = "wav") -> dict:
+    """Run run_suite for one backend in a child process and return its report"""
+    output = subprocess.run(
+        [
+            sys.executable, "-m", "app.ai.tts_benchmark",
+            "--suite", backend,
+            "--batch-size", str(batch_size),
+            "--repeat", str(repeat),
+            "--format", audio_format
+        ],
+        check=True,
+        stdout=subprocess.PIPE,
+        text=True
+    ).stdout
+    # The report is the last line; anything a library printed comes before it
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def compare_backends(backends: list, batch_size: int = 1) -> dict:
+    """Measure how far each backend's audio drifts from eager fp32"""
+    sentences = [sentence.strip() + "." for sentence in SAMPLE_TEXT.split(".") if sentence.strip()]
+    reference = None
+    report = {}
+
+    for backend in ["eager"] + [b for b in backends if b != "eager"]:
+        bot = TextToSpeechBot(backend=backend)
+        audio = bot.synthesize_chunks(sentences, batch_size=batch_size)
+        if reference is None:
+            reference = audio
+
+        distances = [mel_distance(ref, out) for ref, out in zip(reference, audio)]
+        report[backend] = {
+            "mel_distance_vs_eager": round(sum(distances) / len(distances), 4),
+            "duration_ratio_vs_eager": round(sum(len(a) for a in audio) / sum(len(a) for a in reference), 3)
+        }
+        del bot
+
+    return report
+
+
+def compare_batching(text: str, batch_size: int, repeat: int = 1) -> dict:
+    """Time sequential against batched process_long_text on one loaded model"""
+    bot = TextToSpeechBot()
+    bot.warmup()
+
+    sequential = run_mode(bot, text, batch_size=1, repeat=repeat)
+    batched = run_mode(bot, text, batch_size=batch_size, repeat=repeat)
+
+    return {
+        "sequential": sequential,
+        "batched": batched,
+        "speedup": round(sequential["wall_seconds"] / batched["wall_seconds"], 2)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--batch-size", type=int, default=settings.TTS_BATCH_SIZE)
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per measurement, the fastest is kept")
+    parser.add_argument("--backends", default=settings.TTS_BACKEND, help="Comma separated backends, e.g. eager,int8")
+    parser.add_argument("--format", default=settings.PODCAST_AUDIO_FORMAT, help="Output audio format")
+    parser.add_argument("--compare-batching", action="store_true", help="Only compare sequential and batched synthesis")
+    parser.add_argument("--output", help="Also write the JSON report to this file")
+    parser.add_argument("--suite", metavar="BACKEND", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    # Cached chunks would make every run after the first look free
+    tts_cache.enabled = False
+
+    if args.suite:
+        # Child process of run_suite_process: print the one backend's report
+        print(json.dumps(run_suite(args.suite, args.batch_size, args.repeat, args.format)))
+        return
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "torch": torch.__version__,
+        "torch_threads": torch.get_num_threads(),
+        "model": settings.TTS_MODEL_NAME,
+        "batch_size": args.batch_size,
+        "audio_format": args.format,
+    }
+
+    if args.compare_batching:
+        report["batching"] = compare_batching(CORPUS["long"], args.batch_size, args.repeat)
+    else:
+        backends = args.backends.split(",")
+        report["backends"] = {
+            backend: run_suite_process(backend, args.batch_size, args.repeat, args.format)
+            for backend in backends
+        }
+        if len(backends) > 1:
+            for backend, quality in compare_backends(backends).items():
+                report["backends"].setdefault(backend, {})["quality"] = quality
+
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import uuid
+from typing import Optional
+
+import numpy as np
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class TTSCache:
+    """
+    Content-addressed disk cache of synthesized chunk audio
+
+    Entries are keyed by a hash of everything that determines the audio
+    (preprocessed chunk text, voice, model and sample rate) and stored as
+    float32 .npy files. File modification times double as LRU recency, so
+    several processes can share one directory: every hit touches the file and
+    eviction removes the least recently used files until the directory is
+    back under max_bytes.
+    """
+
+    def __init__(self, directory: str, max_bytes: int, enabled: bool = True):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._bytes_stored = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(text: str, voice_id: str, model_name: str, sample_rate: int) -> str:
+        payload = json.dumps([text, voice_id, model_name, sample_rate], ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        # Two-level fan-out keeps directories small
+        return os.path.join(self.directory, key[:2], f"{key}.npy")
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        """Return cached audio for key, or None"""
+        if not self.enabled:
+            return None
+
+        path = self._path(key)
+        try:
+            audio_array = np.load(path)
+            os.utime(path)
+        except (OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+        return audio_array
+
+    def put(self, key: str, audio_array: np.ndarray):
+        """Store audio for key, evicting old entries if the cache is full"""
+        if not self.enabled:
+            return
+
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+            # Write under a unique name and rename so readers never see partial files
+            temp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+            with open(temp_path, "wb") as f:
+                np.save(f, np.asarray(audio_array, dtype=np.float32))
+            os.replace(temp_path, path)
+            size = os.path.getsize(path)
+        except OSError as e:
+            logger.warning(f"Could not write TTS cache entry: {str(e)}")
+            return
+
+        with self._lock:
+            if self._bytes_stored is None:
+                self._bytes_stored = self._scan_size()
+            else:
+                self._bytes_stored += size
+            needs_eviction = self._bytes_stored > self.max_bytes
+
+        if needs_eviction:
+            self.evict()
+
+    def evict(self, target_ratio: float = 0.9):
+        """Remove least recently used entries until under target_ratio of max_bytes"""
+        entries = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if not name.endswith(".npy"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        target = self.max_bytes * target_ratio
+        evicted = 0
+
+        for _, size, path in sorted(entries):
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            evicted += 1
+
+        with self._lock:
+            self._bytes_stored = total
+            self.evictions += evicted
+
+        if evicted:
+            logger.info(f"Evicted {evicted} TTS cache entries")
+
+    def _scan_size(self) -> int:
+        total = 0
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith(".npy"):
+                    try:
+                        total += os.path.getsize(os.path.join(root, name))
+                    except OSError:
+                        pass
+        return total
+
+    def stats(self) -> dict:
+        with self._lock:
+            if self._bytes_stored is None:
+                self._bytes_stored = self._scan_size()
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "bytes_stored": self._bytes_stored,
+                "max_bytes": self.max_bytes,
+                "evictions": self.evictions
+            }
+
+
+tts_cache = TTSCache(
+    directory=settings.TTS_CACHE_DIR,
+    max_bytes=settings.TTS_CACHE_MAX_BYTES,
+    enabled=settings.TTS_CACHE_ENABLED
+)
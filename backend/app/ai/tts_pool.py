@@ -0,0 +1,161 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import BrokenExecutor, Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import List, Optional
+
+import numpy as np
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# A ready worker holds each ping briefly so pings spread over every worker
+PING_HOLD_SECONDS = 0.05
+
+
+class TTSPoolBusyError(Exception):
+    """Raised when the TTS queue is full and a new job cannot be accepted"""
+
+
+def _init_worker():
+    """Load the TTS models once per worker so every job reuses them"""
+    from app.ai.speech_gen import configure_torch_threads, get_tts_bot
+    configure_torch_threads()
+    get_tts_bot()
+
+
+def _ping() -> int:
+    """Runs inside a worker: returns its pid once the worker has finished loading"""
+    time.sleep(PING_HOLD_SECONDS)
+    return os.getpid()
+
+
+def _synthesize_chunks(chunks: List[str], voice_id: str) -> List[np.ndarray]:
+    """Runs inside a worker: synthesize a batch of text chunks"""
+    from app.ai.speech_gen import get_tts_bot
+    return get_tts_bot().synthesize_chunks(chunks, voice_id)
+
+
+class TTSWorkerPool:
+    """
+    Runs TextToSpeechBot inference outside the asyncio event loop
+
+    With pool_size > 0 each worker is a separate process that owns its own
+    TextToSpeechBot. With pool_size = 0 a single background thread shares the
+    in-process bot, which is handy for development machines.
+
+    At most pool_size jobs run at once and at most max_queue more may wait;
+    anything beyond that is rejected with TTSPoolBusyError.
+    """
+
+    def __init__(self, pool_size: int = 1, max_queue: int = 8):
+        self.pool_size = pool_size
+        self.max_queue = max_queue
+        self._executor: Optional[Executor] = None
+        self._pending = 0
+        self.state = "cold"  # "cold", "loading", "ready" or "failed"
+        self._preload_task: Optional[asyncio.Task] = None
+
+    @property
+    def capacity(self) -> int:
+        return max(self.pool_size, 1) + self.max_queue
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.pool_size > 0:
+                # spawn: forked children inherit torch threads and CUDA state badly
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.pool_size,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker
+                )
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=1,
+                    thread_name_prefix="tts",
+                    initializer=_init_worker
+                )
+            logger.info(f"Started TTS pool with {max(self.pool_size, 1)} worker(s)")
+        return self._executor
+
+    async def run(self, fn, *args):
+        """Submit a job to the pool and await its result"""
+        if self._pending >= self.capacity:
+            raise TTSPoolBusyError("Text-to-speech queue is full, try again later")
+
+        self._pending += 1
+        try:
+            executor = self._get_executor()
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(executor, fn, *args)
+            if self.state == "cold":
+                self.state = "ready"
+            return result
+        except BrokenExecutor:
+            # A worker died (e.g. OOM); start a fresh pool for the next job.
+            # Other jobs on the broken pool fail too, only the first replaces it
+            if self._executor is executor:
+                logger.error("TTS worker pool broke, restarting it")
+                self._executor = None
+                self.state = "cold"
+            # Stop its management thread and any surviving workers now rather than at GC
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
+        finally:
+            self._pending -= 1
+
+    async def synthesize_chunks(self, chunks: List[str], voice_id: str = "default") -> List[np.ndarray]:
+        """Synthesize a batch of chunks in the pool and return one array per chunk"""
+        return await self.run(_synthesize_chunks, chunks, voice_id)
+
+    async def start(self):
+        """Start loading every worker in the background if preloading is enabled"""
+        if settings.TTS_PRELOAD:
+            self._preload_task = asyncio.create_task(self.preload())
+
+    async def preload(self):
+        """Spawn all workers and wait until each has loaded and warmed up its model"""
+        self.state = "loading"
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        workers = max(self.pool_size, 1)
+        try:
+            # A worker that finished loading first can answer several pings while
+            # others are still loading, so wait until every worker has answered
+            answered = set()
+            while len(answered) < workers:
+                pids = await asyncio.gather(*[
+                    loop.run_in_executor(executor, _ping)
+                    for _ in range(workers)
+                ])
+                answered.update(pids)
+        except Exception as e:
+            self.state = "failed"
+            logger.error(f"TTS preload failed: {str(e)}")
+            return
+        self.state = "ready"
+        logger.info("TTS workers are ready")
+
+    @property
+    def ready(self) -> bool:
+        return self.state == "ready"
+
+    def shutdown(self):
+        if self._preload_task is not None:
+            self._preload_task.cancel()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+tts_pool = TTSWorkerPool(
+    pool_size=settings.TTS_POOL_SIZE,
+    max_queue=settings.TTS_MAX_QUEUE
+)
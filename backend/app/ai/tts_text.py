@@ -0,0 +1,127 @@
+"""
+Text preparation for SpeechT5: normalization and token-bounded chunking
+
+Kept free of model imports so the app process can split text without
+loading any weights; token counting is passed in by the caller.
+"""
+import difflib
+import hashlib
+import re
+from typing import Callable, List, Optional, Tuple
+
+from app.ai.chunking import split_sentences, split_text_into_chunks
+
+# Spoken forms for abbreviations the model would otherwise spell out
+ABBREVIATIONS = {
+    "e.g.": "for example",
+    "i.e.": "that is",
+    "etc.": "etcetera",
+    "vs.": "versus",
+    "Dr.": "Doctor",
+    "Prof.": "Professor",
+    "&": "and",
+}
+
+# One alternation handles whitespace runs, abbreviations and sentence pauses
+_PREPROCESS_PATTERN = re.compile(
+    r"(?P<space>\s+)"
+    r"|(?P<abbrev>" + "|".join(re.escape(a) for a in sorted(ABBREVIATIONS, key=len, reverse=True)) + r")"
+    r"|(?P<stop>[.?!])(?=\s)"
+)
+
+def _preprocess_match(match: re.Match) -> str:
+    if match.lastgroup == "space":
+        return " "
+    if match.lastgroup == "abbrev":
+        return ABBREVIATIONS[match.group()]
+    # Add a pause after sentence-ending punctuation
+    return match.group() + " ..."
+
+
+def preprocess_text(text: str) -> str:
+    """
+    Preprocess text for better TTS output in a single regex pass
+
+    Collapses whitespace, expands common abbreviations and adds a spoken
+    pause after sentence-ending punctuation.
+    """
+    return _PREPROCESS_PATTERN.sub(_preprocess_match, text.strip())
+
+
+def chunk_hash(chunk: str) -> str:
+    """Stable fingerprint of a chunk's text, stored with podcast chunk offsets"""
+    return hashlib.sha256(chunk.encode("utf-8")).hexdigest()[:32]
+
+
+def plan_chunk_reuse(
+    old_chunks: List[str],
+    text: str,
+    max_tokens: int,
+    count_tokens: Callable[[str], int]
+) -> List[Tuple[Optional[int], str]]:
+    """
+    Chunk edited text so that unchanged chunks of a previous version are kept
+
+    Sentences of the old and new text are aligned with a diff; an old chunk
+    whose sentences all survive, adjacent and in order, is reused as is.
+    Only the runs of new or changed sentences between reused chunks are
+    chunked afresh, so a small edit does not shift every chunk boundary.
+
+    Args:
+        old_chunks: Chunks the previous version was synthesized from
+        text: Edited text
+        max_tokens: Hard limit on tokens per new chunk
+        count_tokens: Returns the number of model tokens a chunk will use
+
+    Returns:
+        (old chunk index, chunk) pairs in reading order; the index is None
+        for chunks that need synthesizing
+    """
+    old_sentences = []
+    chunk_ranges = {}
+    for index, chunk in enumerate(old_chunks):
+        start = len(old_sentences)
+        old_sentences.extend(split_sentences(chunk))
+        if len(old_sentences) > start:
+            chunk_ranges[index] = (start, len(old_sentences))
+
+    sentence_chunk = {}
+    for index, (start, end) in chunk_ranges.items():
+        for position in range(start, end):
+            sentence_chunk[position] = index
+
+    new_sentences = split_sentences(" ".join(text.split()))
+    matcher = difflib.SequenceMatcher(a=old_sentences, b=new_sentences, autojunk=False)
+
+    # New sentence position -> (old chunk index, sentence count) for reusable chunks
+    reusable = {}
+    for block in matcher.get_matching_blocks():
+        position = block.a
+        while position < block.a + block.size:
+            index = sentence_chunk[position]
+            start, end = chunk_ranges[index]
+            if start >= block.a and end <= block.a + block.size:
+                reusable[block.b + start - block.a] = (index, end - start)
+            position = max(end, position + 1)
+
+    plan = []
+    pending = []
+
+    def flush():
+        if pending:
+            plan.extend((None, chunk) for chunk in split_text_into_chunks(" ".join(pending), max_tokens, count_tokens))
+            pending.clear()
+
+    position = 0
+    while position < len(new_sentences):
+        if position in reusable:
+            flush()
+            index, count = reusable[position]
+            plan.append((index, old_chunks[index]))
+            position += count
+        else:
+            pending.append(new_sentences[position])
+            position += 1
+    flush()
+
+    return plan
@@ -0,0 +1,144 @@
+"""
+Precomputed speaker embedding (x-vector) table for SpeechT5 voices
+
+The table is built once from the CMU ARCTIC x-vector dataset and stored as a
+float32 .npy array plus a JSON index, so workers never download the dataset
+and can memory-map the few KB they need.
+
+Usage:
+    python -m app.ai.voices build [--output data/voices]
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+from typing import Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_DIM = 512
+
+# Voices offered to users. "row" picks one dataset entry, "speaker" averages
+# every utterance of a CMU ARCTIC speaker into a steadier embedding.
+VOICES = [
+    {"id": "default", "name": "Default", "gender": "neutral", "row": 7306},
+    {"id": "male1", "name": "Male Voice 1", "gender": "male", "speaker": "bdl"},
+    {"id": "female1", "name": "Female Voice 1", "gender": "female", "speaker": "clb"},
+    {"id": "neutral1", "name": "Neutral Voice", "gender": "neutral", "speaker": "rms"},
+]
+
+
+class VoiceTable:
+    """Lazily memory-mapped voice embedding table"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._embeddings: Optional[np.ndarray] = None
+        self._index: Optional[Dict[str, dict]] = None
+        self._fingerprints: Dict[str, str] = {}
+
+    @property
+    def available(self) -> bool:
+        return os.path.exists(f"{self.path}.npy") and os.path.exists(f"{self.path}.json")
+
+    def _load(self):
+        if self._index is None:
+            with open(f"{self.path}.json") as f:
+                self._index = {voice["id"]: voice for voice in json.load(f)["voices"]}
+            self._embeddings = np.load(f"{self.path}.npy", mmap_mode="r")
+
+    def get_embedding(self, voice_id: str) -> np.ndarray:
+        """Return the (512,) x-vector for voice_id"""
+        self._load()
+        if voice_id not in self._index:
+            raise KeyError(f"Unknown voice '{voice_id}'")
+        return np.array(self._embeddings[self._index[voice_id]["index"]], dtype=np.float32)
+
+    def fingerprint(self, voice_id: str) -> Optional[str]:
+        """Short hash of a voice's x-vector, or None if the table or voice is missing"""
+        if voice_id in self._fingerprints:
+            return self._fingerprints[voice_id]
+        if not self.available:
+            return None
+        try:
+            vector = self.get_embedding(voice_id)
+        except KeyError:
+            return None
+        self._fingerprints[voice_id] = hashlib.sha256(vector.tobytes()).hexdigest()[:16]
+        return self._fingerprints[voice_id]
+
+    def list_voices(self) -> List[dict]:
+        """Voices in the table, or the configured list if it has not been built"""
+        if not self.available:
+            return [_public_voice(voice) for voice in VOICES]
+        self._load()
+        return [_public_voice(voice) for voice in self._index.values()]
+
+
+def _public_voice(voice: dict) -> dict:
+    return {
+        "id": voice["id"],
+        "name": voice["name"],
+        "gender": voice["gender"],
+        "preview_url": voice.get("preview_url")
+    }
+
+
+def build_voice_table(output_path: str) -> int:
+    """Extract the configured voices from the x-vector dataset and save the table"""
+    from datasets import load_dataset
+
+    dataset = load_dataset("Matthijs/cmu-arctic-xvectors", split="validation")
+    filenames = dataset["filename"]
+
+    embeddings = np.zeros((len(VOICES), EMBEDDING_DIM), dtype=np.float32)
+    index = []
+
+    for i, voice in enumerate(VOICES):
+        if "row" in voice:
+            embeddings[i] = dataset[voice["row"]]["xvector"]
+        else:
+            rows = [row for row, name in enumerate(filenames) if f"_{voice['speaker']}_" in name]
+            if not rows:
+                raise ValueError(f"No x-vectors found for speaker '{voice['speaker']}'")
+            embeddings[i] = np.mean(dataset.select(rows)["xvector"], axis=0)
+
+        entry = {key: value for key, value in voice.items() if key not in ("row", "speaker")}
+        entry["index"] = i
+        index.append(entry)
+
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+
+    # Several workers may build at once; each writes its own files and
+    # renames them into place, the index last since it marks the table built
+    temp_path = f"{output_path}.{os.getpid()}.tmp"
+    np.save(f"{temp_path}.npy", embeddings)
+    with open(f"{temp_path}.json", "w") as f:
+        json.dump({"dim": EMBEDDING_DIM, "voices": index}, f, indent=2)
+    os.replace(f"{temp_path}.npy", f"{output_path}.npy")
+    os.replace(f"{temp_path}.json", f"{output_path}.json")
+
+    return len(index)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the TTS voice table")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    build = subparsers.add_parser("build", help="Build the voice table from the x-vector dataset")
+    build.add_argument("--output", help="Table path without extension, default TTS_VOICES_PATH")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        if args.output is None:
+            # Only needed for the default: settings require the app's secrets
+            from app.config import settings
+            args.output = settings.TTS_VOICES_PATH
+        count = build_voice_table(args.output)
+        print(f"Wrote {count} voices to {args.output}.npy / {args.output}.json")
+
+
+if __name__ == "__main__":
+    main()
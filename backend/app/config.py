@@ -1,12 +1,13 @@
 
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import Dict, List, Optional
 
 
 class Settings(BaseSettings):
     APP_NAME: str = "StudySpark API"
     DEBUG: bool = True
     CORS_ORIGINS: List[str] = ["http://localhost:3000", "http://localhost:5173"]
+    LIST_PREVIEW_CHARS: int = 160  # length of the preview stored for list views
 
     # MongoDB settings
     MONGODB_URL: str = "mongodb://localhost:27017"
@@ -20,6 +21,35 @@ class Settings(BaseSettings):
 
     # OpenAI settings
     OPENAI_API_KEY: str
+    OPENAI_TIMEOUT_SECONDS: float = 120.0
+    OPENAI_MAX_CONNECTIONS: int = 32  # HTTP connection pool shared by all requests
+    OPENAI_MAX_RETRIES: int = 5  # for rate limits, timeouts and server errors
+    OPENAI_BACKOFF_SECONDS: float = 1.0  # first retry delay when no Retry-After is sent, doubled per retry
+    OPENAI_MAX_BACKOFF_SECONDS: float = 60.0
+    # Per model: concurrent requests, requests per minute and tokens per minute (prompt + max_tokens)
+    OPENAI_MODEL_LIMITS: Dict[str, Dict[str, int]] = {
+        "gpt-4": {"concurrency": 8, "rpm": 500, "tpm": 10000},
+        "gpt-3.5-turbo": {"concurrency": 16, "rpm": 3500, "tpm": 90000},
+        "dall-e-3": {"concurrency": 2, "rpm": 5},
+    }
+    NOTES_MAP_REDUCE_THRESHOLD: int = 5000  # source tokens above which notes are built section by section
+    NOTES_SECTION_TOKENS: int = 2500  # source tokens per section
+    NOTES_SECTION_MAX_TOKENS: int = 700  # completion tokens for each section's notes
+    NOTES_MAX_CONCURRENCY: int = 4  # sections summarized at once per request
+    DOUBT_CONTEXT_MAX_TOKENS: int = 3000  # budget for note context attached to a question
+    MESSAGE_BUCKET_SIZE: int = 50  # conversation messages stored per message_buckets document
+    RAG_ENABLED: bool = True  # answer doubts from retrieved note passages
+    RAG_PASSAGE_TOKENS: int = 200  # note passages are embedded at most this long
+    RAG_TOP_K: int = 8  # passages retrieved per question
+    RAG_MIN_SCORE: float = 0.2  # cosine similarity below which passages are left out
+    RAG_INDEX_MAX_USERS: int = 256  # users whose passage vectors stay loaded in memory
+    RAG_INDEX_TTL_SECONDS: int = 300  # reload a user's vectors from Mongo after this
+    EMBEDDING_MODEL_NAME: str = "sentence-transformers/all-MiniLM-L6-v2"
+    EMBEDDING_BATCH_SIZE: int = 32
+    EMBEDDING_MAX_TOKENS: int = 256  # model tokens; longer passages are truncated
+    LLM_CACHE_ENABLED: bool = True
+    LLM_CACHE_TTL_SECONDS: int = 7 * 24 * 3600  # completions expire from the llm_cache collection after this
+    LLM_CACHE_MAX_ENTRIES: int = 1000  # in-process LRU in front of Mongo
 
     # AWS S3 settings
     AWS_ACCESS_KEY_ID: str
@@ -30,6 +60,34 @@ class Settings(BaseSettings):
     # Hugging Face settings
     HUGGINGFACE_API_KEY: str
 
+    # Text-to-speech settings
+    TTS_MODEL_NAME: str = "microsoft/speecht5_tts"
+    TTS_BACKEND: str = "eager"  # "eager" (fp32) or "int8" (dynamic quantization, CPU only)
+    TTS_VOICES_PATH: str = "data/voices"  # built with `python -m app.ai.voices build`
+    TTS_BATCH_SIZE: int = 4  # chunks per SpeechT5 batch, 1 disables batching
+    TTS_MAX_CHUNK_TOKENS: int = 300  # per chunk, must stay under the model's 450 token limit
+    TTS_POOL_SIZE: int = 1  # TTS worker processes, 0 runs in a background thread
+    TTS_MAX_QUEUE: int = 8  # jobs allowed to wait for a free worker
+    TTS_MAX_WORKERS_PER_PODCAST: int = 2  # pool workers one podcast may use at once
+    PODCAST_JOB_WORKERS: int = 2  # podcast jobs rendered concurrently per process
+    PODCAST_JOB_LEASE_SECONDS: int = 60  # a running job is requeued if its worker stops heartbeating this long
+    PODCAST_JOB_POLL_SECONDS: int = 15  # how often each process looks for queued and abandoned jobs
+    PODCAST_REGENERATE_INLINE_CHUNKS: int = 4  # edits synthesizing more chunks than this are rendered as jobs
+    TTS_CACHE_ENABLED: bool = True
+    TTS_CACHE_DIR: str = "tts_cache"  # shared by all workers on the host
+    TTS_CACHE_MAX_BYTES: int = 2 * 1024 ** 3
+    PODCAST_AUDIO_FORMAT: str = "opus"  # opus, mp3, flac or wav
+    PODCAST_AUDIO_BITRATE: int = 32  # kbps, lossy formats only
+    TTS_TRIM_SILENCE: bool = True  # trim chunk edges and cap pauses inside chunks
+    TTS_SILENCE_THRESHOLD_DB: float = -40.0  # frame RMS in dBFS below which audio counts as silence
+    TTS_PAUSE_MS: int = 300  # pause between chunks, and the longest pause kept inside one
+    TTS_FADE_MS: int = 10  # fade in/out at chunk joins to avoid clicks
+    TTS_DEBUG_CHUNK_DIR: Optional[str] = None  # write every chunk as WAV here when set
+    TTS_PRELOAD: bool = False  # load TTS workers at startup, /health/ready waits for them
+    TTS_WARMUP: bool = True  # run a short synthesis right after loading the model
+    TTS_NUM_THREADS: Optional[int] = None  # torch intra-op threads per worker, default cores / pool size
+    TTS_INTEROP_THREADS: Optional[int] = None  # torch inter-op threads per worker
+
     class Config:
         env_file = ".env"
 
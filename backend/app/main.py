@@ -1,9 +1,19 @@
 
 from fastapi import FastAPI, Depends, HTTPException, status
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from app.config import settings
 from app.database import connect_to_mongo, close_mongo_connection
 from app.routers import auth, notes, doubts, flashcards, podcasts
+from app.ai.tts_pool import tts_pool
+from app.ai.speech_gen import load_tokenizer as load_tts_tokenizer
+from app.ai.tts_cache import tts_cache
+from app.ai.llm_cache import llm_cache
+from app.ai.openai_client import close_client as close_openai_client
+from app.ai.single_flight import single_flight
+from app.ai.note_index import note_index
+from app.services.jobs import podcast_jobs
+from app.services import conversations
 import uvicorn
 
 app = FastAPI(
@@ -23,7 +33,16 @@ app.add_middleware(
 
 # Event handlers for database connections
 app.add_event_handler("startup", connect_to_mongo)
+app.add_event_handler("startup", llm_cache.ensure_indexes)
+app.add_event_handler("startup", note_index.ensure_indexes)
+app.add_event_handler("startup", conversations.ensure_indexes)
+app.add_event_handler("startup", tts_pool.start)
+app.add_event_handler("startup", load_tts_tokenizer)
+app.add_event_handler("startup", podcast_jobs.start)
+app.add_event_handler("shutdown", podcast_jobs.stop)
 app.add_event_handler("shutdown", close_mongo_connection)
+app.add_event_handler("shutdown", tts_pool.shutdown)
+app.add_event_handler("shutdown", close_openai_client)
 
 # Include routers
 app.include_router(auth.router, prefix="/api/auth", tags=["Authentication"])
@@ -43,5 +62,30 @@ async def health_check():
     return {"status": "healthy"}
 
 
+@app.get("/health/ready", tags=["Health"])
+async def readiness_check():
+    """Ready once the TTS workers are loaded, when they are preloaded at startup"""
+    ready = tts_pool.ready or not settings.TTS_PRELOAD
+    return JSONResponse(
+        status_code=status.HTTP_200_OK if ready else status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"status": "ready" if ready else "starting", "tts": tts_pool.state}
+    )
+
+
+@app.get("/health/tts-cache", tags=["Health"])
+async def tts_cache_stats():
+    return tts_cache.stats()
+
+
+@app.get("/health/llm-cache", tags=["Health"])
+async def llm_cache_stats():
+    return {**llm_cache.stats(), "single_flight": single_flight.stats()}
+
+
+@app.get("/health/note-index", tags=["Health"])
+async def note_index_stats():
+    return note_index.stats()
+
+
 if __name__ == "__main__":
     uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=True)
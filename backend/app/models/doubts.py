@@ -10,13 +10,31 @@ class MessageModel(BaseModel):
     content: str
     role: str  # "user" or "assistant"
     timestamp: datetime = Field(default_factory=datetime.now)
+    seq: Optional[int] = None  # position in the conversation, set when stored
+
+
+class MessageBucketModel(BaseModel):
+    """A fixed-size run of one conversation's messages, stored in message_buckets"""
+    id: PyObjectId = Field(default_factory=PyObjectId, alias="_id")
+    conversation_id: str
+    user_id: str
+    bucket: int  # holds messages with seq // MESSAGE_BUCKET_SIZE == bucket
+    messages: List[MessageModel] = []
+    created_at: datetime = Field(default_factory=datetime.now)
+    updated_at: datetime = Field(default_factory=datetime.now)
+
+    class Config:
+        allow_population_by_field_name = True
+        arbitrary_types_allowed = True
+        json_encoders = {ObjectId: str}
 
 
 class ConversationModel(BaseModel):
     id: PyObjectId = Field(default_factory=PyObjectId, alias="_id")
     user_id: str
     title: str
-    messages: List[MessageModel]
+    message_count: int = 0  # messages live in message_buckets
+    preview: str = ""  # opening of the latest message, for list views
     context_ids: List[str] = []  # References to notes or other content
     created_at: datetime = Field(default_factory=datetime.now)
     updated_at: datetime = Field(default_factory=datetime.now)
@@ -31,7 +49,7 @@ class ConversationOut(BaseModel):
     id: str = Field(alias="_id")
     user_id: str
     title: str
-    messages: List[MessageModel]
+    message_count: int = 0
     context_ids: List[str]
     created_at: datetime
     updated_at: datetime
@@ -41,6 +59,31 @@ class ConversationOut(BaseModel):
         json_encoders = {ObjectId: str}
 
 
+class ConversationSummaryOut(BaseModel):
+    """A conversation in list responses, holding only the projected fields"""
+    id: str = Field(alias="_id")
+    user_id: Optional[str] = None
+    title: Optional[str] = None
+    message_count: Optional[int] = None
+    preview: Optional[str] = None
+    context_ids: Optional[List[str]] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+    class Config:
+        allow_population_by_field_name = True
+        json_encoders = {ObjectId: str}
+
+
+CONVERSATION_SUMMARY_FIELDS = ("title", "preview", "message_count", "created_at", "updated_at")
+
+
+class MessagePage(BaseModel):
+    messages: List[MessageModel]  # oldest first
+    total: int  # messages in the conversation
+    next_before: Optional[int] = None  # pass as before= for the previous page, None at the start
+
+
 class MessageCreate(BaseModel):
     content: str
     conversation_id: Optional[str] = None  # If None, creates a new conversation
@@ -61,6 +61,28 @@ class FlashcardOut(BaseModel):
         json_encoders = {ObjectId: str}
 
 
+class FlashcardSummaryOut(BaseModel):
+    """A flashcard in list responses, holding only the projected fields"""
+    id: str = Field(alias="_id")
+    user_id: Optional[str] = None
+    question: Optional[str] = None
+    answer: Optional[str] = None
+    image_url: Optional[str] = None
+    deck_name: Optional[str] = None
+    tags: Optional[List[str]] = None
+    created_at: Optional[datetime] = None
+    last_reviewed: Optional[datetime] = None
+    review_count: Optional[int] = None
+    difficulty: Optional[int] = None
+
+    class Config:
+        allow_population_by_field_name = True
+        json_encoders = {ObjectId: str}
+
+
+FLASHCARD_SUMMARY_FIELDS = ("question", "image_url", "deck_name", "tags", "last_reviewed", "review_count", "difficulty")
+
+
 class FlashcardGenerate(BaseModel):
     content: str
     count: int = 5
@@ -0,0 +1,47 @@
+from datetime import datetime
+from typing import Optional, Union
+from pydantic import BaseModel, Field
+from bson import ObjectId
+from app.models.user import PyObjectId
+from app.models.podcasts import PodcastCreate, PodcastOut, PodcastRegenerate
+
+
+class JobModel(BaseModel):
+    id: PyObjectId = Field(default_factory=PyObjectId, alias="_id")
+    user_id: str
+    type: str = "podcast"  # "podcast" or "podcast_regenerate"
+    status: str = "queued"  # "queued", "running", "completed" or "failed"
+    payload: Union[PodcastCreate, PodcastRegenerate]
+    podcast_id: Optional[str] = None  # podcast a regenerate job updates
+    chunks_done: int = 0
+    chunks_total: int = 0
+    eta_seconds: Optional[float] = None
+    result_id: Optional[str] = None  # id of the created or regenerated podcast
+    error: Optional[str] = None
+    worker_id: Optional[str] = None  # process rendering the job
+    lease_expires_at: Optional[datetime] = None  # renewed by heartbeats while running
+    started_at: Optional[datetime] = None
+    created_at: datetime = Field(default_factory=datetime.now)
+    updated_at: datetime = Field(default_factory=datetime.now)
+
+    class Config:
+        allow_population_by_field_name = True
+        arbitrary_types_allowed = True
+        json_encoders = {ObjectId: str}
+
+
+class JobOut(BaseModel):
+    id: str = Field(alias="_id")
+    status: str
+    chunks_done: int
+    chunks_total: int
+    eta_seconds: Optional[float]
+    result_id: Optional[str]
+    error: Optional[str]
+    podcast: Optional[PodcastOut] = None  # set once the job has completed
+    created_at: datetime
+    updated_at: datetime
+
+    class Config:
+        allow_population_by_field_name = True
+        json_encoders = {ObjectId: str}
@@ -11,6 +11,7 @@ class NoteModel(BaseModel):
     user_id: str
     title: str
     content: str
+    preview: str = ""  # opening of content, for list views
     source_type: str  # "manual", "pdf", "youtube", etc.
     source_url: Optional[str] = None
     tags: List[str] = []
@@ -53,6 +54,27 @@ class NoteOut(BaseModel):
         json_encoders = {ObjectId: str}
 
 
+class NoteSummaryOut(BaseModel):
+    """A note in list responses, holding only the projected fields"""
+    id: str = Field(alias="_id")
+    user_id: Optional[str] = None
+    title: Optional[str] = None
+    content: Optional[str] = None
+    preview: Optional[str] = None
+    source_type: Optional[str] = None
+    source_url: Optional[str] = None
+    tags: Optional[List[str]] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+    class Config:
+        allow_population_by_field_name = True
+        json_encoders = {ObjectId: str}
+
+
+NOTE_SUMMARY_FIELDS = ("title", "preview", "source_type", "tags", "created_at", "updated_at")
+
+
 class NoteFromPDF(BaseModel):
     file_url: str
     title: Optional[str] = None
@@ -6,16 +6,29 @@ from bson import ObjectId
 from app.models.user import PyObjectId
 
 
+class PodcastChunk(BaseModel):
+    text: str
+    hash: str  # app.ai.tts_text.chunk_hash of text
+    start: int  # sample offsets in the recording
+    end: int
+
+
 class PodcastModel(BaseModel):
     id: PyObjectId = Field(default_factory=PyObjectId, alias="_id")
     user_id: str
     title: str
     content: str
+    preview: str = ""  # opening of content, for list views
     audio_url: str
+    audio_format: str = "wav"  # key of app.ai.audio.AUDIO_FORMATS
+    audio_bytes: int = 0
+    bitrate: Optional[int] = None  # average kbps
     duration: float  # in seconds
     voice_id: str = "default"
     tags: List[str] = []
+    chunks: List[PodcastChunk] = []  # what each stretch of audio was synthesized from
     created_at: datetime = Field(default_factory=datetime.now)
+    updated_at: Optional[datetime] = None
 
     class Config:
         allow_population_by_field_name = True
@@ -30,22 +43,61 @@ class PodcastCreate(BaseModel):
     tags: List[str] = []
 
 
+class PodcastRegenerate(BaseModel):
+    content: str
+    title: Optional[str] = None
+
+
 class PodcastOut(BaseModel):
     id: str = Field(alias="_id")
     user_id: str
     title: str
     content: str
     audio_url: str
+    audio_format: str = "wav"
+    audio_bytes: int = 0
+    bitrate: Optional[int] = None
     duration: float
     voice_id: str
     tags: List[str]
     created_at: datetime
+    updated_at: Optional[datetime] = None
+
+    class Config:
+        allow_population_by_field_name = True
+        json_encoders = {ObjectId: str}
+
+
+class PodcastSummaryOut(BaseModel):
+    """A podcast in list responses, holding only the projected fields"""
+    id: str = Field(alias="_id")
+    user_id: Optional[str] = None
+    title: Optional[str] = None
+    content: Optional[str] = None
+    preview: Optional[str] = None
+    audio_url: Optional[str] = None
+    audio_format: Optional[str] = None
+    audio_bytes: Optional[int] = None
+    bitrate: Optional[int] = None
+    duration: Optional[float] = None
+    voice_id: Optional[str] = None
+    tags: Optional[List[str]] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
 
     class Config:
         allow_population_by_field_name = True
         json_encoders = {ObjectId: str}
 
 
+PODCAST_SUMMARY_FIELDS = ("title", "preview", "audio_url", "audio_format", "duration", "tags", "created_at")
+
+
+class PodcastRegenerateOut(PodcastOut):
+    chunks_total: int
+    chunks_synthesized: int
+
+
 class PodcastVoice(BaseModel):
     id: str
     name: str
@@ -1,99 +1,131 @@
 
-from fastapi import APIRouter, Depends, HTTPException, status, File, UploadFile, Form
+from fastapi import APIRouter, Depends, HTTPException, Query, status, File, UploadFile, Form
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
 from typing import List, Optional
-from app.models.doubts import ConversationModel, MessageModel, ConversationOut, MessageCreate, ConversationCreate, ContextUpload
+import anyio
+import json
+from app.models.doubts import (
+    CONVERSATION_SUMMARY_FIELDS, MessageModel, ConversationOut, ConversationSummaryOut, MessageCreate, MessagePage,
+    ConversationCreate, ContextUpload
+)
 from app.models.user import UserModel
 from app.utils.security import get_current_user
+from app.utils.projection import list_projection
 from app.database import db
-from app.ai.text_gen import answer_question
+from app.ai.text_gen import answer_question, stream_answer
+from app.ai.context import PackedContext, pack_context, pack_ranked
+from app.ai.note_index import note_index
+from app.config import settings
+from app.services.conversations import (
+    append_messages, create_conversation, delete_conversation, get_conversation, get_messages, list_conversations
+)
 from bson import ObjectId
-from datetime import datetime
 
 router = APIRouter()
 
 
+async def load_context(user_id: str, context_ids: List[str], question: str) -> PackedContext:
+    """Pack the parts of the user's notes most relevant to the question"""
+    # The same note attached twice is read once
+    context_ids = list(dict.fromkeys(context_ids))
+    
+    if settings.RAG_ENABLED:
+        try:
+            # Search the attached notes, or all of the user's notes if none are attached
+            passages = await note_index.search(user_id, question, settings.RAG_TOP_K, context_ids or None)
+            
+            # Packed by similarity, read in note order
+            # Attached notes that are not indexed yet are packed whole below
+            if passages or not context_ids:
+                passages.sort(key=lambda passage: (passage.note_id, passage.position))
+                ranking = sorted(range(len(passages)), key=lambda i: -passages[i].score)
+                return pack_ranked([passage.text for passage in passages], ranking, settings.DOUBT_CONTEXT_MAX_TOKENS)
+        except Exception as e:
+            print(f"Error retrieving passages, packing whole notes instead: {str(e)}")
+    
+    documents = []
+    for context_id in context_ids:
+        context_note = await db.db.notes.find_one({"_id": ObjectId(context_id), "user_id": user_id})
+        if context_note:
+            documents.append(context_note["content"])
+    
+    return pack_context(documents, question, settings.DOUBT_CONTEXT_MAX_TOKENS)
+
+
+def context_report(context: PackedContext) -> dict:
+    return {
+        "tokens": context.tokens,
+        "paragraphs": context.paragraphs,
+        "paragraphs_total": context.paragraphs_total,
+        "truncated": context.truncated
+    }
+
+
+async def check_conversation(conversation_id: str, user_id: str):
+    conversation = await get_conversation(conversation_id, user_id)
+    
+    if not conversation:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Conversation not found"
+        )
+    
+    return conversation
+
+
+async def save_exchange(user_id: str, message_data: MessageCreate, answer: str):
+    """Store a question and its answer, creating the conversation if needed"""
+    messages = [
+        MessageModel(content=message_data.content, role="user"),
+        MessageModel(content=answer, role="assistant")
+    ]
+    
+    if message_data.conversation_id:
+        # Continue existing conversation
+        conversation = await append_messages(message_data.conversation_id, user_id, messages)
+        if not conversation:
+            # Deleted while the answer was being generated
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Conversation not found"
+            )
+    else:
+        # Create new conversation
+        title = message_data.content[:50] + "..." if len(message_data.content) > 50 else message_data.content
+        conversation = await create_conversation(user_id, title, messages, message_data.context_ids)
+    
+    return conversation, messages
+
+
 @router.post("/ask", status_code=status.HTTP_200_OK)
 async def ask_question(
     message_data: MessageCreate,
     current_user: UserModel = Depends(get_current_user)
 ):
     """Ask a question or continue a conversation"""
+    user_id = str(current_user["_id"])
+    
     try:
+        if message_data.conversation_id:
+            await check_conversation(message_data.conversation_id, user_id)
+        
         # Get context data if context IDs are provided
-        context = ""
-        for context_id in message_data.context_ids:
-            context_note = await db.db.notes.find_one({"_id": ObjectId(context_id)})
-            if context_note:
-                context += context_note["content"] + "\n\n"
+        context = await load_context(user_id, message_data.context_ids, message_data.content)
         
         # Generate answer using AI
-        answer = await answer_question(message_data.content, context)
+        answer = await answer_question(message_data.content, context.text)
         
-        # Create or update conversation
-        if message_data.conversation_id:
-            # Continue existing conversation
-            conversation_id = ObjectId(message_data.conversation_id)
-            
-            # Get existing conversation
-            conversation = await db.db.conversations.find_one({
-                "_id": conversation_id,
-                "user_id": str(current_user["_id"])
-            })
-            
-            if not conversation:
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail="Conversation not found"
-                )
-            
-            # Add new messages
-            user_message = MessageModel(content=message_data.content, role="user")
-            assistant_message = MessageModel(content=answer, role="assistant")
-            
-            await db.db.conversations.update_one(
-                {"_id": conversation_id},
-                {
-                    "$push": {
-                        "messages": {
-                            "$each": [
-                                user_message.dict(),
-                                assistant_message.dict()
-                            ]
-                        }
-                    },
-                    "$set": {"updated_at": datetime.now()}
-                }
-            )
-            
-            updated_conversation = await db.db.conversations.find_one({"_id": conversation_id})
-            return {
-                "conversation": ConversationOut(**updated_conversation),
-                "message": assistant_message
-            }
-            
-        else:
-            # Create new conversation
-            title = message_data.content[:50] + "..." if len(message_data.content) > 50 else message_data.content
-            
-            # Create messages
-            user_message = MessageModel(content=message_data.content, role="user")
-            assistant_message = MessageModel(content=answer, role="assistant")
-            
-            new_conversation = ConversationModel(
-                user_id=str(current_user["_id"]),
-                title=title,
-                messages=[user_message, assistant_message],
-                context_ids=message_data.context_ids
-            )
-            
-            result = await db.db.conversations.insert_one(new_conversation.dict(by_alias=True))
-            created_conversation = await db.db.conversations.find_one({"_id": result.inserted_id})
-            
-            return {
-                "conversation": ConversationOut(**created_conversation),
-                "message": assistant_message
-            }
+        conversation, messages = await save_exchange(user_id, message_data, answer)
+        return {
+            "conversation": ConversationOut(**conversation),
+            "messages": messages,
+            "message": messages[-1],
+            "context": context_report(context)
+        }
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -101,56 +133,99 @@ async def ask_question(
         )
 
 
-@router.get("/conversations", response_model=List[ConversationOut])
+@router.post("/ask/stream")
+async def ask_question_stream(
+    message_data: MessageCreate,
+    current_user: UserModel = Depends(get_current_user)
+):
+    """
+    Ask a question and stream the answer as it is generated
+    
+    Server-sent events: "token" events carry pieces of the answer, then a
+    "done" event carries the conversation id and the saved question and
+    answer messages (or "error"). If the client disconnects mid-answer, the part generated
+    so far is saved.
+    """
+    user_id = str(current_user["_id"])
+    
+    if message_data.conversation_id:
+        await check_conversation(message_data.conversation_id, user_id)
+    
+    context = await load_context(user_id, message_data.context_ids, message_data.content)
+    
+    async def event_stream():
+        parts = []
+        finished = False
+        try:
+            async for delta in stream_answer(message_data.content, context.text):
+                parts.append(delta)
+                yield f"event: token\ndata: {json.dumps({'content': delta})}\n\n"
+            finished = True
+            
+            conversation, messages = await save_exchange(user_id, message_data, "".join(parts))
+            done = {
+                "conversation_id": str(conversation["_id"]),
+                "messages": messages,
+                "message": messages[-1],
+                "context": context_report(context)
+            }
+            yield f"event: done\ndata: {json.dumps(jsonable_encoder(done))}\n\n"
+        except Exception as e:
+            yield f"event: error\ndata: {json.dumps({'detail': str(e)})}\n\n"
+        finally:
+            if parts and not finished:
+                # The stream was cut short; the save must survive the cancellation
+                with anyio.CancelScope(shield=True):
+                    try:
+                        await save_exchange(user_id, message_data, "".join(parts))
+                    except HTTPException:
+                        pass  # The conversation was deleted meanwhile
+    
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+
+@router.get("/conversations", response_model=List[ConversationSummaryOut], response_model_exclude_unset=True)
 async def get_conversations(
     limit: int = 10,
     skip: int = 0,
+    fields: Optional[str] = None,
     current_user: UserModel = Depends(get_current_user)
 ):
-    """Get all conversations for current user"""
-    conversations = []
-    cursor = db.db.conversations.find(
-        {"user_id": str(current_user["_id"])}
-    ).skip(skip).limit(limit).sort("updated_at", -1)
-    
-    async for conversation in cursor:
-        conversations.append(conversation)
-    
-    return conversations
+    """Get all conversations for current user, as summaries unless fields are chosen"""
+    projection = list_projection(fields, ConversationSummaryOut.__fields__, CONVERSATION_SUMMARY_FIELDS)
+    return await list_conversations(str(current_user["_id"]), limit, skip, projection)
 
 
 @router.get("/conversations/{conversation_id}", response_model=ConversationOut)
-async def get_conversation(
+async def get_conversation_by_id(
     conversation_id: str,
     current_user: UserModel = Depends(get_current_user)
 ):
-    """Get a specific conversation"""
-    conversation = await db.db.conversations.find_one({
-        "_id": ObjectId(conversation_id),
-        "user_id": str(current_user["_id"])
-    })
-    
-    if not conversation:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Conversation not found"
-        )
-    
-    return conversation
+    """Get a specific conversation; its messages are paged through /messages"""
+    return await check_conversation(conversation_id, str(current_user["_id"]))
+
+
+@router.get("/conversations/{conversation_id}/messages", response_model=MessagePage)
+async def get_conversation_messages(
+    conversation_id: str,
+    before: Optional[int] = None,
+    limit: int = Query(50, ge=1, le=200),
+    current_user: UserModel = Depends(get_current_user)
+):
+    """Get a page of messages, the latest first time round, then older pages via next_before"""
+    conversation = await check_conversation(conversation_id, str(current_user["_id"]))
+    return await get_messages(conversation, before, limit)
 
 
 @router.delete("/conversations/{conversation_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_conversation(
+async def delete_conversation_by_id(
     conversation_id: str,
     current_user: UserModel = Depends(get_current_user)
 ):
     """Delete a conversation"""
-    result = await db.db.conversations.delete_one({
-        "_id": ObjectId(conversation_id),
-        "user_id": str(current_user["_id"])
-    })
+    deleted = await delete_conversation(conversation_id, str(current_user["_id"]))
     
-    if result.deleted_count == 0:
+    if not deleted:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Conversation not found"
@@ -2,10 +2,14 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from typing import List, Optional
 import json
-from app.models.flashcards import FlashcardModel, FlashcardCreate, FlashcardUpdate, FlashcardOut, FlashcardGenerate
+from app.models.flashcards import (
+    FLASHCARD_SUMMARY_FIELDS, FlashcardModel, FlashcardCreate, FlashcardUpdate, FlashcardOut, FlashcardSummaryOut,
+    FlashcardGenerate
+)
 from app.models.user import UserModel
 from app.utils.security import get_current_user
 from app.database import db
+from app.utils.projection import list_projection
 from app.ai.text_gen import generate_flashcards
 from app.ai.image_gen import generate_image_for_concept
 from bson import ObjectId
@@ -87,22 +91,25 @@ async def generate_flashcards_from_text(
         )
 
 
-@router.get("/", response_model=List[FlashcardOut])
+@router.get("/", response_model=List[FlashcardSummaryOut], response_model_exclude_unset=True)
 async def get_flashcards(
     deck: Optional[str] = None,
     limit: int = 100,
     skip: int = 0,
+    fields: Optional[str] = None,
     current_user: UserModel = Depends(get_current_user)
 ):
-    """Get all flashcards for current user, optionally filtered by deck"""
+    """Get all flashcards for current user, optionally filtered by deck, as summaries unless fields are chosen"""
     query = {"user_id": str(current_user["_id"])}
     
     # Add deck filter if provided
     if deck:
         query["deck_name"] = deck
     
+    projection = list_projection(fields, FlashcardSummaryOut.__fields__, FLASHCARD_SUMMARY_FIELDS)
+    
     flashcards = []
-    cursor = db.db.flashcards.find(query).skip(skip).limit(limit)
+    cursor = db.db.flashcards.find(query, projection).skip(skip).limit(limit)
     
     async for flashcard in cursor:
         flashcards.append(flashcard)
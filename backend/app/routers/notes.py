@@ -1,12 +1,16 @@
 
 from fastapi import APIRouter, Depends, HTTPException, status, File, UploadFile, Form
 from typing import List, Optional
-from app.models.notes import NoteModel, NoteCreate, NoteUpdate, NoteOut, NoteFromPDF, NoteFromYoutube
+from app.models.notes import (
+    NOTE_SUMMARY_FIELDS, NoteModel, NoteCreate, NoteUpdate, NoteOut, NoteSummaryOut, NoteFromPDF, NoteFromYoutube
+)
 from app.models.user import UserModel
 from app.utils.security import get_current_user
 from app.database import db
+from app.utils.projection import list_projection, make_preview
 from app.ai.extractors import extract_text_from_pdf, extract_youtube_transcript
 from app.ai.text_gen import generate_notes
+from app.ai.note_index import note_index
 from bson import ObjectId
 from datetime import datetime
 
@@ -23,6 +27,7 @@ async def create_note(
         user_id=str(current_user["_id"]),
         title=note.title,
         content=note.content,
+        preview=make_preview(note.content),
         source_type=note.source_type,
         source_url=note.source_url,
         tags=note.tags
@@ -30,6 +35,7 @@ async def create_note(
     
     result = await db.db.notes.insert_one(new_note.dict(by_alias=True))
     created_note = await db.db.notes.find_one({"_id": result.inserted_id})
+    note_index.schedule_index(new_note.user_id, str(result.inserted_id), note.content)
     
     return created_note
 
@@ -65,6 +71,7 @@ async def create_note_from_pdf(
             user_id=str(current_user["_id"]),
             title=title,
             content=notes_content,
+            preview=make_preview(notes_content),
             source_type="pdf",
             source_url=file.filename,
             tags=tag_list
@@ -72,6 +79,7 @@ async def create_note_from_pdf(
         
         result = await db.db.notes.insert_one(new_note.dict(by_alias=True))
         created_note = await db.db.notes.find_one({"_id": result.inserted_id})
+        note_index.schedule_index(new_note.user_id, str(result.inserted_id), notes_content)
         
         return created_note
         
@@ -103,6 +111,7 @@ async def create_note_from_youtube(
             user_id=str(current_user["_id"]),
             title=title,
             content=notes_content,
+            preview=make_preview(notes_content),
             source_type="youtube",
             source_url=data.youtube_url,
             tags=data.tags
@@ -110,6 +119,7 @@ async def create_note_from_youtube(
         
         result = await db.db.notes.insert_one(new_note.dict(by_alias=True))
         created_note = await db.db.notes.find_one({"_id": result.inserted_id})
+        note_index.schedule_index(new_note.user_id, str(result.inserted_id), notes_content)
         
         return created_note
         
@@ -120,16 +130,20 @@ async def create_note_from_youtube(
         )
 
 
-@router.get("/", response_model=List[NoteOut])
+@router.get("/", response_model=List[NoteSummaryOut], response_model_exclude_unset=True)
 async def get_notes(
     limit: int = 10,
     skip: int = 0,
+    fields: Optional[str] = None,
     current_user: UserModel = Depends(get_current_user)
 ):
-    """Get all notes for current user"""
+    """Get all notes for current user, as summaries unless fields are chosen"""
+    projection = list_projection(fields, NoteSummaryOut.__fields__, NOTE_SUMMARY_FIELDS)
+    
     notes = []
     cursor = db.db.notes.find(
-        {"user_id": str(current_user["_id"])}
+        {"user_id": str(current_user["_id"])},
+        projection
     ).skip(skip).limit(limit).sort("created_at", -1)
     
     async for note in cursor:
@@ -179,6 +193,8 @@ async def update_note(
     
     # Update fields
     update_data = note_update.dict(exclude_unset=True)
+    if "content" in update_data:
+        update_data["preview"] = make_preview(update_data["content"] or "")
     update_data["updated_at"] = datetime.now()
     
     # Perform update
@@ -189,6 +205,9 @@ async def update_note(
     
     # Get updated note
     updated_note = await db.db.notes.find_one({"_id": ObjectId(note_id)})
+    if "content" in update_data:
+        # Content set to null indexes as an empty note
+        note_index.schedule_index(updated_note["user_id"], note_id, updated_note.get("content") or "")
     return updated_note
 
 
@@ -209,4 +228,5 @@ async def delete_note(
             detail="Note not found"
         )
     
+    note_index.schedule_remove(str(current_user["_id"]), note_id)
     return None
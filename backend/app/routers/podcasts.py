@@ -1,48 +1,104 @@
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from typing import List, Optional
-from app.models.podcasts import PodcastModel, PodcastCreate, PodcastOut, PodcastVoice
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from fastapi.responses import StreamingResponse
+from typing import List, Optional, Union
+import base64
+import json
+from app.models.podcasts import (
+    PODCAST_SUMMARY_FIELDS, PodcastModel, PodcastCreate, PodcastOut, PodcastSummaryOut, PodcastVoice,
+    PodcastRegenerate, PodcastRegenerateOut
+)
+from app.models.jobs import JobOut
 from app.models.user import UserModel
 from app.utils.security import get_current_user
-from app.services.podcasts import create_podcast_from_text, get_user_podcasts, get_podcast_by_id, delete_podcast
+from app.utils.projection import list_projection
+from app.services.podcasts import (
+    get_user_podcasts, get_podcast_by_id, delete_podcast, stream_podcast_from_text, regenerate_podcast,
+    PodcastChangedError, RegenerationTooLargeError
+)
 from app.ai.speech_gen import get_available_voices
+from app.services.jobs import podcast_jobs, get_podcast_job
+from app.ai.tts_pool import TTSPoolBusyError, tts_pool
+from app.config import settings
 from bson import ObjectId
 
 router = APIRouter()
 
-@router.post("/", response_model=PodcastOut, status_code=status.HTTP_201_CREATED)
+# Seconds clients are told to wait before retrying when the TTS queue is full
+TTS_BUSY_RETRY_AFTER = 5
+
+def tts_busy() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Text-to-speech queue is full, try again later",
+        headers={"Retry-After": str(TTS_BUSY_RETRY_AFTER)}
+    )
+
+async def validate_voice(voice_id: str):
+    voices = await get_available_voices()
+    if voice_id not in {voice["id"] for voice in voices}:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown voice '{voice_id}'"
+        )
+
+@router.post("/", response_model=JobOut, status_code=status.HTTP_202_ACCEPTED)
 async def create_podcast(
     podcast: PodcastCreate,
     current_user: UserModel = Depends(get_current_user)
 ):
-    """Create a new podcast from text"""
-    try:
-        new_podcast = await create_podcast_from_text(
-            user_id=str(current_user["_id"]),
-            title=podcast.title,
-            content=podcast.content,
-            voice_id=podcast.voice_id,
-            tags=podcast.tags
-        )
-        
-        return new_podcast
-    except Exception as e:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Error creating podcast: {str(e)}"
-        )
+    """Queue a new podcast from text; poll /jobs/{job_id} for progress"""
+    await validate_voice(podcast.voice_id)
+    job = await podcast_jobs.enqueue(str(current_user["_id"]), podcast)
+    return job
 
-@router.get("/", response_model=List[PodcastOut])
+@router.post("/stream")
+async def stream_podcast(
+    podcast: PodcastCreate,
+    current_user: UserModel = Depends(get_current_user)
+):
+    """
+    Create a podcast and stream its audio while it is synthesized
+    
+    Server-sent events: one "audio" event per chunk carrying a base64 WAV
+    segment, then a "done" event with the saved podcast (or "error").
+    """
+    await validate_voice(podcast.voice_id)
+    
+    if tts_pool.pending >= tts_pool.capacity:
+        raise tts_busy()
+    
+    async def event_stream():
+        try:
+            async for event, data in stream_podcast_from_text(
+                user_id=str(current_user["_id"]),
+                title=podcast.title,
+                content=podcast.content,
+                voice_id=podcast.voice_id,
+                tags=podcast.tags
+            ):
+                if event == "audio":
+                    yield f"event: audio\ndata: {base64.b64encode(data).decode('ascii')}\n\n"
+                else:
+                    yield f"event: done\ndata: {PodcastOut(**data).json()}\n\n"
+        except Exception as e:
+            yield f"event: error\ndata: {json.dumps({'detail': str(e)})}\n\n"
+    
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+@router.get("/", response_model=List[PodcastSummaryOut], response_model_exclude_unset=True)
 async def get_podcasts(
     skip: int = 0,
     limit: int = 10,
+    fields: Optional[str] = None,
     current_user: UserModel = Depends(get_current_user)
 ):
-    """Get all podcasts for current user"""
+    """Get all podcasts for current user, as summaries unless fields are chosen"""
     podcasts = await get_user_podcasts(
         user_id=str(current_user["_id"]),
         skip=skip,
-        limit=limit
+        limit=limit,
+        projection=list_projection(fields, PodcastSummaryOut.__fields__, PODCAST_SUMMARY_FIELDS)
     )
     
     return podcasts
@@ -53,6 +109,22 @@ async def get_voices():
     voices = await get_available_voices()
     return voices
 
+@router.get("/jobs/{job_id}", response_model=JobOut)
+async def get_job(
+    job_id: str,
+    current_user: UserModel = Depends(get_current_user)
+):
+    """Get the status of a podcast job, including the podcast once ready"""
+    job = await get_podcast_job(job_id, str(current_user["_id"]))
+    
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job not found"
+        )
+    
+    return job
+
 @router.get("/{podcast_id}", response_model=PodcastOut)
 async def get_podcast(
     podcast_id: str,
@@ -69,6 +141,53 @@ async def get_podcast(
     
     return podcast
 
+@router.post("/{podcast_id}/regenerate", response_model=Union[PodcastRegenerateOut, JobOut])
+async def regenerate_podcast_by_id(
+    podcast_id: str,
+    podcast_update: PodcastRegenerate,
+    response: Response,
+    current_user: UserModel = Depends(get_current_user)
+):
+    """
+    Apply edited text to a podcast, synthesizing only the chunks that changed
+    
+    Small edits are rendered within the request and return the updated
+    podcast. Edits that need more than PODCAST_REGENERATE_INLINE_CHUNKS
+    chunks synthesized, such as podcasts saved without chunk entries, are
+    queued instead: the response is 202 with a job to poll at /jobs/{job_id}.
+    """
+    user_id = str(current_user["_id"])
+    if tts_pool.pending >= tts_pool.capacity:
+        raise tts_busy()
+    
+    try:
+        result = await regenerate_podcast(
+            podcast_id,
+            user_id,
+            podcast_update.content,
+            podcast_update.title,
+            max_synthesized=settings.PODCAST_REGENERATE_INLINE_CHUNKS
+        )
+    except RegenerationTooLargeError:
+        response.status_code = status.HTTP_202_ACCEPTED
+        return await podcast_jobs.enqueue_regeneration(user_id, podcast_id, podcast_update)
+    except TTSPoolBusyError:
+        raise tts_busy()
+    except PodcastChangedError:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Podcast was changed by another request, reload it and try again"
+        )
+    
+    if not result:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Podcast not found"
+        )
+    
+    podcast, synthesized = result
+    return {**podcast, "chunks_total": len(podcast["chunks"]), "chunks_synthesized": synthesized}
+
 @router.delete("/{podcast_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_podcast_by_id(
     podcast_id: str,
@@ -0,0 +1,204 @@
+"""
+Conversation storage with messages in fixed-size buckets
+
+Conversation documents hold only metadata and a message_count. Messages
+are numbered in order (seq) and stored in the message_buckets collection,
+MESSAGE_BUCKET_SIZE to a bucket, so appending to or paging through a
+conversation touches a bucket or two no matter how long it gets.
+
+Conversations saved before bucketing kept their messages in the document;
+they are moved to buckets the first time the conversation is read.
+"""
+import logging
+from datetime import datetime
+from typing import List, Optional
+
+from bson import ObjectId
+from pymongo import ReturnDocument
+
+from app.config import settings
+from app.database import db
+from app.models.doubts import ConversationModel, MessageModel
+from app.utils.projection import make_preview
+
+logger = logging.getLogger(__name__)
+
+
+async def ensure_indexes():
+    try:
+        await db.db.message_buckets.create_index([("conversation_id", 1), ("bucket", 1)], unique=True)
+    except Exception as e:
+        logger.warning(f"Could not create message bucket index: {str(e)}")
+
+
+async def _write_messages(conversation_id: str, user_id: str, first_seq: int, messages: List[MessageModel]):
+    """Store messages numbered from first_seq in their buckets"""
+    by_bucket = {}
+    for offset, message in enumerate(messages):
+        message.seq = first_seq + offset
+        by_bucket.setdefault(message.seq // settings.MESSAGE_BUCKET_SIZE, []).append(message.dict())
+
+    now = datetime.now()
+    for bucket, bucket_messages in by_bucket.items():
+        await db.db.message_buckets.update_one(
+            {"conversation_id": conversation_id, "bucket": bucket},
+            {
+                "$push": {"messages": {"$each": bucket_messages}},
+                "$set": {"updated_at": now},
+                "$setOnInsert": {"user_id": user_id, "created_at": now}
+            },
+            upsert=True
+        )
+
+
+async def _migrate_embedded_messages(conversation: dict) -> dict:
+    """Move messages kept in a conversation document to buckets"""
+    if "messages" not in conversation:
+        # Listed with a projection that left the messages out
+        conversation = await db.db.conversations.find_one({"_id": conversation["_id"]})
+        if not conversation or "messages" not in conversation:
+            return conversation
+
+    messages = [MessageModel(**message) for message in conversation["messages"]]
+    # Only one caller wins the update. Legacy documents are never appended to,
+    # so the messages read above are the ones unset here; message_count is
+    # raised in the same step so messages appended meanwhile keep their numbers
+    legacy = await db.db.conversations.find_one_and_update(
+        {"_id": conversation["_id"], "messages": {"$exists": True}},
+        {
+            "$inc": {"message_count": len(messages)},
+            "$set": {"preview": make_preview(messages[-1].content) if messages else ""},
+            "$unset": {"messages": ""}
+        }
+    )
+    if legacy:
+        await _write_messages(str(legacy["_id"]), legacy["user_id"], legacy.get("message_count", 0), messages)
+
+    return await db.db.conversations.find_one({"_id": conversation["_id"]})
+
+
+async def get_conversation(conversation_id: str, user_id: str) -> Optional[dict]:
+    """A user's conversation without its messages, or None"""
+    conversation = await db.db.conversations.find_one({
+        "_id": ObjectId(conversation_id),
+        "user_id": user_id
+    })
+    if conversation and "messages" in conversation:
+        conversation = await _migrate_embedded_messages(conversation)
+    return conversation
+
+
+async def list_conversations(
+    user_id: str,
+    limit: int = 10,
+    skip: int = 0,
+    projection: Optional[dict] = None
+) -> List[dict]:
+    """A user's conversations without their messages, most recently active first"""
+    # Conversations still holding their messages have no message_count
+    query_projection = {**projection, "message_count": 1} if projection else {"messages": 0}
+
+    conversations = []
+    cursor = db.db.conversations.find(
+        {"user_id": user_id},
+        query_projection
+    ).skip(skip).limit(limit).sort("updated_at", -1)
+
+    async for conversation in cursor:
+        if "message_count" not in conversation:
+            conversation = await _migrate_embedded_messages(conversation)
+        if projection:
+            conversation = {key: value for key, value in conversation.items() if key == "_id" or key in projection}
+        conversations.append(conversation)
+
+    return conversations
+
+
+async def create_conversation(
+    user_id: str,
+    title: str,
+    messages: List[MessageModel],
+    context_ids: List[str] = []
+) -> dict:
+    """Create a conversation starting with messages"""
+    new_conversation = ConversationModel(
+        user_id=user_id,
+        title=title,
+        message_count=len(messages),
+        preview=make_preview(messages[-1].content),
+        context_ids=context_ids
+    )
+
+    result = await db.db.conversations.insert_one(new_conversation.dict(by_alias=True))
+    await _write_messages(str(result.inserted_id), user_id, 0, messages)
+
+    return new_conversation.dict(by_alias=True)
+
+
+async def append_messages(conversation_id: str, user_id: str, messages: List[MessageModel]) -> Optional[dict]:
+    """Add messages to the end of a conversation, returning the updated conversation"""
+    # Reserving the sequence numbers first keeps concurrent appends apart
+    conversation = await db.db.conversations.find_one_and_update(
+        {"_id": ObjectId(conversation_id), "user_id": user_id},
+        {
+            "$inc": {"message_count": len(messages)},
+            "$set": {"preview": make_preview(messages[-1].content), "updated_at": datetime.now()}
+        },
+        projection={"messages": 0},
+        return_document=ReturnDocument.AFTER
+    )
+    if not conversation:
+        return None
+
+    await _write_messages(conversation_id, user_id, conversation["message_count"] - len(messages), messages)
+    return conversation
+
+
+async def get_messages(conversation: dict, before: Optional[int] = None, limit: int = 50) -> dict:
+    """
+    One page of a conversation's messages
+
+    Args:
+        conversation: The conversation, as returned by get_conversation
+        before: Return messages with seq below this; the latest messages if None
+        limit: Number of messages to return at most
+
+    Returns:
+        Page with messages oldest first, the total and the cursor for the previous page
+    """
+    total = conversation.get("message_count", 0)
+    end = total if before is None else max(0, min(before, total))
+    start = max(0, end - limit)
+
+    messages = []
+    if end > start:
+        cursor = db.db.message_buckets.find({
+            "conversation_id": str(conversation["_id"]),
+            "bucket": {
+                "$gte": start // settings.MESSAGE_BUCKET_SIZE,
+                "$lte": (end - 1) // settings.MESSAGE_BUCKET_SIZE
+            }
+        })
+        async for bucket in cursor:
+            messages.extend(message for message in bucket["messages"] if start <= message["seq"] < end)
+        # Concurrent appends may land in a bucket out of order
+        messages.sort(key=lambda message: message["seq"])
+
+    return {
+        "messages": messages,
+        "total": total,
+        "next_before": start if start > 0 else None
+    }
+
+
+async def delete_conversation(conversation_id: str, user_id: str) -> bool:
+    """Delete a conversation and its messages"""
+    result = await db.db.conversations.delete_one({
+        "_id": ObjectId(conversation_id),
+        "user_id": user_id
+    })
+    if result.deleted_count == 0:
+        return False
+
+    await db.db.message_buckets.delete_many({"conversation_id": conversation_id})
+    return True
@@ -0,0 +1,288 @@
+import asyncio
+import logging
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta
+from typing import List, Optional, Set
+
+from bson import ObjectId
+
+from app.config import settings
+from app.database import db
+from app.models.jobs import JobModel
+from app.models.podcasts import PodcastCreate, PodcastRegenerate
+from app.services.podcasts import create_podcast_from_text, regenerate_podcast
+from app.ai.tts_pool import TTSPoolBusyError
+
+logger = logging.getLogger(__name__)
+
+
+class PodcastJobQueue:
+    """
+    In-process workers that render podcast jobs stored in the jobs collection
+
+    Jobs are persisted before they are queued. A worker claims a job by
+    writing its worker id and a lease, and heartbeats renew the lease while
+    it renders. Every process periodically requeues running jobs whose
+    lease has expired (their process died) and picks up queued jobs, so
+    several app processes can share the collection and unfinished jobs are
+    resumed without a live process's jobs being taken from it.
+    """
+
+    def __init__(
+        self,
+        worker_count: int = 2,
+        busy_retry_seconds: float = 5.0,
+        lease_seconds: float = 60.0,
+        poll_seconds: float = 15.0
+    ):
+        self.worker_count = worker_count
+        self.busy_retry_seconds = busy_retry_seconds
+        self.lease_seconds = lease_seconds
+        self.poll_seconds = poll_seconds
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._queue: Optional[asyncio.Queue] = None
+        self._queued_ids: Set[ObjectId] = set()
+        self._workers: List[asyncio.Task] = []
+
+    async def start(self):
+        """Start the workers and resume unfinished jobs"""
+        self._queue = asyncio.Queue()
+        self._queued_ids = set()
+
+        await self.requeue_expired()
+        resumed = await self.enqueue_waiting()
+        if resumed:
+            logger.info(f"Resuming {resumed} queued podcast job(s)")
+
+        self._workers = [
+            asyncio.create_task(self._worker())
+            for _ in range(self.worker_count)
+        ]
+        self._workers.append(asyncio.create_task(self._poll()))
+
+    async def stop(self):
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def _put(self, job_id: ObjectId):
+        if job_id not in self._queued_ids:
+            self._queued_ids.add(job_id)
+            self._queue.put_nowait(job_id)
+
+    async def enqueue(self, user_id: str, podcast: PodcastCreate) -> dict:
+        """Persist a new podcast job and queue it for rendering"""
+        return await self._insert(JobModel(user_id=user_id, payload=podcast))
+
+    async def enqueue_regeneration(self, user_id: str, podcast_id: str, update: PodcastRegenerate) -> dict:
+        """Persist a job re-rendering an edited podcast and queue it"""
+        return await self._insert(JobModel(
+            user_id=user_id,
+            type="podcast_regenerate",
+            payload=update,
+            podcast_id=podcast_id
+        ))
+
+    async def _insert(self, new_job: JobModel) -> dict:
+        result = await db.db.jobs.insert_one(new_job.dict(by_alias=True))
+        self._put(result.inserted_id)
+
+        return await db.db.jobs.find_one({"_id": result.inserted_id})
+
+    async def requeue_expired(self) -> int:
+        """Put running jobs whose worker stopped heartbeating back in the queue"""
+        now = datetime.now()
+        result = await db.db.jobs.update_many(
+            {
+                "status": "running",
+                "$or": [
+                    {"lease_expires_at": {"$lt": now}},
+                    # Claimed before leases existed: only if it has gone quiet
+                    {
+                        "lease_expires_at": {"$exists": False},
+                        "updated_at": {"$lt": now - timedelta(seconds=self.lease_seconds)}
+                    }
+                ]
+            },
+            {
+                "$set": {"status": "queued", "updated_at": now},
+                "$unset": {"worker_id": "", "lease_expires_at": ""}
+            }
+        )
+        if result.modified_count:
+            logger.warning(f"Requeued {result.modified_count} podcast job(s) whose worker stopped")
+        return result.modified_count
+
+    async def enqueue_waiting(self) -> int:
+        """Queue locally the queued jobs in the collection; claiming decides who runs them"""
+        count = 0
+        cursor = db.db.jobs.find({"status": "queued"}, {"_id": 1}).sort("created_at", 1)
+        async for job in cursor:
+            if job["_id"] not in self._queued_ids:
+                self._put(job["_id"])
+                count += 1
+        return count
+
+    async def _poll(self):
+        while True:
+            await asyncio.sleep(self.poll_seconds)
+            try:
+                await self.requeue_expired()
+                await self.enqueue_waiting()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Podcast job poll failed: {str(e)}")
+
+    async def _worker(self):
+        while True:
+            job_id = await self._queue.get()
+            self._queued_ids.discard(job_id)
+            try:
+                await self._run(job_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Podcast job {job_id} crashed: {str(e)}")
+            finally:
+                self._queue.task_done()
+
+    def _lease(self) -> dict:
+        now = datetime.now()
+        return {"lease_expires_at": now + timedelta(seconds=self.lease_seconds), "updated_at": now}
+
+    async def claim(self, job_id: ObjectId) -> Optional[dict]:
+        """Take a queued job for this worker, or None if another worker has it"""
+        return await db.db.jobs.find_one_and_update(
+            {"_id": job_id, "status": "queued"},
+            {"$set": {
+                "status": "running",
+                "worker_id": self.worker_id,
+                "started_at": datetime.now(),
+                **self._lease()
+            }}
+        )
+
+    async def _update_owned(self, job_id: ObjectId, fields: dict, unset: Optional[dict] = None) -> bool:
+        """Update a job only while this worker still holds its lease"""
+        update = {"$set": fields}
+        if unset:
+            update["$unset"] = unset
+        result = await db.db.jobs.update_one(
+            {"_id": job_id, "status": "running", "worker_id": self.worker_id},
+            update
+        )
+        return result.matched_count > 0
+
+    async def _heartbeat(self, job_id: ObjectId, render: asyncio.Task):
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            try:
+                owned = await self._update_owned(job_id, self._lease())
+            except Exception as e:
+                logger.error(f"Heartbeat for podcast job {job_id} failed: {str(e)}")
+                continue
+            if not owned:
+                # Requeued elsewhere after missed heartbeats; stop rendering a duplicate
+                logger.warning(f"Lost the lease on podcast job {job_id}, stopping it")
+                render.cancel()
+                return
+
+    async def _render(self, job: dict, on_progress) -> dict:
+        """Render a claimed job, returning the created or updated podcast"""
+        payload = job["payload"]
+        if job.get("type") == "podcast_regenerate":
+            result = await regenerate_podcast(
+                job["podcast_id"],
+                job["user_id"],
+                payload["content"],
+                payload.get("title"),
+                on_progress=on_progress
+            )
+            if not result:
+                raise Exception("Podcast not found")
+            return result[0]
+
+        return await create_podcast_from_text(
+            user_id=job["user_id"],
+            title=payload["title"],
+            content=payload["content"],
+            voice_id=payload["voice_id"],
+            tags=payload["tags"],
+            on_progress=on_progress
+        )
+
+    async def _run(self, job_id: ObjectId):
+        # Claim the job; another worker may already have taken it
+        job = await self.claim(job_id)
+        if not job:
+            return
+
+        started = datetime.now()
+
+        async def on_progress(chunks_done: int, chunks_total: int):
+            elapsed = (datetime.now() - started).total_seconds()
+            eta = elapsed / chunks_done * (chunks_total - chunks_done) if chunks_done else None
+            await self._update_owned(job_id, {
+                "chunks_done": chunks_done,
+                "chunks_total": chunks_total,
+                "eta_seconds": eta,
+                **self._lease()
+            })
+
+        render = asyncio.ensure_future(self._render(job, on_progress))
+        heartbeat = asyncio.create_task(self._heartbeat(job_id, render))
+        try:
+            podcast = await render
+        except TTSPoolBusyError:
+            # Put it back and try again once the pool has drained a little
+            await self._update_owned(
+                job_id,
+                {"status": "queued", "updated_at": datetime.now()},
+                {"worker_id": "", "lease_expires_at": ""}
+            )
+            await asyncio.sleep(self.busy_retry_seconds)
+            self._put(job_id)
+            return
+        except asyncio.CancelledError:
+            if heartbeat.done():
+                # The heartbeat stopped the render after losing the lease
+                return
+            # Shutting down: the lease expires and another process resumes the job
+            raise
+        except Exception as e:
+            await self._update_owned(job_id, {"status": "failed", "error": str(e), "updated_at": datetime.now()})
+            return
+        finally:
+            heartbeat.cancel()
+            render.cancel()
+
+        await self._update_owned(job_id, {
+            "status": "completed",
+            "result_id": str(podcast["_id"]),
+            "eta_seconds": 0,
+            "updated_at": datetime.now()
+        })
+
+
+async def get_podcast_job(job_id: str, user_id: str) -> Optional[dict]:
+    """Get a podcast job, with the finished podcast attached once completed"""
+    job = await db.db.jobs.find_one({
+        "_id": ObjectId(job_id),
+        "user_id": user_id
+    })
+
+    if job and job.get("result_id"):
+        job["podcast"] = await db.db.podcasts.find_one({"_id": ObjectId(job["result_id"])})
+
+    return job
+
+
+podcast_jobs = PodcastJobQueue(
+    worker_count=settings.PODCAST_JOB_WORKERS,
+    lease_seconds=settings.PODCAST_JOB_LEASE_SECONDS,
+    poll_seconds=settings.PODCAST_JOB_POLL_SECONDS
+)
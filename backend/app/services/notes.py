@@ -1,8 +1,10 @@
 
 from app.database import db
+from app.utils.projection import make_preview
 from app.models.notes import NoteModel
 from app.ai.extractors import extract_text_from_pdf, extract_youtube_transcript, extract_url_content
 from app.ai.text_gen import generate_notes
+from app.ai.note_index import note_index
 from bson import ObjectId
 from datetime import datetime
 from typing import List, Optional
@@ -21,6 +23,7 @@ async def create_note_from_text(
         user_id=user_id,
         title=title,
         content=content,
+        preview=make_preview(content),
         source_type=source_type,
         source_url=source_url,
         tags=tags
@@ -28,6 +31,7 @@ async def create_note_from_text(
     
     result = await db.db.notes.insert_one(new_note.dict(by_alias=True))
     created_note = await db.db.notes.find_one({"_id": result.inserted_id})
+    note_index.schedule_index(user_id, str(result.inserted_id), content)
     
     return created_note
 
@@ -96,12 +100,14 @@ async def create_note_from_youtube(
 async def get_user_notes(
     user_id: str,
     skip: int = 0,
-    limit: int = 10
+    limit: int = 10,
+    projection: Optional[dict] = None
 ) -> List[NoteModel]:
-    """Get all notes for a user"""
+    """Get all notes for a user, only the projected fields if a projection is given"""
     notes = []
     cursor = db.db.notes.find(
-        {"user_id": user_id}
+        {"user_id": user_id},
+        projection
     ).skip(skip).limit(limit).sort("created_at", -1)
     
     async for note in cursor:
@@ -127,6 +133,8 @@ async def update_note(
 ) -> Optional[NoteModel]:
     """Update a note"""
     # Add updated timestamp
+    if "content" in update_data:
+        update_data["preview"] = make_preview(update_data["content"] or "")
     update_data["updated_at"] = datetime.now()
     
     # Update the note
@@ -140,6 +148,9 @@ async def update_note(
         "_id": ObjectId(note_id),
         "user_id": user_id
     })
+    if updated_note and "content" in update_data:
+        # Content set to null indexes as an empty note
+        note_index.schedule_index(user_id, note_id, updated_note.get("content") or "")
     
     return updated_note
 
@@ -151,4 +162,7 @@ async def delete_note(note_id: str, user_id: str) -> bool:
         "user_id": user_id
     })
     
+    if result.deleted_count:
+        note_index.schedule_remove(user_id, note_id)
+    
     return result.deleted_count > 0
@@ -1,10 +1,25 @@
 
 from app.database import db
 from app.models.podcasts import PodcastModel
-from app.ai.speech_gen import generate_speech
+from app.ai.speech_gen import (
+    generate_speech, split_speech_text, iter_speech_chunks, upload_speech, plan_speech_reuse, resynthesize_speech,
+    describe_chunks, speech_assembler
+)
+from app.utils.file_storage import s3_storage
+from app.utils.projection import make_preview
+from app.ai.audio import encode_wav
 from bson import ObjectId
+import asyncio
 from datetime import datetime
-from typing import List, Optional
+from typing import AsyncIterator, Awaitable, Callable, List, Optional, Tuple
+
+
+class PodcastChangedError(Exception):
+    """The podcast was re-rendered by another request while this one ran"""
+
+
+class RegenerationTooLargeError(Exception):
+    """The edit needs more chunks synthesized than may be rendered within a request"""
 
 
 async def create_podcast_from_text(
@@ -12,42 +27,161 @@ async def create_podcast_from_text(
     title: str,
     content: str,
     voice_id: str = "default",
-    tags: List[str] = []
+    tags: List[str] = [],
+    on_progress: Optional[Callable[[int, int], Awaitable[None]]] = None
 ) -> PodcastModel:
     """Create a new podcast from text content"""
     try:
         # Generate audio from text
-        audio_url, duration = await generate_speech(content, voice_id)
+        audio_info, duration = await generate_speech(content, voice_id, on_progress)
         
-        # Create podcast entry
-        new_podcast = PodcastModel(
-            user_id=user_id,
-            title=title,
-            content=content,
-            audio_url=audio_url,
-            duration=duration,
-            voice_id=voice_id,
-            tags=tags
-        )
-        
-        result = await db.db.podcasts.insert_one(new_podcast.dict(by_alias=True))
-        created_podcast = await db.db.podcasts.find_one({"_id": result.inserted_id})
-        
-        return created_podcast
+        return await save_podcast(user_id, title, content, audio_info, duration, voice_id, tags)
     except Exception as e:
         print(f"Error creating podcast: {e}")
         raise e
 
 
+async def save_podcast(
+    user_id: str,
+    title: str,
+    content: str,
+    audio_info: dict,
+    duration: float,
+    voice_id: str = "default",
+    tags: List[str] = []
+) -> PodcastModel:
+    """Store a podcast entry for already uploaded audio (see upload_speech)"""
+    new_podcast = PodcastModel(
+        user_id=user_id,
+        title=title,
+        content=content,
+        preview=make_preview(content),
+        duration=duration,
+        voice_id=voice_id,
+        tags=tags,
+        **audio_info
+    )
+    
+    result = await db.db.podcasts.insert_one(new_podcast.dict(by_alias=True))
+    created_podcast = await db.db.podcasts.find_one({"_id": result.inserted_id})
+    
+    return created_podcast
+
+
+async def stream_podcast_from_text(
+    user_id: str,
+    title: str,
+    content: str,
+    voice_id: str = "default",
+    tags: List[str] = []
+) -> AsyncIterator[Tuple[str, object]]:
+    """
+    Synthesize a podcast and yield its audio as each chunk is ready
+    
+    Yields ("audio", wav_bytes) per chunk, then ("done", podcast) once the
+    full recording has been uploaded and saved. Stopping iteration early
+    (e.g. the client disconnected) stops synthesis and saves nothing.
+    """
+    chunks = await split_speech_text(content)
+    assembler = speech_assembler()
+    loop = asyncio.get_running_loop()
+    
+    # A first batch of one chunk gets audio to the listener soonest
+    async for index, audio_array in iter_speech_chunks(chunks, voice_id, first_batch_size=1):
+        # Listeners hear exactly what is saved, pauses included
+        written = await loop.run_in_executor(None, assembler.add, audio_array)
+        yield "audio", encode_wav(written)
+    
+    encoded = await loop.run_in_executor(None, assembler.close)
+    audio_info = await upload_speech(encoded)
+    audio_info["chunks"] = describe_chunks(chunks, assembler.offsets)
+    
+    podcast = await save_podcast(
+        user_id, title, content, audio_info, encoded.duration, voice_id, tags
+    )
+    yield "done", podcast
+
+
+async def regenerate_podcast(
+    podcast_id: str,
+    user_id: str,
+    content: str,
+    title: Optional[str] = None,
+    max_synthesized: Optional[int] = None,
+    on_progress: Optional[Callable[[int, int], Awaitable[None]]] = None
+) -> Optional[Tuple[dict, int]]:
+    """
+    Update a podcast's text and re-render only the chunks that changed
+    
+    Returns the updated podcast and the number of chunks synthesized, or
+    None if the podcast does not exist. Podcasts saved without chunk
+    entries are re-rendered in full. Raises RegenerationTooLargeError,
+    before synthesizing anything, if more than max_synthesized chunks
+    changed, and PodcastChangedError if another regeneration replaced the
+    recording first.
+    """
+    podcast = await get_podcast_by_id(podcast_id, user_id)
+    if not podcast:
+        return None
+    
+    old_chunks = podcast.get("chunks", [])
+    plan = await plan_speech_reuse(old_chunks, content)
+    changed = sum(1 for index, _ in plan if index is None)
+    if max_synthesized is not None and changed > max_synthesized:
+        raise RegenerationTooLargeError(changed)
+    
+    encoded, chunks, synthesized = await resynthesize_speech(
+        podcast["audio_url"],
+        old_chunks,
+        plan,
+        podcast.get("voice_id", "default"),
+        on_progress
+    )
+    audio_info = await upload_speech(encoded)
+    
+    update_data = {
+        **audio_info,
+        "content": content,
+        "preview": make_preview(content),
+        "chunks": chunks,
+        "duration": encoded.duration,
+        "updated_at": datetime.now()
+    }
+    if title is not None:
+        update_data["title"] = title
+    
+    # Only replace the recording this render started from, so a concurrent
+    # regeneration cannot leave either upload unreferenced
+    result = await db.db.podcasts.update_one(
+        {"_id": ObjectId(podcast_id), "user_id": user_id, "audio_url": podcast["audio_url"]},
+        {"$set": update_data}
+    )
+    loop = asyncio.get_running_loop()
+    
+    if result.matched_count == 0:
+        await loop.run_in_executor(None, s3_storage.delete_file, audio_info["audio_url"])
+        if await get_podcast_by_id(podcast_id, user_id):
+            raise PodcastChangedError(f"Podcast {podcast_id} was changed by another request")
+        return None
+    
+    # The old recording is no longer referenced
+    await loop.run_in_executor(None, s3_storage.delete_file, podcast["audio_url"])
+    
+    updated_podcast = await get_podcast_by_id(podcast_id, user_id)
+    return updated_podcast, synthesized
+
+
 async def get_user_podcasts(
     user_id: str,
     skip: int = 0,
-    limit: int = 10
+    limit: int = 10,
+    projection: Optional[dict] = None
 ) -> List[PodcastModel]:
-    """Get all podcasts for a user"""
+    """Get all podcasts for a user, only the projected fields if a projection is given"""
     podcasts = []
     cursor = db.db.podcasts.find(
-        {"user_id": user_id}
+        {"user_id": user_id},
+        projection
     ).skip(skip).limit(limit).sort("created_at", -1)
     
     async for podcast in cursor:
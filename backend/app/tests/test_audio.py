@@ -0,0 +1,91 @@
+import io
+import numpy as np
+import pytest
+import soundfile as sf
+from app.ai.audio import AudioEncoder, SpeechAssembler, encode_audio, mel_distance, open_audio, trim_silence
+
+
+def make_tone(seconds=3.0, sample_rate=16000):
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    return (0.3 * np.sin(2 * np.pi * 220 * t)).astype(np.float32)
+
+
+@pytest.mark.parametrize("format_name", ["opus", "mp3"])
+def test_lossy_formats_hit_target_bitrate(format_name):
+    encoded = encode_audio(make_tone(), format_name, bitrate=32)
+
+    assert encoded.format == format_name
+    assert 24 <= encoded.bitrate <= 40
+    assert len(encoded.data) < len(encode_audio(make_tone(), "wav").data) / 4
+
+
+def test_flac_round_trips():
+    audio = make_tone()
+    encoded = encode_audio(audio, "flac")
+
+    decoded, sample_rate = sf.read(io.BytesIO(encoded.data), dtype="float32")
+    assert sample_rate == 16000
+    assert encoded.content_type == "audio/flac"
+    np.testing.assert_allclose(decoded, audio, atol=1e-4)
+
+
+@pytest.mark.parametrize("format_name", ["opus", "mp3"])
+def test_lossy_audio_segments_keep_sample_offsets(format_name):
+    audio = np.zeros(32000, dtype=np.float32)
+    audio[20000:20100] = 0.5
+
+    with open_audio(encode_audio(audio, format_name, bitrate=64).data) as sound_file:
+        sound_file.seek(15000)
+        segment = sound_file.read(10000, dtype="float32")
+
+    assert abs(15000 + int(np.argmax(np.abs(segment) > 0.2)) - 20000) < 16
+
+
+def test_encoder_appends_chunks():
+    audio = make_tone()
+    encoder = AudioEncoder("flac")
+    for chunk in np.array_split(audio, 5):
+        encoder.write(chunk)
+
+    encoded = encoder.close()
+    decoded, _ = sf.read(io.BytesIO(encoded.data), dtype="float32")
+    assert encoded.duration == len(audio) / 16000
+    np.testing.assert_allclose(decoded, audio, atol=1e-4)
+
+
+def test_trim_silence_cuts_edges_and_caps_pauses():
+    silence = np.zeros(8000, dtype=np.float32)
+    tone = make_tone(0.5)
+    audio = np.concatenate([silence, tone, silence, silence, tone, silence])
+
+    trimmed = trim_silence(audio, threshold_db=-40.0, max_pause_ms=300)
+
+    # Two tones, one 300 ms pause between them and a frame of margin per edge
+    assert len(trimmed) == 2 * len(tone) + 4800 + 2 * 160
+    assert len(trim_silence(silence)) == 0
+
+
+def test_assembler_records_offsets_of_each_chunk():
+    assembler = SpeechAssembler(AudioEncoder("flac"), trim=False, pause_ms=250, fade_ms=10)
+    tone = make_tone(0.5)
+
+    assembler.add(tone)
+    assembler.add(tone)
+    encoded = assembler.close()
+
+    assert assembler.offsets == [(0, 8000), (12000, 20000)]
+    assert encoded.duration == 20000 / 16000
+
+
+def test_unknown_format_is_rejected():
+    with pytest.raises(ValueError):
+        encode_audio(make_tone(), "aac")
+
+
+def test_mel_distance_orders_similarity():
+    tone = make_tone()
+    quieter = tone * 0.9
+    other_pitch = (0.3 * np.sin(2 * np.pi * 880 * np.arange(len(tone)) / 16000)).astype(np.float32)
+
+    assert mel_distance(tone, tone) == 0.0
+    assert mel_distance(tone, quieter) < mel_distance(tone, other_pitch)
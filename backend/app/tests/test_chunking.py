@@ -0,0 +1,28 @@
+from app.ai.chunking import split_blocks
+
+
+def words(text):
+    return len(text.split())
+
+
+def test_blocks_keep_paragraph_and_line_breaks():
+    text = "# Cells\n\n- nucleus\n- membrane\n\nCells divide by mitosis."
+    assert split_blocks(text, max_tokens=20, count_tokens=words) == [text]
+    assert split_blocks(text, max_tokens=6, count_tokens=words) == [
+        "# Cells\n\n- nucleus\n- membrane",
+        "Cells divide by mitosis."
+    ]
+
+
+def test_long_paragraphs_split_at_lines_then_sentences():
+    text = "- one two three\n- four five six\n\nFirst sentence is long. Second one too."
+    assert split_blocks(text, max_tokens=4, count_tokens=words) == [
+        "- one two three",
+        "- four five six",
+        "First sentence is long.",
+        "Second one too."
+    ]
+
+
+def test_blank_text_has_no_blocks():
+    assert split_blocks("  \n\n \n", max_tokens=10, count_tokens=words) == []
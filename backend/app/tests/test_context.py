@@ -0,0 +1,47 @@
+from app.ai.context import pack_context, rank_paragraphs, split_paragraphs
+from app.ai.tokens import count_tokens
+
+
+PHOTOSYNTHESIS = "Photosynthesis converts light energy into chemical energy stored in glucose."
+MITOSIS = "Mitosis is the division of a cell nucleus into two identical nuclei."
+FILLER = "The history of the printing press spans several centuries of European culture."
+
+
+def test_split_paragraphs_falls_back_to_lines():
+    assert split_paragraphs("one\n\n  two  words \n\nthree") == ["one", "two words", "three"]
+    assert split_paragraphs("first line\nsecond line") == ["first line", "second line"]
+
+
+def test_relevant_paragraph_ranks_first():
+    paragraphs = [FILLER, MITOSIS, PHOTOSYNTHESIS]
+    assert rank_paragraphs(paragraphs, "How does photosynthesis store energy?")[0] == 2
+
+
+def test_repeated_notes_and_paragraphs_count_once():
+    note = f"{PHOTOSYNTHESIS}\n\n{MITOSIS}"
+    packed = pack_context([note, note, f"{MITOSIS}\n\n{FILLER}"], "mitosis", max_tokens=1000)
+
+    assert packed.paragraphs_total == 3
+    assert packed.text.count(MITOSIS) == 1
+    assert not packed.truncated
+
+
+def test_packing_respects_budget_and_keeps_original_order():
+    notes = [f"{FILLER} " * 20 + f"\n\n{PHOTOSYNTHESIS}\n\n" + f"{MITOSIS} " * 20]
+    budget = count_tokens(PHOTOSYNTHESIS) + 60
+    packed = pack_context(notes, "photosynthesis light energy", max_tokens=budget)
+
+    assert packed.tokens <= budget
+    assert packed.truncated
+    assert PHOTOSYNTHESIS in packed.text
+    # Whatever else fit stays in note order around the relevant paragraph
+    assert packed.paragraphs == 2
+    before, _, after = packed.text.partition(PHOTOSYNTHESIS)
+    assert before or after
+
+
+def test_empty_context():
+    packed = pack_context([], "anything", max_tokens=100)
+    assert packed.text == ""
+    assert packed.tokens == 0
+    assert not packed.truncated
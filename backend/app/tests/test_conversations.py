@@ -0,0 +1,186 @@
+import asyncio
+from datetime import datetime
+from types import SimpleNamespace
+
+from bson import ObjectId
+
+from app.models.doubts import MessageModel
+from app.services import conversations as conversations_module
+from app.services.conversations import (
+    _migrate_embedded_messages, append_messages, create_conversation, get_conversation, get_messages
+)
+
+
+def matches(document, query):
+    for key, condition in query.items():
+        value = document.get(key)
+        if isinstance(condition, dict):
+            if "$exists" in condition and (key in document) != condition["$exists"]:
+                return False
+            if "$gte" in condition and not value >= condition["$gte"]:
+                return False
+            if "$lte" in condition and not value <= condition["$lte"]:
+                return False
+        elif value != condition:
+            return False
+    return True
+
+
+def apply(document, update, inserted=False):
+    for key, amount in update.get("$inc", {}).items():
+        document[key] = document.get(key, 0) + amount
+    for key, values in update.get("$push", {}).items():
+        document.setdefault(key, []).extend(values["$each"])
+    document.update(update.get("$set", {}))
+    if inserted:
+        document.update(update.get("$setOnInsert", {}))
+    for key in update.get("$unset", {}):
+        document.pop(key, None)
+
+
+class FakeCursor:
+    def __init__(self, documents):
+        self.documents = documents
+
+    def __aiter__(self):
+        async def iterate():
+            for document in self.documents:
+                yield document
+        return iterate()
+
+
+class FakeCollection:
+    def __init__(self):
+        self.documents = []
+
+    async def insert_one(self, document):
+        self.documents.append(dict(document))
+        return SimpleNamespace(inserted_id=document["_id"])
+
+    async def find_one(self, query):
+        return next((dict(d) for d in self.documents if matches(d, query)), None)
+
+    def find(self, query, projection=None):
+        return FakeCursor([dict(d) for d in self.documents if matches(d, query)])
+
+    async def find_one_and_update(self, query, update, projection=None, return_document=False):
+        for document in self.documents:
+            if matches(document, query):
+                before = dict(document)
+                apply(document, update)
+                return dict(document) if return_document else before
+        return None
+
+    async def update_one(self, query, update, upsert=False):
+        for document in self.documents:
+            if matches(document, query):
+                apply(document, update)
+                return
+        if upsert:
+            document = {"_id": ObjectId(), **query}
+            apply(document, update, inserted=True)
+            self.documents.append(document)
+
+
+class FakeDatabase:
+    def __init__(self):
+        self.conversations = FakeCollection()
+        self.message_buckets = FakeCollection()
+
+
+def setup(monkeypatch, bucket_size=3):
+    database = FakeDatabase()
+    monkeypatch.setattr(conversations_module.db, "db", database)
+    monkeypatch.setattr(conversations_module.settings, "MESSAGE_BUCKET_SIZE", bucket_size)
+    return database
+
+
+def make_messages(*contents):
+    return [MessageModel(content=content, role="user") for content in contents]
+
+
+def test_appends_roll_over_into_new_buckets(monkeypatch):
+    database = setup(monkeypatch, bucket_size=3)
+
+    async def scenario():
+        conversation = await create_conversation("user", "Cells", make_messages("m0", "m1"))
+        conversation_id = str(conversation["_id"])
+        await append_messages(conversation_id, "user", make_messages("m2", "m3"))
+        return await append_messages(conversation_id, "user", make_messages("m4", "m5", "m6"))
+
+    conversation = asyncio.run(scenario())
+
+    buckets = sorted(database.message_buckets.documents, key=lambda bucket: bucket["bucket"])
+    assert [bucket["bucket"] for bucket in buckets] == [0, 1, 2]
+    assert [[m["content"] for m in bucket["messages"]] for bucket in buckets] == [
+        ["m0", "m1", "m2"], ["m3", "m4", "m5"], ["m6"]
+    ]
+    # message_count always matches the messages stored
+    assert conversation["message_count"] == 7
+    assert sum(len(bucket["messages"]) for bucket in buckets) == 7
+    assert conversation["preview"] == "m6"
+
+
+def test_appending_to_a_deleted_conversation_returns_none(monkeypatch):
+    database = setup(monkeypatch)
+
+    result = asyncio.run(append_messages(str(ObjectId()), "user", make_messages("lost")))
+
+    assert result is None
+    assert database.message_buckets.documents == []
+
+
+def test_message_pages_cross_bucket_boundaries(monkeypatch):
+    setup(monkeypatch, bucket_size=3)
+
+    async def scenario():
+        conversation = await create_conversation("user", "Cells", make_messages(*[f"m{i}" for i in range(8)]))
+        conversation = await get_conversation(str(conversation["_id"]), "user")
+        return [
+            await get_messages(conversation, limit=4),
+            await get_messages(conversation, before=4, limit=4),
+            await get_messages(conversation, before=3, limit=3),
+            await get_messages(conversation, before=0, limit=4),
+            await get_messages(conversation, before=100, limit=2)
+        ]
+
+    latest, earlier, first_bucket, empty, past_end = asyncio.run(scenario())
+
+    def contents(page):
+        return [message["content"] for message in page["messages"]]
+
+    assert contents(latest) == ["m4", "m5", "m6", "m7"] and latest["next_before"] == 4
+    assert contents(earlier) == ["m0", "m1", "m2", "m3"] and earlier["next_before"] is None
+    assert contents(first_bucket) == ["m0", "m1", "m2"] and first_bucket["next_before"] is None
+    assert contents(empty) == [] and empty["next_before"] is None
+    assert contents(past_end) == ["m6", "m7"]
+    assert latest["total"] == 8
+
+
+def test_embedded_messages_move_to_buckets_once(monkeypatch):
+    database = setup(monkeypatch, bucket_size=3)
+    conversation_id = ObjectId()
+    database.conversations.documents.append({
+        "_id": conversation_id,
+        "user_id": "user",
+        "title": "Cells",
+        "messages": [
+            {"content": f"m{i}", "role": "user", "timestamp": datetime.now()} for i in range(4)
+        ],
+        "updated_at": datetime.now()
+    })
+
+    async def scenario():
+        conversation = await get_conversation(str(conversation_id), "user")
+        # A second reader finds nothing left to migrate
+        again = await _migrate_embedded_messages({"_id": conversation_id})
+        page = await get_messages(conversation)
+        return conversation, again, page
+
+    conversation, again, page = asyncio.run(scenario())
+
+    assert "messages" not in conversation
+    assert conversation["message_count"] == 4 and again["message_count"] == 4
+    assert conversation["preview"] == "m3"
+    assert [message["seq"] for message in page["messages"]] == [0, 1, 2, 3]
+    assert sum(len(bucket["messages"]) for bucket in database.message_buckets.documents) == 4
@@ -0,0 +1,221 @@
+import asyncio
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from bson import ObjectId
+
+from app.ai.tts_pool import TTSPoolBusyError
+from app.services import jobs as jobs_module
+from app.services.jobs import PodcastJobQueue
+
+
+def matches(document, query):
+    for key, condition in query.items():
+        if key == "$or":
+            if not any(matches(document, option) for option in condition):
+                return False
+        elif isinstance(condition, dict):
+            value = document.get(key)
+            if "$exists" in condition and (key in document) != condition["$exists"]:
+                return False
+            if "$lt" in condition and not (value is not None and value < condition["$lt"]):
+                return False
+        elif document.get(key) != condition:
+            return False
+    return True
+
+
+def apply(document, update):
+    document.update(update.get("$set", {}))
+    for key in update.get("$unset", {}):
+        document.pop(key, None)
+
+
+class FakeCursor:
+    def __init__(self, documents):
+        self.documents = documents
+
+    def sort(self, key, direction):
+        self.documents.sort(key=lambda document: document[key], reverse=direction < 0)
+        return self
+
+    def __aiter__(self):
+        async def iterate():
+            for document in self.documents:
+                yield document
+        return iterate()
+
+
+class FakeJobs:
+    def __init__(self):
+        self.documents = {}
+
+    async def insert_one(self, document):
+        self.documents[document["_id"]] = dict(document)
+        return SimpleNamespace(inserted_id=document["_id"])
+
+    async def find_one(self, query):
+        return next((dict(d) for d in self.documents.values() if matches(d, query)), None)
+
+    def find(self, query, projection=None):
+        return FakeCursor([dict(d) for d in self.documents.values() if matches(d, query)])
+
+    async def find_one_and_update(self, query, update):
+        for document in self.documents.values():
+            if matches(document, query):
+                before = dict(document)
+                apply(document, update)
+                return before
+        return None
+
+    async def update_one(self, query, update):
+        for document in self.documents.values():
+            if matches(document, query):
+                apply(document, update)
+                return SimpleNamespace(matched_count=1)
+        return SimpleNamespace(matched_count=0)
+
+    async def update_many(self, query, update):
+        matched = [d for d in self.documents.values() if matches(d, query)]
+        for document in matched:
+            apply(document, update)
+        return SimpleNamespace(modified_count=len(matched))
+
+
+def make_job(**fields):
+    now = datetime.now()
+    job = {
+        "_id": ObjectId(),
+        "user_id": "user",
+        "status": "queued",
+        "payload": {"title": "Cells", "content": "Cells divide.", "voice_id": "default", "tags": []},
+        "created_at": now,
+        "updated_at": now,
+    }
+    job.update(fields)
+    return job
+
+
+def setup(monkeypatch, *jobs):
+    collection = FakeJobs()
+    for job in jobs:
+        collection.documents[job["_id"]] = job
+    monkeypatch.setattr(jobs_module.db, "db", SimpleNamespace(jobs=collection))
+    return collection
+
+
+def make_queue(**kwargs):
+    queue = PodcastJobQueue(worker_count=1, busy_retry_seconds=0, **kwargs)
+    queue._queue = asyncio.Queue()
+    return queue
+
+
+def test_only_one_worker_claims_a_job(monkeypatch):
+    job = make_job()
+    collection = setup(monkeypatch, job)
+
+    async def scenario():
+        first, second = make_queue(), make_queue()
+        return first, await first.claim(job["_id"]), await second.claim(job["_id"])
+
+    first, claimed, missed = asyncio.run(scenario())
+    stored = collection.documents[job["_id"]]
+    assert claimed is not None and missed is None
+    assert stored["status"] == "running"
+    assert stored["worker_id"] == first.worker_id
+    assert stored["lease_expires_at"] > datetime.now()
+
+
+def test_busy_pool_puts_the_job_back(monkeypatch):
+    job = make_job()
+    collection = setup(monkeypatch, job)
+
+    async def busy(**kwargs):
+        raise TTSPoolBusyError("full")
+
+    monkeypatch.setattr(jobs_module, "create_podcast_from_text", busy)
+
+    async def scenario():
+        queue = make_queue()
+        await queue._run(job["_id"])
+        return queue
+
+    queue = asyncio.run(scenario())
+    stored = collection.documents[job["_id"]]
+    assert stored["status"] == "queued"
+    assert "worker_id" not in stored and "lease_expires_at" not in stored
+    assert queue._queue.get_nowait() == job["_id"]
+
+
+def test_only_jobs_with_expired_leases_are_resumed(monkeypatch):
+    now = datetime.now()
+    abandoned = make_job(status="running", worker_id="gone", lease_expires_at=now - timedelta(seconds=5))
+    live = make_job(status="running", worker_id="alive", lease_expires_at=now + timedelta(seconds=30))
+    legacy = make_job(status="running", updated_at=now - timedelta(minutes=10))
+    waiting = make_job()
+    collection = setup(monkeypatch, abandoned, live, legacy, waiting)
+
+    async def scenario():
+        queue = make_queue(lease_seconds=60)
+        await queue.requeue_expired()
+        await queue.enqueue_waiting()
+        return {queue._queue.get_nowait() for _ in range(queue._queue.qsize())}
+
+    resumed = asyncio.run(scenario())
+    assert resumed == {abandoned["_id"], legacy["_id"], waiting["_id"]}
+    assert collection.documents[live["_id"]]["status"] == "running"
+    assert collection.documents[live["_id"]]["worker_id"] == "alive"
+
+
+def test_worker_that_lost_its_lease_does_not_complete_the_job(monkeypatch):
+    job = make_job()
+    collection = setup(monkeypatch, job)
+
+    async def render(**kwargs):
+        # Meanwhile the lease expired and another process claimed the job
+        collection.documents[job["_id"]]["worker_id"] = "other"
+        return {"_id": ObjectId()}
+
+    monkeypatch.setattr(jobs_module, "create_podcast_from_text", render)
+    asyncio.run(make_queue()._run(job["_id"]))
+
+    assert collection.documents[job["_id"]]["status"] == "running"
+    assert collection.documents[job["_id"]]["worker_id"] == "other"
+
+
+def test_completed_job_records_the_podcast(monkeypatch):
+    job = make_job()
+    collection = setup(monkeypatch, job)
+    podcast_id = ObjectId()
+
+    async def render(**kwargs):
+        await kwargs["on_progress"](1, 2)
+        return {"_id": podcast_id}
+
+    monkeypatch.setattr(jobs_module, "create_podcast_from_text", render)
+    asyncio.run(make_queue()._run(job["_id"]))
+
+    stored = collection.documents[job["_id"]]
+    assert stored["status"] == "completed"
+    assert stored["result_id"] == str(podcast_id)
+    assert stored["chunks_total"] == 2
+
+
+def test_regenerate_job_updates_the_podcast(monkeypatch):
+    podcast_id = ObjectId()
+    job = make_job(type="podcast_regenerate", podcast_id=str(podcast_id), payload={"content": "Cells split.", "title": None})
+    collection = setup(monkeypatch, job)
+    calls = []
+
+    async def regenerate(podcast_id, user_id, content, title, on_progress=None):
+        calls.append((podcast_id, user_id, content, title))
+        await on_progress(1, 1)
+        return {"_id": ObjectId(podcast_id)}, 1
+
+    monkeypatch.setattr(jobs_module, "regenerate_podcast", regenerate)
+    asyncio.run(make_queue()._run(job["_id"]))
+
+    stored = collection.documents[job["_id"]]
+    assert calls == [(str(podcast_id), "user", "Cells split.", None)]
+    assert stored["status"] == "completed"
+    assert stored["result_id"] == str(podcast_id)
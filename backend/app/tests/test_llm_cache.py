@@ -0,0 +1,71 @@
+import asyncio
+from app.ai import llm_cache as llm_cache_module
+from app.ai.llm_cache import LLMCache
+
+
+class FakeCollection:
+    def __init__(self):
+        self.documents = {}
+
+    async def find_one(self, query):
+        return self.documents.get(query["_id"])
+
+    async def replace_one(self, query, document, upsert=False):
+        self.documents[query["_id"]] = {"_id": query["_id"], **document}
+
+
+class FakeDatabase:
+    def __init__(self):
+        self.llm_cache = FakeCollection()
+
+
+def make_key():
+    messages = [{"role": "user", "content": "What is osmosis?"}]
+    return LLMCache.make_key("gpt-4", messages, 0.4, 1000)
+
+
+def test_key_covers_every_request_parameter():
+    messages = [{"role": "user", "content": "What is osmosis?"}]
+    key = LLMCache.make_key("gpt-4", messages, 0.4, 1000)
+
+    assert key == make_key()
+    assert key != LLMCache.make_key("gpt-3.5-turbo", messages, 0.4, 1000)
+    assert key != LLMCache.make_key("gpt-4", messages, 0.7, 1000)
+    assert key != LLMCache.make_key("gpt-4", messages, 0.4, 1000, {"type": "json_object"})
+
+
+def test_hits_are_served_from_memory_then_mongo(monkeypatch):
+    monkeypatch.setattr(llm_cache_module.db, "db", FakeDatabase())
+
+    async def scenario():
+        cache = LLMCache(max_entries=10, ttl_seconds=60)
+        assert await cache.get(make_key()) is None
+
+        await cache.put(make_key(), "gpt-4", "Diffusion of water.", prompt_tokens=30, completion_tokens=5)
+        assert (await cache.get(make_key()))["content"] == "Diffusion of water."
+
+        # A second process has an empty LRU but shares the collection
+        other = LLMCache(max_entries=10, ttl_seconds=60)
+        assert (await other.get(make_key()))["content"] == "Diffusion of water."
+        return cache, other
+
+    cache, other = asyncio.run(scenario())
+
+    assert cache.stats()["memory_hits"] == 1
+    assert cache.stats()["hit_rate"] == 0.5
+    assert cache.stats()["saved_prompt_tokens"] == 30
+    assert other.stats()["memory_hits"] == 0
+    assert other.stats()["saved_completion_tokens"] == 5
+
+
+def test_disabled_cache_stores_nothing(monkeypatch):
+    database = FakeDatabase()
+    monkeypatch.setattr(llm_cache_module.db, "db", database)
+
+    async def scenario():
+        cache = LLMCache(max_entries=10, ttl_seconds=60, enabled=False)
+        await cache.put(make_key(), "gpt-4", "Diffusion of water.")
+        return await cache.get(make_key())
+
+    assert asyncio.run(scenario()) is None
+    assert database.llm_cache.documents == {}
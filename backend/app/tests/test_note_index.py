@@ -0,0 +1,162 @@
+import asyncio
+from types import SimpleNamespace
+
+import numpy as np
+from bson import ObjectId
+
+from app.ai import note_index as note_index_module
+from app.ai.note_index import NoteIndex, UserIndex, split_passages
+
+
+def words(text):
+    return len(text.split())
+
+
+def unit(*values):
+    vector = np.array(values, dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+def test_short_paragraphs_share_a_passage():
+    text = "one two three\n\nfour five\n\nsix seven eight nine"
+    assert split_passages(text, max_tokens=5, count_tokens=words) == [
+        "one two three\n\nfour five",
+        "six seven eight nine"
+    ]
+
+
+def test_long_paragraphs_split_at_sentences():
+    text = "First sentence is here. Second one is here. Third one too."
+    passages = split_passages(text, max_tokens=5, count_tokens=words)
+    assert len(passages) == 3
+    assert all(words(passage) <= 5 for passage in passages)
+
+
+def test_search_ranks_by_similarity_and_filters_notes():
+    index = UserIndex()
+    index.add_note("a", ["cells", "energy"], np.stack([unit(1, 0, 0), unit(0, 1, 0)]))
+    index.add_note("b", ["light"], np.stack([unit(0.2, 1, 0)]))
+
+    query = unit(0, 1, 0)
+    assert [p.text for p in index.search(query, top_k=2)] == ["energy", "light"]
+    assert [p.text for p in index.search(query, top_k=3, note_ids=["b"])] == ["light"]
+    assert [p.text for p in index.search(query, top_k=3, min_score=0.5)] == ["energy", "light"]
+
+
+def test_updating_a_note_replaces_its_passages():
+    index = UserIndex()
+    index.add_note("a", ["old one", "old two"], np.stack([unit(1, 0), unit(0, 1)]))
+    index.add_note("b", ["other"], np.stack([unit(1, 1)]))
+    index.add_note("a", ["new"], np.stack([unit(1, 0)]))
+
+    assert len(index) == 2
+    assert sorted(index.texts) == ["new", "other"]
+    assert index.vectors.shape == (2, 2)
+
+    index.remove_note("a")
+    index.remove_note("b")
+    assert len(index) == 0
+    assert index.search(unit(1, 0), top_k=3) == []
+
+
+class FakeCursor:
+    def __init__(self, documents):
+        self.documents = documents
+
+    def sort(self, keys):
+        for key, direction in reversed(keys):
+            self.documents.sort(key=lambda document: document[key], reverse=direction < 0)
+        return self
+
+    def __aiter__(self):
+        async def iterate():
+            for document in self.documents:
+                yield document
+        return iterate()
+
+
+class FakeCollection:
+    def __init__(self, documents=()):
+        self.documents = list(documents)
+
+    def _matching(self, query):
+        def matches(document):
+            for key, condition in query.items():
+                value = document.get(key)
+                if isinstance(condition, dict):
+                    if value not in condition["$in"]:
+                        return False
+                elif value != condition:
+                    return False
+            return True
+        return [document for document in self.documents if matches(document)]
+
+    def find(self, query, projection=None):
+        return FakeCursor([dict(document) for document in self._matching(query)])
+
+    async def find_one(self, query, projection=None):
+        found = self._matching(query)
+        return dict(found[0]) if found else None
+
+    async def delete_many(self, query):
+        matching = self._matching(query)
+        self.documents = [document for document in self.documents if document not in matching]
+
+    async def insert_one(self, document):
+        self.documents.append(dict(document))
+
+    async def insert_many(self, documents):
+        self.documents.extend(dict(document) for document in documents)
+
+
+def test_empty_and_earlier_notes_do_not_block_search(monkeypatch):
+    empty_id, earlier_id = ObjectId(), ObjectId()
+    notes = FakeCollection([
+        {"_id": empty_id, "user_id": "user", "content": ""},
+        {"_id": earlier_id, "user_id": "user", "content": "Cells divide."}
+    ])
+    passages = FakeCollection()
+    monkeypatch.setattr(note_index_module.db, "db", SimpleNamespace(notes=notes, note_passages=passages))
+
+    async def embed(texts):
+        return np.stack([unit(1, 0) for _ in texts])
+
+    index = NoteIndex(embed, "model", passage_tokens=50, max_users=4, ttl_seconds=0)
+
+    async def scenario():
+        # The first search answers without waiting for the earlier notes to be embedded
+        first = await index.search("user", "cells", top_k=3)
+        await asyncio.gather(*index._backfills.values())
+        second = await index.search("user", "cells", top_k=3, note_ids=[str(earlier_id)])
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    assert first == []
+    assert [passage.text for passage in second] == ["Cells divide."]
+    # The empty note is marked as indexed rather than embedded again on each load
+    assert {document["note_id"] for document in passages.documents} == {str(empty_id), str(earlier_id)}
+    assert not index._backfills
+
+
+def test_scheduled_writes_run_in_order_off_the_request(monkeypatch):
+    passages = FakeCollection()
+    monkeypatch.setattr(note_index_module.db, "db", SimpleNamespace(notes=FakeCollection(), note_passages=passages))
+
+    async def embed(texts):
+        await asyncio.sleep(0.01)
+        return np.stack([unit(1, 0) for _ in texts])
+
+    index = NoteIndex(embed, "model", passage_tokens=50, max_users=4, ttl_seconds=60)
+
+    async def scenario():
+        index.schedule_index("user", "a", "Cells divide.")
+        index.schedule_remove("user", "a")
+        # Content set to null is indexed as an empty note
+        index.schedule_index("user", "b", None)
+        pending = index.stats()["writes_pending"]
+        await asyncio.gather(*index._writes)
+        return pending
+
+    assert asyncio.run(scenario()) == 3
+    assert [(d["note_id"], d["position"]) for d in passages.documents] == [("b", -1)]
+    assert index.stats()["writes_pending"] == 0
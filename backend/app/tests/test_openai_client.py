@@ -0,0 +1,66 @@
+import asyncio
+import time
+import httpx
+import openai
+import pytest
+from app.ai import openai_client
+from app.ai.openai_client import TokenBucket, retry_delay, with_retries
+
+
+def rate_limit_error(headers=None):
+    response = httpx.Response(
+        429,
+        headers=headers or {},
+        request=httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+    )
+    return openai.RateLimitError("Rate limit reached", response=response, body=None)
+
+
+def test_token_bucket_paces_requests_beyond_budget():
+    async def scenario():
+        bucket = TokenBucket(per_minute=600)  # 10 per second
+        start = time.monotonic()
+        for _ in range(605):
+            await bucket.acquire(1)
+        return time.monotonic() - start
+
+    # The first 600 are free, the next 5 wait about half a second
+    assert 0.4 < asyncio.run(scenario()) < 1.0
+
+
+def test_retry_delay_honors_retry_after():
+    assert retry_delay(rate_limit_error({"retry-after": "7"}), attempt=0) == 7.0
+    assert retry_delay(rate_limit_error({"retry-after-ms": "250"}), attempt=3) == 0.25
+
+
+def test_retry_delay_backs_off_exponentially(monkeypatch):
+    monkeypatch.setattr(openai_client.settings, "OPENAI_BACKOFF_SECONDS", 1.0)
+    monkeypatch.setattr(openai_client.settings, "OPENAI_MAX_BACKOFF_SECONDS", 10.0)
+
+    assert 0.5 <= retry_delay(rate_limit_error(), attempt=0) <= 1.0
+    assert 4.0 <= retry_delay(rate_limit_error(), attempt=3) <= 8.0
+    assert 5.0 <= retry_delay(rate_limit_error(), attempt=10) <= 10.0
+
+
+def test_rate_limited_calls_are_retried(monkeypatch):
+    monkeypatch.setattr(openai_client.settings, "OPENAI_MAX_RETRIES", 3)
+    attempts = []
+
+    async def call():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise rate_limit_error({"retry-after-ms": "10"})
+        return "ok"
+
+    assert asyncio.run(with_retries("test-model", 0, call)) == "ok"
+    assert len(attempts) == 3
+
+
+def test_retries_give_up_after_max_retries(monkeypatch):
+    monkeypatch.setattr(openai_client.settings, "OPENAI_MAX_RETRIES", 1)
+
+    async def call():
+        raise rate_limit_error({"retry-after-ms": "10"})
+
+    with pytest.raises(openai.RateLimitError):
+        asyncio.run(with_retries("test-model", 0, call))
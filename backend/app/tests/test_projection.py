@@ -0,0 +1,60 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+from app.utils import projection as projection_module
+from app.utils.projection import backfill_previews, list_projection, make_preview
+
+
+def test_preview_is_one_line_cut_at_a_word():
+    assert make_preview("# Cells\n\nThe  cell is\tthe unit of life", length=100) == "# Cells The cell is the unit of life"
+    assert make_preview("The cell is the unit of life", length=14) == "The cell is..."
+
+
+def test_summary_projection_by_default():
+    assert list_projection(None, ["title", "content", "preview"], ["title", "preview"]) == {"title": 1, "preview": 1}
+
+
+def test_fields_pick_the_projection():
+    allowed = ["id", "title", "content", "preview"]
+    assert list_projection("title, content", allowed, ["title"]) == {"title": 1, "content": 1}
+    assert list_projection("id", allowed, ["title"]) == {"_id": 1}
+
+
+def test_unknown_fields_are_rejected():
+    with pytest.raises(HTTPException) as error:
+        list_projection("title,password", ["id", "title"], ["title"])
+    assert error.value.status_code == 400
+    assert "password" in error.value.detail
+
+
+class FakeCollection:
+    def __init__(self, name, documents):
+        self.name = name
+        self.documents = documents
+
+    def find(self, query, projection=None):
+        async def iterate():
+            for document in self.documents:
+                if not query or "preview" not in document:
+                    yield dict(document)
+        return iterate()
+
+    async def update_one(self, query, update):
+        for document in self.documents:
+            if document["_id"] == query["_id"]:
+                document.update(update["$set"])
+
+
+def test_backfill_stores_previews_made_like_new_documents(monkeypatch):
+    notes = FakeCollection("notes", [
+        {"_id": 1, "content": "# Cells\n\nThe cell is the unit of life"},
+        {"_id": 2, "content": "Kept", "preview": "Kept"}
+    ])
+    podcasts = FakeCollection("podcasts", [{"_id": 3}])
+    monkeypatch.setattr(projection_module.db, "db", SimpleNamespace(notes=notes, podcasts=podcasts))
+
+    assert asyncio.run(backfill_previews()) == {"notes": 1, "podcasts": 1}
+    assert notes.documents[0]["preview"] == make_preview("# Cells\n\nThe cell is the unit of life")
+    assert podcasts.documents[0]["preview"] == ""
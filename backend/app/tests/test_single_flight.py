@@ -0,0 +1,103 @@
+import asyncio
+import pytest
+from app.ai.single_flight import SingleFlight
+
+
+def test_identical_calls_share_one_execution():
+    flight = SingleFlight()
+    runs = []
+
+    async def work():
+        runs.append(1)
+        await asyncio.sleep(0.02)
+        return "notes"
+
+    async def scenario():
+        return await asyncio.gather(*(flight.run("same", work) for _ in range(5)))
+
+    assert asyncio.run(scenario()) == ["notes"] * 5
+    assert len(runs) == 1
+    assert flight.stats() == {"calls": 5, "coalesced": 4, "in_flight": 0}
+
+
+def test_errors_reach_every_caller():
+    flight = SingleFlight()
+
+    async def work():
+        await asyncio.sleep(0.01)
+        raise ValueError("bad pdf")
+
+    async def scenario():
+        return await asyncio.gather(*(flight.run("same", work) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(scenario())
+    assert all(isinstance(result, ValueError) for result in results)
+
+
+def test_cancelled_leader_does_not_cancel_followers():
+    flight = SingleFlight()
+    cancelled = []
+
+    async def work():
+        try:
+            await asyncio.sleep(0.05)
+        except asyncio.CancelledError:
+            cancelled.append(1)
+            raise
+        return "answer"
+
+    async def scenario():
+        leader = asyncio.ensure_future(flight.run("same", work))
+        follower = asyncio.ensure_future(flight.run("same", work))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await follower
+
+    assert asyncio.run(scenario()) == "answer"
+    assert cancelled == []
+
+
+def test_work_is_cancelled_when_nobody_waits():
+    flight = SingleFlight()
+    cancelled = []
+
+    async def work():
+        try:
+            await asyncio.sleep(1)
+        except asyncio.CancelledError:
+            cancelled.append(1)
+            raise
+
+    async def scenario():
+        caller = asyncio.ensure_future(flight.run("same", work))
+        await asyncio.sleep(0.01)
+        caller.cancel()
+        await asyncio.sleep(0.01)
+
+    asyncio.run(scenario())
+    assert cancelled == [1]
+    assert flight.stats()["in_flight"] == 0
+
+
+def test_caller_after_the_last_waiter_left_starts_fresh_work():
+    flight = SingleFlight()
+    runs = []
+
+    async def work():
+        runs.append(1)
+        await asyncio.sleep(0.02)
+        return "answer"
+
+    async def scenario():
+        caller = asyncio.ensure_future(flight.run("same", work))
+        await asyncio.sleep(0.01)
+        caller.cancel()
+        # A retry right after the disconnect, before the old task has finished cancelling
+        await asyncio.sleep(0)
+        return await flight.run("same", work)
+
+    assert asyncio.run(scenario()) == "answer"
+    assert len(runs) == 2
@@ -0,0 +1,43 @@
+import asyncio
+from app.ai import text_gen
+
+
+def count_words(text, model="gpt-4"):
+    return len(text.split())
+
+
+def test_long_sources_are_summarized_by_section(monkeypatch):
+    prompts = []
+
+    async def fake_create_notes(prompt, max_tokens=2000, cache=True):
+        prompts.append((prompt, max_tokens))
+        return "- key point"
+
+    monkeypatch.setattr(text_gen, "_create_notes", fake_create_notes)
+    monkeypatch.setattr(text_gen, "count_tokens", count_words)
+    monkeypatch.setattr(text_gen.settings, "NOTES_MAP_REDUCE_THRESHOLD", 500)
+    monkeypatch.setattr(text_gen.settings, "NOTES_SECTION_TOKENS", 200)
+
+    text = "Enzymes lower the activation energy of reactions. " * 150
+    notes = asyncio.run(text_gen.generate_notes(text))
+
+    assert notes == "- key point"
+    # 1050 words in sections of at most 200: six sections, then one merge
+    assert len(prompts) == 7
+    assert "Notes to merge" in prompts[-1][0]
+    assert all(max_tokens == text_gen.settings.NOTES_SECTION_MAX_TOKENS for _, max_tokens in prompts[:-1])
+
+
+def test_short_sources_use_one_prompt(monkeypatch):
+    prompts = []
+
+    async def fake_create_notes(prompt, max_tokens=2000, cache=True):
+        prompts.append(prompt)
+        return "- key point"
+
+    monkeypatch.setattr(text_gen, "_create_notes", fake_create_notes)
+    monkeypatch.setattr(text_gen, "count_tokens", count_words)
+
+    asyncio.run(text_gen.generate_notes("Enzymes lower the activation energy of reactions."))
+
+    assert len(prompts) == 1
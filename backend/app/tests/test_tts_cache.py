@@ -0,0 +1,45 @@
+import os
+import time
+import numpy as np
+from app.ai.tts_cache import TTSCache
+
+
+def test_cache_round_trip(tmp_path):
+    cache = TTSCache(str(tmp_path), max_bytes=10 * 1024 * 1024)
+    key = TTSCache.make_key("Hello world.", "default", "microsoft/speecht5_tts", 16000)
+    audio = np.linspace(-1, 1, 1600, dtype=np.float32)
+
+    assert cache.get(key) is None
+    cache.put(key, audio)
+
+    np.testing.assert_array_equal(cache.get(key), audio)
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["bytes_stored"] > 0
+
+
+def test_cache_key_depends_on_voice():
+    first = TTSCache.make_key("Hello world.", "default", "microsoft/speecht5_tts", 16000)
+    second = TTSCache.make_key("Hello world.", "female1", "microsoft/speecht5_tts", 16000)
+    assert first != second
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    audio = np.zeros(16000, dtype=np.float32)  # ~64 KB per entry
+    cache = TTSCache(str(tmp_path), max_bytes=200 * 1024)
+
+    keys = [TTSCache.make_key(f"chunk {i}", "default", "m", 16000) for i in range(3)]
+    for key in keys:
+        cache.put(key, audio)
+        time.sleep(0.01)
+
+    # Touch the oldest entry so the second one becomes least recently used
+    past = time.time() + 1
+    os.utime(cache._path(keys[0]), (past, past))
+
+    cache.put(TTSCache.make_key("chunk 3", "default", "m", 16000), audio)
+
+    assert cache.stats()["evictions"] >= 1
+    assert cache.get(keys[0]) is not None
+    assert cache.get(keys[1]) is None
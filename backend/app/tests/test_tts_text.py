@@ -0,0 +1,60 @@
+from app.ai.tts_text import plan_chunk_reuse, preprocess_text, split_sentences, split_text_into_chunks
+
+
+def count_chars(chunk):
+    # SpeechT5's tokenizer is character level: one token per character plus EOS
+    return len(preprocess_text(chunk)) + 1
+
+
+def test_preprocess_text_single_pass():
+    text = "  Plants   need light. They use it, e.g. for sugar & starch!  Dr. Who? "
+    assert preprocess_text(text) == (
+        "Plants need light. ... They use it, for example for sugar and starch! ... Doctor Who?"
+    )
+
+
+def test_split_sentences_keeps_punctuation_and_abbreviations():
+    sentences = split_sentences("Is it green? Yes! Dr. Smith said so, e.g. in class. Done")
+    assert sentences == ["Is it green?", "Yes!", "Dr. Smith said so, e.g. in class.", "Done"]
+
+
+def test_chunks_never_exceed_token_limit():
+    text = "Photosynthesis converts light into chemical energy. " * 40
+    text += "A long sentence, with many clauses, that keeps going; " * 20
+    text += "x" * 900
+
+    chunks = split_text_into_chunks(text, 200, count_chars)
+
+    assert all(count_chars(chunk) <= 200 for chunk in chunks)
+    assert "".join(chunks).replace(" ", "") == text.replace(" ", "")
+
+
+def test_chunks_are_balanced():
+    sentences = [f"Sentence number {i} is about the cell cycle." for i in range(30)]
+    chunks = split_text_into_chunks(" ".join(sentences), 300, count_chars)
+
+    sizes = [count_chars(chunk) for chunk in chunks]
+    assert max(sizes) - min(sizes) < 60
+
+
+def test_short_text_is_one_chunk():
+    assert split_text_into_chunks("Mitochondria make ATP.", 300, count_chars) == ["Mitochondria make ATP."]
+    assert split_text_into_chunks("   ", 300, count_chars) == []
+
+
+def test_plan_chunk_reuse_keeps_unchanged_chunks():
+    sentences = [f"Sentence number {i} is about the cell cycle." for i in range(30)]
+    old_chunks = split_text_into_chunks(" ".join(sentences), 300, count_chars)
+
+    sentences[12] = "Sentence twelve was rewritten to say something new."
+    plan = plan_chunk_reuse(old_chunks, " ".join(sentences), 300, count_chars)
+
+    assert " ".join(chunk for _, chunk in plan) == " ".join(sentences)
+    edited = next(i for i, chunk in enumerate(old_chunks) if "number 12 " in chunk)
+    assert [index for index, _ in plan if index is not None] == [i for i in range(len(old_chunks)) if i != edited]
+    assert len([index for index, _ in plan if index is None]) == 1
+
+
+def test_plan_chunk_reuse_without_old_chunks():
+    plan = plan_chunk_reuse([], "Mitochondria make ATP.", 300, count_chars)
+    assert plan == [(None, "Mitochondria make ATP.")]
@@ -1,5 +1,7 @@
 
+import asyncio
 import boto3
+import functools
 import os
 import uuid
 from botocore.exceptions import NoCredentialsError
@@ -41,6 +43,48 @@ class S3Storage:
         except NoCredentialsError:
             raise Exception("AWS credentials not available")
     
+    async def upload_bytes(
+        self,
+        data: bytes,
+        folder: str = "uploads",
+        content_type: str = "application/octet-stream",
+        extension: str = ""
+    ) -> str:
+        """Upload in-memory content to S3 bucket and return the URL"""
+        try:
+            unique_filename = f"{folder}/{uuid.uuid4()}{extension}"
+            
+            # boto3 is blocking, run the upload in a worker thread
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(
+                None,
+                functools.partial(
+                    self.s3_client.put_object,
+                    Bucket=self.bucket_name,
+                    Key=unique_filename,
+                    Body=data,
+                    ContentType=content_type
+                )
+            )
+            
+            # Generate URL
+            url = f"https://{self.bucket_name}.s3.{settings.AWS_REGION}.amazonaws.com/{unique_filename}"
+            return url
+            
+        except NoCredentialsError:
+            raise Exception("AWS credentials not available")
+    
+    async def download_bytes(self, file_url: str) -> bytes:
+        """Download a file from S3 bucket into memory"""
+        file_key = file_url.split(f"https://{self.bucket_name}.s3.{settings.AWS_REGION}.amazonaws.com/")[1]
+        
+        loop = asyncio.get_running_loop()
+        response = await loop.run_in_executor(
+            None,
+            functools.partial(self.s3_client.get_object, Bucket=self.bucket_name, Key=file_key)
+        )
+        return await loop.run_in_executor(None, response["Body"].read)
+    
     def delete_file(self, file_url: str) -> bool:
         """Delete a file from S3 bucket"""
         try:
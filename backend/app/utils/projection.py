@@ -0,0 +1,105 @@
+"""
+Field projections for list endpoints
+
+List endpoints return a summary of each document by default and accept a
+comma-separated `fields` query parameter to pick exactly which fields to
+return. Either way the projection is applied in the Mongo query, so
+unused fields (note bodies, podcast chunks) never leave the database.
+"""
+from typing import Iterable, Optional
+
+from fastapi import HTTPException, status
+
+from app.config import settings
+from app.database import db
+
+
+def make_preview(text: str, length: Optional[int] = None) -> str:
+    """Opening of text on one line, cut at a word boundary"""
+    length = length or settings.LIST_PREVIEW_CHARS
+    text = " ".join(text.split())
+    if len(text) <= length:
+        return text
+    cut = text[:length].rsplit(" ", 1)[0] or text[:length]
+    return cut + "..."
+
+
+def list_projection(fields: Optional[str], allowed: Iterable[str], default: Iterable[str]) -> dict:
+    """
+    Mongo projection for a list endpoint's fields parameter
+
+    Args:
+        fields: Comma-separated field names from the request, or None for the summary
+        allowed: Fields the endpoint's response model can return
+        default: Fields of the summary
+
+    Returns:
+        Projection including the document id and the chosen fields
+    """
+    if not fields:
+        return {name: 1 for name in default}
+
+    allowed = set(allowed) - {"id"}
+    names = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = [name for name in names if name not in allowed and name != "id"]
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown fields: {', '.join(unknown)}. Choose from: {', '.join(sorted(allowed))}"
+        )
+
+    # The id is always returned
+    return {name: 1 for name in names if name != "id"} or {"_id": 1}
+
+
+async def backfill_previews(recompute: bool = False) -> dict:
+    """
+    Store previews for notes and podcasts saved before previews were
+
+    A one-off migration, run with `python -m app.utils.projection backfill-previews`.
+
+    Args:
+        recompute: Also rewrite previews that are already stored
+
+    Returns:
+        Number of documents updated per collection
+    """
+    updated = {}
+    for collection in (db.db.notes, db.db.podcasts):
+        query = {} if recompute else {"preview": {"$exists": False}}
+        count = 0
+        async for document in collection.find(query, {"content": 1}):
+            await collection.update_one(
+                {"_id": document["_id"]},
+                {"$set": {"preview": make_preview(document.get("content") or "")}}
+            )
+            count += 1
+        updated[collection.name] = count
+    return updated
+
+
+def main():
+    import argparse
+    import asyncio
+    from app.database import connect_to_mongo, close_mongo_connection
+
+    parser = argparse.ArgumentParser(description="Maintain stored list previews")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    backfill = subparsers.add_parser("backfill-previews", help="Store previews for documents saved without one")
+    backfill.add_argument("--all", action="store_true", help="Recompute every stored preview too")
+    args = parser.parse_args()
+
+    async def run():
+        await connect_to_mongo()
+        try:
+            return await backfill_previews(recompute=args.all)
+        finally:
+            await close_mongo_connection()
+
+    if args.command == "backfill-previews":
+        for name, count in asyncio.run(run()).items():
+            print(f"Updated {count} {name} preview(s)")
+
+
+if __name__ == "__main__":
+    main()